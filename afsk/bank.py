@@ -0,0 +1,441 @@
+import math
+import asyncio
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import lib.upydash as _
+from lib.compat import Queue
+from lib.compat import print_exc
+
+from afsk.demod import DEFAULT_OPTIONS
+from afsk.demod import design_bpf
+from afsk.demod import design_lpf
+from afsk.func import PLL_INERTIA
+from ax25.from_afsk import AX25FromAFSK
+from ax25.dedup import FrameDeduplicator, frame_crc
+
+# Diversity bank: several demod profiles (AFSKDemodulator options) decode
+# the same audio and their frames are merged. Each profile is the usual
+# bpf -> correlator -> lpf -> sampler chain, computed a block at a time with
+# NumPy instead of a sample at a time:
+#   - stages with the same parameters are computed once, profiles that only
+#     differ in the lpf share the bandpass and correlator output
+#   - all bandpass filters run as one stacked product over the input
+#     windows, all lowpass filters on one correlator output likewise
+#   - the integer arithmetic of afsk.func is kept (every fir product floor
+#     divided by the scale, integer square root in the correlator), so a
+#     profile produces the same bits as AFSKDemodulator with those options
+#   - profiles with another engine (afsk.goertzel) run it on the input
+# The stacked products save the per sample Python overhead, not arithmetic:
+# each distinct bandpass still costs about one chain (8.7s of 22050 Hz audio,
+# one profile 0.15s cpu, the three BANK_PROFILES 0.43s), a profile sharing
+# the bandpass and correlator costs a lowpass and a sampler (0.08s), and a
+# single AFSKDemodulator on the same audio takes some 30 times a chain.
+# Frames go through a FrameDeduplicator keyed on the frame CRC, with the
+# sample time as the clock: the same packet decoded by two profiles a few
+# milliseconds apart is passed on once.
+# The bit flip fixer of AX25FromAFSK costs far more than the demod, so the
+# bank runs it itself, one block late: a frame that failed the crc is not
+# fixed when another profile decoded a frame with the same source and
+# destination in that block or the next, and a corrupt frame that several
+# profiles produced bit for bit is fixed once.
+
+# flat audio needs less space boost than the de-emphasized audio the
+# default bandpass is made for, pre-emphasized audio needs a mark boost
+BANK_PROFILES = [
+    {},
+    {'bandpass_amark' : 12, 'bandpass_aspace' : 12},
+    {'bandpass_amark' : 24, 'bandpass_aspace' : 7},
+]
+
+DEDUP_WINDOW = 1. # seconds, shorter than any retransmission of a frame
+
+_FIR_BLOCK = 1024 # outputs per stacked product, bounds the temporary
+
+class FIRBank():
+    # streaming integer firs on one input, arithmetic of afsk.func.create_fir
+    def __init__(self, designs): # [(coefs, scale)]
+        ntaps = max(len(coefs) for coefs,scale in designs)
+        C = np.zeros((len(designs), ntaps), dtype = np.int64)
+        for k,(coefs,scale) in enumerate(designs):
+            C[k,:len(coefs)] = coefs
+        self.C     = C[:,::-1][:,None,:] # window j holds x[n-ntaps+1+j]
+        self.scale = np.array([scale or 1 for coefs,scale in designs], dtype = np.int64)[:,None,None]
+        self.hist  = np.zeros(ntaps - 1, dtype = np.int64)
+
+    def process(self, x):
+        # (nfilters, len(x))
+        buf = np.concatenate((self.hist, x))
+        W = sliding_window_view(buf, self.C.shape[2])
+        out = np.empty((self.C.shape[0], len(W)), dtype = np.int64)
+        for i in range(0, len(W), _FIR_BLOCK):
+            w = W[i:i+_FIR_BLOCK]
+            out[:,i:i+len(w)] = (w[None,:,:]*self.C//self.scale).sum(axis = 2)
+        if len(self.hist):
+            self.hist = buf[len(buf)-len(self.hist):]
+        return out
+
+def isqrt(x):
+    # exact floor square root of non negative int64
+    r = np.sqrt(x.astype(np.float64)).astype(np.int64)
+    r -= r*r > x
+    r += (r + 1)*(r + 1) <= x
+    return r
+
+class Correlator():
+    # afsk.func.create_corr
+    def __init__(self, delay):
+        self.hist = np.zeros(delay, dtype = np.int64)
+
+    def process(self, v):
+        buf = np.concatenate((self.hist, v))
+        d = buf[:len(v)]
+        self.hist = buf[len(v):]
+        return isqrt(np.abs(v*d))*np.sign(v)*np.sign(d)
+
+class Sampler():
+    # afsk.func.create_sampler followed by create_unnrzi. A crossing emits
+    # one bit per sample until the next crossing, so a crossing soon after
+    # another cuts the bits of the first one short; the bits still owed at
+    # the end of a block are carried to the next one.
+    def __init__(self, fbaud, fs, threshold = 0):
+        tbaud = fs/fbaud
+        self.ibaud   = round(tbaud)
+        self.ibaud_2 = round(tbaud/2)
+        self.th      = threshold
+        self.prev    = 0  # last lpf output
+        self.lastx   = 0  # samples since the last crossing
+        self.owed    = 0  # bits of the last crossing not emitted yet
+        self.owed_b  = 0
+        self.nrzi    = 1  # unnrzi state
+
+    def process(self, y):
+        n = len(y)
+        if not n:
+            return np.zeros(0, dtype = np.uint8)
+        prev = np.concatenate(([self.prev], y[:-1]))
+        above = y > self.th
+        prev_above = prev > self.th
+        pos = np.flatnonzero(above != prev_above)
+        self.prev = y[-1]
+
+        runs = []
+        vals = []
+        start = pos[0] if len(pos) else n
+        if self.owed:
+            # bits of the previous block's last crossing, until our first crossing
+            runs.append(min(self.owed, start))
+            vals.append(self.owed_b)
+            self.owed = 0
+        if len(pos):
+            lastx = np.empty(len(pos), dtype = np.int64)
+            lastx[0] = self.lastx + pos[0]
+            lastx[1:] = np.diff(pos) - 1
+            valid = (lastx > self.ibaud_2) & (lastx < self.ibaud*8)
+            count = np.where(valid, (lastx - self.ibaud_2)//self.ibaud + 1, 0)
+            room = np.append(np.diff(pos), n - pos[-1])
+            emit = np.minimum(count, room)
+            bit = np.where(prev_above[pos], 0, 1)
+            runs.extend(emit.tolist())
+            vals.extend(bit.tolist())
+            self.owed   = int(count[-1] - emit[-1])
+            self.owed_b = int(bit[-1])
+            self.lastx  = n - 1 - pos[-1]
+        else:
+            self.lastx += n
+        return self.bits(vals, runs)
+
+    def bits(self, vals, runs):
+        # runs[i] times vals[i], then unnrzi
+        if not runs:
+            return np.zeros(0, dtype = np.uint8)
+        b = np.repeat(np.array(vals, dtype = np.uint8), runs)
+        if not len(b):
+            return b
+        # unnrzi, 1 when the bit did not change
+        p = np.concatenate(([self.nrzi], b[:-1]))
+        self.nrzi = int(b[-1])
+        return (b == p).astype(np.uint8)
+
+class PLLSampler(Sampler):
+    # afsk.func.create_pll_sampler followed by create_unnrzi. Between two
+    # crossings the level is constant, so only the crossings are visited:
+    # the phase advances over the run, every wrap is a bit of that level,
+    # and the crossing nudges the phase.
+    def __init__(self, fbaud, fs, threshold = 0, inertia = PLL_INERTIA):
+        self.step    = fbaud/fs
+        self.th      = threshold
+        self.inertia = inertia
+        self.ph      = 0.  # phase at the last sample of the previous block
+        self.prev    = 0
+        self.nrzi    = 1
+
+    def process(self, y):
+        n = len(y)
+        if not n:
+            return np.zeros(0, dtype = np.uint8)
+        prev = np.concatenate(([self.prev], y[:-1]))
+        above = y > self.th
+        prev_above = prev > self.th
+        pos = np.flatnonzero(above != prev_above)
+        # crossing times, samples after the last sample of the previous block
+        a = (self.th - prev[pos])/(y[pos] - prev[pos])
+        tcs = pos + a
+
+        runs = []
+        vals = []
+        ph = self.ph
+        t = 0.
+        level = bool(prev_above[0])
+        step = self.step
+        inertia = self.inertia
+        for tc, after in zip(tcs.tolist(), above[pos].tolist()):
+            p = ph + (tc - t)*step
+            k = math.floor(p + .5)
+            if k:
+                runs.append(k)
+                vals.append(0 if level else 1)
+            ph = (p - k)*inertia
+            t = tc
+            level = after
+        p = ph + (n - t)*step
+        k = math.floor(p + .5)
+        if k:
+            runs.append(k)
+            vals.append(0 if level else 1)
+        self.ph = p - k
+        self.prev = y[-1]
+        return self.bits(vals, runs)
+
+def make_sampler(fs, options):
+    # bit timing of options['clock'], for a demod output at fs
+    if options['clock'] == 'pll':
+        return PLLSampler(1200, fs, options['slicer_threshold'], options['pll_inertia'])
+    return Sampler(1200, fs, options['slicer_threshold'])
+
+class DemodChains():
+    # bits of every profile for a block of samples, stages shared by key
+    def __init__(self, sampling_rate, profiles):
+        self.fs = sampling_rate
+        self.profiles = [dict(DEFAULT_OPTIONS, **p) for p in profiles]
+        bpf_keys = ('bandpass_ncoefsbaud', 'bandpass_width', 'bandpass_amark', 'bandpass_aspace')
+        lpf_keys = ('lpf_ncoefsbaud', 'lpf_f', 'lpf_width', 'lpf_aboost')
+
+        # bandpass stage: one FIRBank over the input
+        self.bpf_index = {} # key -> row of the bpf bank
+        designs = []
+        ncoefs = {}
+        corr_profiles = [p for p in self.profiles if p['engine'] == 'corr']
+        for p in corr_profiles:
+            key = tuple(p[k] for k in bpf_keys)
+            if key not in self.bpf_index:
+                n, coefs, g = design_bpf(self.fs, p)
+                self.bpf_index[key] = len(designs)
+                designs.append((coefs, g))
+                ncoefs[key] = n
+        self.bpf = FIRBank(designs) if designs else None
+
+        # correlators, then a FIRBank of lowpass filters per correlator
+        self.corrs = {}  # (bpf row, delay) -> Correlator
+        self.lpfs  = {}  # corr key -> [FIRBank, {lpf key: row}, designs]
+        self.paths = []  # per profile (corr key, lpf row, Sampler), (None, None, engine) for block engines
+        self.flush_size = 0
+        for p in self.profiles:
+            if p['engine'] != 'corr':
+                # block engine on the input, same process() as a Sampler
+                from afsk.goertzel import GoertzelDemod
+                engine = GoertzelDemod(self.fs, p)
+                self.flush_size = max(self.flush_size, engine.flush_size)
+                self.paths.append((None, None, engine))
+                continue
+            row = self.bpf_index[tuple(p[k] for k in bpf_keys)]
+            delay = int(round(p['corr_delay']*self.fs))
+            ckey = (row, delay)
+            if ckey not in self.corrs:
+                self.corrs[ckey] = Correlator(delay)
+                self.lpfs[ckey] = [None, {}, []]
+            lkey = tuple(p[k] for k in lpf_keys)
+            rows = self.lpfs[ckey][1]
+            if lkey not in rows:
+                n, coefs, g = design_lpf(self.fs, p)
+                rows[lkey] = len(self.lpfs[ckey][2])
+                self.lpfs[ckey][2].append((coefs, g))
+                self.flush_size = max(self.flush_size,
+                                      int((n + ncoefs[tuple(p[k] for k in bpf_keys)])*(self.fs/1200)))
+            self.paths.append((ckey, rows[lkey], make_sampler(self.fs, p)))
+        for entry in self.lpfs.values():
+            entry[0] = FIRBank(entry[2])
+
+    def process(self, samples):
+        # [bits array] in profile order
+        x = np.asarray(samples, dtype = np.int64)
+        lp = {}
+        if self.bpf:
+            bp = self.bpf.process(x)
+            for ckey, corr in self.corrs.items():
+                lp[ckey] = self.lpfs[ckey][0].process(corr.process(bp[ckey[0]]))
+        return [sampler.process(x if ckey is None else lp[ckey][row]) for ckey, row, sampler in self.paths]
+
+def _addrs(ax25):
+    return (bytes(ax25.src.to_aprs()), bytes(ax25.dst.to_aprs()))
+
+class DemodBank():
+    # drop in for the AFSKDemodulator -> AX25FromAFSK pair: samples in,
+    # deduplicated AX25 frames out
+    def __init__(self, samples_in_q,
+                       ax25_out_q,
+                       sampling_rate = 22050,
+                       profiles      = BANK_PROFILES,
+                       window        = DEDUP_WINDOW,
+                       verbose       = False,
+                       ):
+        self.samples_q = samples_in_q
+        self.ax25_q    = ax25_out_q
+        self.fs        = sampling_rate
+        self.verbose   = verbose
+        self.chains    = DemodChains(sampling_rate, profiles)
+        self.flush_size = self.chains.flush_size
+        self.dedup     = FrameDeduplicator(window = window, clock = None)
+        self.nsamples  = 0
+        self.bits_qs   = [Queue() for p in profiles]
+        self.frames_qs = [Queue() for p in profiles]
+        self.crc_qs    = [Queue() for p in profiles]
+        self.deframers = [AX25FromAFSK(bits_in_q = b, ax25_q = f, ax25_crc_err_q = c, verbose = verbose, fix = False)
+                          for b,f,c in zip(self.bits_qs, self.frames_qs, self.crc_qs)]
+        self.held      = [] # (profile, frame bytes, partial decode) of the previous block
+        self.addrs     = [set(), set()] # (src, dst) merged in the previous and this block
+        self.stats = {
+            'frames'      : 0,
+            'duplicates'  : 0,
+            'fix_skipped' : 0, # another profile decoded the packet
+            'fix_shared'  : 0, # same corrupt bits as another profile
+            'profiles'    : [{'ax25' : 0, 'first' : 0} for p in profiles], # decoded, passed on
+        }
+        self.tasks = []
+
+    async def __aenter__(self):
+        for d in self.deframers:
+            await d.__aenter__()
+        self.tasks.append(asyncio.create_task(self.process_samples()))
+        return self
+
+    async def __aexit__(self, *args):
+        _.for_each(self.tasks, lambda t: t.cancel())
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        for d in self.deframers:
+            await d.__aexit__(*args)
+
+    async def process_samples(self):
+        try:
+            while True:
+                arr,arr_size = await self.samples_q.get()
+                await self.process(arr[:arr_size])
+                self.samples_q.task_done()
+        except Exception as err:
+            print_exc(err)
+
+    async def process(self, samples):
+        bits = self.chains.process(samples)
+        self.nsamples += len(samples)
+        now = self.nsamples/self.fs
+        for k,b in enumerate(bits):
+            q = self.bits_qs[k]
+            for x in b.tolist():
+                q.put_nowait(x)
+        self.addrs = [self.addrs[1], set()]
+        held = []
+        for k in range(len(bits)):
+            await self.bits_qs[k].join()
+            q = self.frames_qs[k]
+            while not q.empty():
+                await self.merge(k, q.get_nowait(), now)
+            q = self.crc_qs[k]
+            while not q.empty():
+                held.append((k,) + q.get_nowait())
+        await self.fix(now)
+        self.held = held
+
+    async def fix(self, now):
+        # fix the corrupt frames held from the previous block
+        done = set()
+        for k, buf, _ax25 in self.held:
+            if buf in done:
+                self.stats['fix_shared'] += 1
+                continue
+            done.add(buf)
+            if _ax25.src and _ax25.dst and\
+               _addrs(_ax25) in self.addrs[0] | self.addrs[1]:
+                self.stats['fix_skipped'] += 1
+                continue
+            ax25 = self.deframers[k].fix_frame(memoryview(bytearray(buf)), _ax25)
+            if ax25:
+                await self.merge(k, ax25, now)
+        self.held = []
+
+    async def drain(self):
+        # fix what the last block left, at the end of a finite stream
+        self.addrs = [self.addrs[1], set()]
+        await self.fix(self.nsamples/self.fs)
+
+    async def merge(self, k, ax25, now):
+        pstats = self.stats['profiles'][k]
+        pstats['ax25'] += 1
+        self.addrs[1].add(_addrs(ax25))
+        if self.dedup.is_duplicate(frame_crc(ax25), now):
+            self.stats['duplicates'] += 1
+            return
+        pstats['first'] += 1
+        self.stats['frames'] += 1
+        await self.ax25_q.put(ax25)
+
+async def demod_samples_bank(samples,
+                             sampling_rate = 48000,
+                             profiles      = BANK_PROFILES,
+                             window        = DEDUP_WINDOW,
+                             chunk_size    = 4800,
+                             stats         = None,
+                             ):
+    # afsk.decode.demod_samples through a bank, [(sample offset, AX25)]
+    samples_q = Queue()
+    ax25_q    = Queue()
+    frames    = []
+    async with DemodBank(samples_in_q  = samples_q,
+                         ax25_out_q    = ax25_q,
+                         sampling_rate = sampling_rate,
+                         profiles      = profiles,
+                         window        = window,
+                         ) as bank:
+        nsamples = len(samples)
+        flush = np.zeros(bank.flush_size, dtype = np.int16)
+        idx = 0
+        while idx < nsamples + len(flush):
+            arr = samples[idx:idx+chunk_size] if idx < nsamples else flush
+            await samples_q.put((arr, len(arr)))
+            idx += len(arr)
+            await samples_q.join()
+            while not ax25_q.empty():
+                frames.append((min(idx, nsamples), ax25_q.get_nowait()))
+        await bank.drain()
+        while not ax25_q.empty():
+            frames.append((nsamples, ax25_q.get_nowait()))
+        if stats is not None:
+            stats.update(bank.stats)
+            for k,d in enumerate(bank.deframers):
+                stats['profiles'][k].update(d.stats)
+        return frames
+
+def decode_samples_bank(samples,
+                        sampling_rate = 48000,
+                        profiles      = BANK_PROFILES,
+                        window        = DEDUP_WINDOW,
+                        chunk_size    = 4800,
+                        stats         = None,
+                        ):
+    return asyncio.run(demod_samples_bank(samples       = samples,
+                                          sampling_rate = sampling_rate,
+                                          profiles      = profiles,
+                                          window        = window,
+                                          chunk_size    = chunk_size,
+                                          stats         = stats,
+                                          ))
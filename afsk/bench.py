@@ -0,0 +1,162 @@
+import time
+import random
+import asyncio
+
+import numpy as np
+
+from afsk.mod import AFSKModulator
+from afsk.decode import decode_samples
+from afsk.bank import decode_samples_bank
+from afsk.channel import apply_channel
+from ax25.ax25 import AX25
+
+# Packet error rate benchmark. A corpus of random APRS packets is modulated
+# once, then every channel condition (see afsk.channel) is applied to the
+# whole corpus and decoded through the live decode chain. Decoded frames are
+# matched against the transmitted ones, so a bit-flip fix that produced the
+# wrong frame counts as false, not decoded.
+
+FLAGS_BEFORE = 10
+FLAGS_AFTER  = 4
+GAP_S        = 0.1
+AMPLITUDE    = 0x3fff  # headroom for noise and emphasis
+
+# name : apply_channel kwargs
+CONDITIONS = {
+    'clean'        : {},
+    'snr20'        : {'snr_db' : 20},
+    'snr10'        : {'snr_db' : 10},
+    'snr6'         : {'snr_db' : 6},
+    'snr3'         : {'snr_db' : 3},
+    'offset+50'    : {'snr_db' : 20, 'freq_offset' : 50},
+    'offset-100'   : {'snr_db' : 20, 'freq_offset' : -100},
+    'twist+6'      : {'snr_db' : 20, 'twist_db' : 6},
+    'twist-6'      : {'snr_db' : 20, 'twist_db' : -6},
+    'preemph'      : {'snr_db' : 20, 'preemph_tau' : 75e-6},
+    'preemph_snr6' : {'snr_db' : 6,  'preemph_tau' : 75e-6},
+}
+
+_CALLS = ('N0CALL', 'KI5TOF', 'VE2FPD', 'W1AW', 'K2ABC', 'WB6XYZ')
+_PATHS = ('', ',WIDE1-1', ',WIDE1-1,WIDE2-1', ',WIDE2-2')
+_TEXT  = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 .,/-'
+
+def random_packets(npackets, seed = 0):
+    # aprs lines with varying length and path, numbered so each one is unique
+    rnd = random.Random(seed)
+    packets = []
+    for i in range(npackets):
+        text = ''.join(rnd.choice(_TEXT) for x in range(rnd.randint(10, 80)))
+        packets.append('{}>APRS{}:>{:05d} {}'.format(rnd.choice(_CALLS), rnd.choice(_PATHS), i, text).encode())
+    return packets
+
+async def _modulate(packets, sampling_rate):
+    out = []
+    async with AFSKModulator(sampling_rate = sampling_rate,
+                             amplitude     = AMPLITUDE) as afsk_mod:
+        for aprs in packets:
+            afsk, stop_bit = AX25(aprs = aprs).to_afsk()
+            await afsk_mod.send_flags(FLAGS_BEFORE)
+            await afsk_mod.to_samples(afsk = afsk, stop_bit = stop_bit)
+            await afsk_mod.send_flags(FLAGS_AFTER)
+            arr, s = await afsk_mod.flush()
+            out.append(np.array(arr[:s], dtype = np.int16))
+    return out
+
+class Corpus():
+    # packets modulated back to back with GAP_S of silence after each one
+    def __init__(self, npackets = 100, sampling_rate = 22050, seed = 0):
+        self.sampling_rate = sampling_rate
+        self.seed    = seed
+        self.packets = random_packets(npackets, seed)
+        bursts = asyncio.run(_modulate(self.packets, sampling_rate))
+        gap = np.zeros(int(GAP_S*sampling_rate), dtype = np.int16)
+        self.samples = np.concatenate([x for b in bursts for x in (gap, b)] + [gap]) if bursts else gap
+        signal = np.concatenate(bursts).astype(np.float64) if bursts else np.zeros(0)
+        # snr is against the packets, not the gaps
+        self.signal_power = float(np.mean(np.square(signal))) if len(signal) else 0.
+
+    @property
+    def seconds(self):
+        return len(self.samples)/self.sampling_rate
+
+    def __len__(self):
+        return len(self.packets)
+
+    def __repr__(self):
+        return 'Corpus({} packets, {:.1f}s at {} Hz, seed {})'.format(len(self.packets), self.seconds,
+                                                                  self.sampling_rate, self.seed)
+
+def run_condition(corpus, channel = {}, options = {}, seed = 0, bank = None):
+    # decode corpus through channel, returns the counters of one report entry.
+    # bank: list of option overrides on top of options, decoded by a DemodBank
+    rng = np.random.default_rng(seed)
+    samples = apply_channel(corpus.samples, corpus.sampling_rate,
+                            signal_power = corpus.signal_power,
+                            rng          = rng,
+                            **channel)
+    stats = {}
+    cpu0 = time.process_time()
+    t0   = time.monotonic()
+    if bank:
+        frames = decode_samples_bank(samples, sampling_rate = corpus.sampling_rate,
+                                     profiles = [dict(options, **p) for p in bank], stats = stats)
+        # fixes and crc errors summed over the profiles
+        for k in ('fixed_src_dst', 'fixed_info', 'crc_errors'):
+            stats[k] = sum(p.get(k, 0) for p in stats['profiles'])
+    else:
+        frames = decode_samples(samples, sampling_rate = corpus.sampling_rate, options = options, stats = stats)
+    cpu  = time.process_time() - cpu0
+    wall = time.monotonic() - t0
+
+    expected = set(corpus.packets)
+    decoded = set()
+    false = 0
+    for _, ax25 in frames:
+        aprs = bytes(ax25.to_aprs())
+        if aprs in expected:
+            decoded.add(aprs)
+        else:
+            false += 1
+    return {
+        'channel'          : dict(channel),
+        'packets'          : len(corpus),
+        'decoded'          : len(decoded),
+        'per'              : 1. - len(decoded)/len(corpus) if len(corpus) else 0.,
+        'false'            : false,
+        'fixed'            : stats.get('fixed_src_dst', 0) + stats.get('fixed_info', 0),
+        'crc_errors'       : stats.get('crc_errors', 0),
+        'cpu_s'            : cpu,
+        'wall_s'           : wall,
+        'cpu_per_audio_s'  : cpu/corpus.seconds if corpus.seconds else 0.,
+    }
+
+def run_benchmark(corpus, conditions = CONDITIONS, options = {}, seed = 0, on_result = None, bank = None):
+    # {'corpus': ..., 'options': ..., 'conditions': {name: run_condition()}, 'total': ...}
+    results = {}
+    for name, channel in conditions.items():
+        results[name] = run_condition(corpus, channel, options, seed, bank)
+        if on_result:
+            on_result(name, results[name])
+    packets = sum(r['packets'] for r in results.values())
+    decoded = sum(r['decoded'] for r in results.values())
+    cpu     = sum(r['cpu_s'] for r in results.values())
+    return {
+        'corpus' : {
+            'packets'       : len(corpus),
+            'seconds'       : corpus.seconds,
+            'sampling_rate' : corpus.sampling_rate,
+            'seed'          : corpus.seed,
+        },
+        'options'    : dict(options),
+        'bank'       : bank,
+        'conditions' : results,
+        'total' : {
+            'packets'         : packets,
+            'decoded'         : decoded,
+            'per'             : 1. - decoded/packets if packets else 0.,
+            'false'           : sum(r['false'] for r in results.values()),
+            'fixed'           : sum(r['fixed'] for r in results.values()),
+            'cpu_s'           : cpu,
+            'cpu_per_audio_s' : cpu/(corpus.seconds*len(results)) if results and corpus.seconds else 0.,
+        },
+    }
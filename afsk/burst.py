@@ -0,0 +1,168 @@
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from afsk.decode import decode_samples
+
+from lib.compat import print_exc
+
+# Cut a continuous audio stream into discrete transmissions (bursts).
+# The gate is the same mean(abs(x)) > threshold test the QueueSink uses, but
+# evaluated per block so the result does not depend on how GNU Radio chunks
+# the stream. Each burst carries pre- and post-roll padding so the demod
+# filters and the AX25 flag search see the start/end of the transmission.
+
+class Burst():
+    __slots__ = (
+        'samples',   # np.int16 array
+        'start',     # sample index of the first sample in the stream
+        'timestamp', # wall clock time of the first sample
+    )
+    def __init__(self, samples, start, timestamp):
+        self.samples   = samples
+        self.start     = start
+        self.timestamp = timestamp
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __repr__(self):
+        return 'Burst(start={}, len={}, t={:.3f})'.format(self.start, len(self.samples), self.timestamp)
+
+class BurstSegmenter():
+    def __init__(self, sampling_rate = 48000,
+                       threshold     = 500,
+                       block_size    = 480,
+                       pre_roll      = 0.1,  # seconds kept before the gate opens
+                       post_roll     = 0.1,  # seconds of quiet before the gate closes
+                       max_length    = 10.0, # force cut very long bursts (seconds)
+                       ):
+        self.fs         = sampling_rate
+        self.threshold  = threshold
+        self.block_size = block_size
+        self.pre_blocks  = max(1, int(round(pre_roll*sampling_rate/block_size)))
+        self.post_blocks = max(1, int(round(post_roll*sampling_rate/block_size)))
+        self.max_blocks  = max(1, int(max_length*sampling_rate/block_size))
+
+        self._pre    = deque(maxlen = self.pre_blocks) # (block, start, timestamp)
+        self._burst  = None # list of blocks of the active burst
+        self._start  = 0
+        self._ts     = 0.
+        self._quiet  = 0
+        self._pend   = np.zeros(0, dtype=np.int16) # partial block carried over
+        self._idx    = 0 # stream index of the first sample in _pend
+
+    def feed(self, samples, timestamp = None):
+        # samples: int16 array, timestamp: wall clock of samples[0]
+        # returns the list of bursts completed by this block
+        if timestamp is None:
+            timestamp = time.time()
+        # always a copy, blocks of buf outlive the call in _pre and _burst
+        # and the caller may reuse samples (gnuradio input buffers)
+        if len(self._pend):
+            buf = np.concatenate((self._pend, samples))
+        else:
+            buf = np.array(samples, dtype=np.int16)
+        t0 = timestamp - len(self._pend)/self.fs
+        bs = self.block_size
+        nblocks = len(buf)//bs
+        bursts = []
+        if nblocks:
+            blocks = buf[:nblocks*bs].reshape(nblocks, bs)
+            energy = np.mean(np.abs(blocks.astype(np.int32)), axis=1)
+            for i in range(nblocks):
+                b = self._block(blocks[i],
+                                active    = energy[i] > self.threshold,
+                                start     = self._idx + i*bs,
+                                timestamp = t0 + i*bs/self.fs)
+                if b:
+                    bursts.append(b)
+        self._pend   = buf[nblocks*bs:].copy()
+        self._idx   += nblocks*bs
+        return bursts
+
+    def flush(self):
+        # close the active burst, if any, with the partial block carried over
+        if self._burst:
+            if len(self._pend):
+                self._burst.append(self._pend)
+                self._idx += len(self._pend)
+                self._pend = np.zeros(0, dtype=np.int16)
+            return [self._close()]
+        return []
+
+    def _block(self, block, active, start, timestamp):
+        if self._burst is None:
+            if not active:
+                self._pre.append((block, start, timestamp))
+                return None
+            #gate opens, start with the pre-roll
+            if self._pre:
+                _, self._start, self._ts = self._pre[0]
+            else:
+                self._start, self._ts = start, timestamp
+            self._burst = [b for b,_,_ in self._pre]
+            self._pre.clear()
+            self._quiet = 0
+        self._burst.append(block)
+        self._quiet = 0 if active else self._quiet + 1
+        if self._quiet >= self.post_blocks or len(self._burst) >= self.max_blocks:
+            return self._close()
+        return None
+
+    def _close(self):
+        b = Burst(samples   = np.concatenate(self._burst),
+                  start     = self._start,
+                  timestamp = self._ts)
+        self._burst = None
+        self._quiet = 0
+        return b
+
+def decode_burst(samples, sampling_rate = 48000, options = {}):
+    # process pool entry point, returns the AX25 frames only
+    return [ax25 for _,ax25 in decode_samples(samples       = samples,
+                                              sampling_rate = sampling_rate,
+                                              options       = options)]
+
+class BurstDecoder():
+    # Decode bursts in parallel on a process pool. Each completed burst is
+    # handed to callback(burst, frames) from the executor's result thread, so
+    # a slow burst never holds up the ones behind it.
+    def __init__(self, callback,
+                       sampling_rate = 48000,
+                       workers       = None,
+                       options       = {},
+                       ):
+        self.callback = callback
+        self.fs       = sampling_rate
+        self.options  = options
+        self.workers  = workers or os.cpu_count() or 1
+        self.pool     = ProcessPoolExecutor(max_workers = self.workers)
+        self.pending  = 0
+        self.decoded  = 0
+        self.failed   = 0
+
+    def submit(self, burst):
+        self.pending += 1
+        fut = self.pool.submit(decode_burst, burst.samples, self.fs, self.options)
+        fut.add_done_callback(lambda f: self._done(burst, f))
+        return fut
+
+    def _done(self, burst, fut):
+        self.pending -= 1
+        try:
+            frames = fut.result()
+        except Exception as err:
+            self.failed += 1
+            print_exc(err)
+            return
+        self.decoded += 1
+        self.callback(burst, frames)
+
+    def shutdown(self, wait = True, cancel = False):
+        # cancel: drop the bursts not started yet
+        self.pool.shutdown(wait = wait, cancel_futures = cancel)
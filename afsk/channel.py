@@ -0,0 +1,86 @@
+import math
+
+import numpy as np
+
+# Audio channel impairments for measuring the demod. Everything works on
+# float audio blocks (whole packets or a whole corpus), shaping is done in
+# the frequency domain so the filters have no transient of their own.
+#
+#   pre-emphasis   transmitter without the matching receive de-emphasis,
+#                  6 dB/octave above 1/(2 pi tau), ~+4 dB at 2200 vs 1200 for 75us
+#   twist          space tone gain relative to the mark tone in dB, interpolated
+#                  in dB between 1200 and 2200, flat outside
+#   freq offset    every tone moved by hz, a mistuned ssb receiver
+#   awgn           white noise, snr over the whole band
+#
+# apply_channel() chains them in that order. Tone gains are normalized to the
+# mark tone, so twist and pre-emphasis change the space level only.
+
+FMARK  = 1200
+FSPACE = 2200
+
+def _shape(x, fs, gain_fn):
+    # multiply the spectrum of x by gain_fn(f), real in -> real out
+    n = len(x)
+    if not n:
+        return x
+    X = np.fft.rfft(x)
+    f = np.fft.rfftfreq(n, 1./fs)
+    return np.fft.irfft(X*gain_fn(f), n)
+
+def preemphasis(x, fs, tau = 75e-6):
+    # H = 1 + j w tau, normalized to unity at the mark tone
+    def h(f):
+        return (1 + 2j*math.pi*f*tau)/abs(1 + 2j*math.pi*FMARK*tau)
+    return _shape(x, fs, h)
+
+def twist(x, fs, db):
+    # positive db: space louder than mark
+    def g(f):
+        gdb = db*np.clip((f - FMARK)/(FSPACE - FMARK), 0., 1.)
+        return 10**(gdb/20.)
+    return _shape(x, fs, g)
+
+def freq_shift(x, fs, hz):
+    # single sideband shift of the analytic signal
+    n = len(x)
+    if not n or not hz:
+        return x
+    X = np.fft.fft(x)
+    h = np.zeros(n)
+    h[0] = 1
+    if n % 2:
+        h[1:(n+1)//2] = 2
+    else:
+        h[n//2] = 1
+        h[1:n//2] = 2
+    analytic = np.fft.ifft(X*h)
+    return (analytic*np.exp(2j*math.pi*hz/fs*np.arange(n))).real
+
+def awgn(x, snr_db, rng, signal_power = None):
+    # signal_power: mean power to measure the snr against, default the
+    # power of x (silence included)
+    if signal_power is None:
+        signal_power = float(np.mean(np.square(x))) if len(x) else 0.
+    sigma = math.sqrt(signal_power/10**(snr_db/10.))
+    return x + rng.normal(0., sigma, len(x))
+
+def apply_channel(samples, fs,
+                  snr_db      = None,  # None for no noise
+                  freq_offset = 0.,    # hz
+                  twist_db    = 0.,
+                  preemph_tau = 0.,    # seconds, 0 for none
+                  signal_power = None,
+                  rng         = None,
+                  ):
+    # int16 (or float) samples in, int16 samples out, clipped
+    x = np.asarray(samples, dtype = np.float64)
+    if preemph_tau:
+        x = preemphasis(x, fs, preemph_tau)
+    if twist_db:
+        x = twist(x, fs, twist_db)
+    if freq_offset:
+        x = freq_shift(x, fs, freq_offset)
+    if snr_db is not None:
+        x = awgn(x, snr_db, rng if rng is not None else np.random.default_rng(), signal_power)
+    return np.clip(np.rint(x), -32768, 32767).astype(np.int16)
@@ -0,0 +1,73 @@
+
+import asyncio
+from array import array
+
+from afsk.demod import AFSKDemodulator
+from ax25.from_afsk import AX25FromAFSK
+
+from lib.compat import Queue
+
+# Decode a finite block of audio samples (e.g. a burst or a file segment)
+# through the same AFSKDemodulator -> AX25FromAFSK chain used by the live
+# receiver. Samples are fed in chunks of chunk_size and the pipeline is
+# drained after each chunk, so every frame is tagged with the sample offset
+# of the chunk it completed in. Pass a dict as stats to get the
+# AX25FromAFSK counters (frames decoded as received, fixed by bit flips).
+
+_DECODE_CHUNK = 4800
+
+async def demod_samples(samples,
+                        sampling_rate = 48000,
+                        options       = {},
+                        chunk_size    = _DECODE_CHUNK,
+                        stats         = None,
+                        ):
+    samples_q = Queue()
+    bits_q    = Queue()
+    ax25_q    = Queue()
+    frames    = [] # (sample offset, AX25)
+
+    async with AFSKDemodulator(sampling_rate = sampling_rate,
+                               samples_in_q  = samples_q,
+                               bits_out_q    = bits_q,
+                               options       = options,
+                               ) as afsk_demod:
+        async with AX25FromAFSK(bits_in_q = bits_q,
+                                ax25_q    = ax25_q,
+                                ) as bits2ax25:
+            nsamples = len(samples)
+            # zeros at the end to flush the internal filters
+            flush = array('h', (0 for x in range(afsk_demod.flush_size)))
+            idx = 0
+            while idx < nsamples + len(flush):
+                if idx < nsamples:
+                    arr = samples[idx:idx+chunk_size]
+                    if hasattr(arr, 'tolist'):
+                        arr = arr.tolist()
+                else:
+                    arr = flush
+                await samples_q.put((arr, len(arr)))
+                idx += len(arr)
+                await samples_q.join()
+                await bits_q.join()
+                while not ax25_q.empty():
+                    frames.append((min(idx, nsamples), ax25_q.get_nowait()))
+            if stats is not None:
+                for k,v in bits2ax25.stats.items():
+                    stats[k] = stats.get(k, 0) + v
+            return frames
+
+def decode_samples(samples,
+                   sampling_rate = 48000,
+                   options       = {},
+                   chunk_size    = _DECODE_CHUNK,
+                   stats         = None,
+                   ):
+    # synchronous wrapper, runs the decode in a private event loop so it can
+    # be called from worker threads/processes
+    return asyncio.run(demod_samples(samples       = samples,
+                                     sampling_rate = sampling_rate,
+                                     options       = options,
+                                     chunk_size    = chunk_size,
+                                     stats         = stats,
+                                     ))
@@ -15,13 +15,108 @@ from lib.memoize import memoize_dumps
 
 from afsk.func import create_unnrzi
 from afsk.func import create_corr
+from afsk.func import CORRELATOR_DELAY
 from afsk.func import lpf_fir_design
 from afsk.func import bandpass_fir_design
 from afsk.func import create_sampler
+from afsk.func import create_pll_sampler
+from afsk.func import PLL_INERTIA
 from afsk.func import create_fir
 
 from lib.compat import print_exc
 
+FMARK  = 1200
+FSPACE = 2200
+
+DEFAULT_OPTIONS = {
+    'bandpass_ncoefsbaud' : 3,
+    'bandpass_width'      : 460,
+    'bandpass_amark'      : 7,
+    'bandpass_aspace'     : 24,
+    'lpf_ncoefsbaud'      : 4,
+    'lpf_f'               : 1000,
+    'lpf_width'           : 360,
+    'lpf_aboost'          : 3,
+    'corr_delay'          : CORRELATOR_DELAY,
+    'slicer_threshold'    : 0,
+    'clock'               : 'zc',   # bit timing, 'zc' zero crossing run lengths or 'pll'
+    'pll_inertia'         : PLL_INERTIA,
+    'engine'              : 'corr', # 'corr' or 'goertzel' (afsk.goertzel, needs numpy)
+    'goertzel_rate'       : 16000,  # decimated rate, at least this fast
+    'goertzel_window'     : 1.,     # tone sum window in bauds
+    'goertzel_smooth'     : .5,     # energy smoothing window in bauds
+    'goertzel_twist'      : 0,      # space gain dB
+}
+
+ENGINES = ('corr', 'goertzel')
+CLOCKS  = ('zc', 'pll')
+
+def odd_ncoefs(fs, ncoefsbaud):
+    # filter length in mark periods, rounded up to odd
+    nmark = int((1/FMARK)/(1/fs))
+    n = int(nmark*ncoefsbaud)
+    return n if n%2==1 else n+1
+
+def design_bpf(fs, options, do_memoize = True):
+    # (ncoefs, coefs, scale) of the mark/space bandpass, options complete
+    bandpass_ncoefs = odd_ncoefs(fs, options['bandpass_ncoefsbaud'])
+    bandpass_width = options['bandpass_width']
+    bandpass_amark = options['bandpass_amark']
+    bandpass_aspace = options['bandpass_aspace']
+    if do_memoize:
+        coefs_g = memoize_loads('bpf', FMARK, FSPACE, fs,
+                                       bandpass_ncoefs,
+                                       bandpass_width,
+                                       bandpass_amark,
+                                       bandpass_aspace)
+    else:
+        coefs_g = None
+    if coefs_g:
+        coefs,g = coefs_g
+    else:
+        coefs,g = bandpass_fir_design(ncoefs = bandpass_ncoefs,
+                                      fmark  = FMARK,
+                                      fspace = FSPACE,
+                                      fs     = fs,
+                                      width  = bandpass_width,
+                                      amark  = bandpass_amark,
+                                      aspace = bandpass_aspace,
+                                      )
+        memoize_dumps('bpf', (coefs,g), FMARK, FSPACE, fs,
+                                       bandpass_ncoefs,
+                                       bandpass_width,
+                                       bandpass_amark,
+                                       bandpass_aspace)
+    return bandpass_ncoefs, coefs, g
+
+def design_lpf(fs, options, do_memoize = True):
+    # (ncoefs, coefs, scale) of the correlator output lowpass, options complete
+    lpf_ncoefs = odd_ncoefs(fs, options['lpf_ncoefsbaud'])
+    lpf_width = options['lpf_width']
+    lpf_aboost = options['lpf_aboost']
+    lpf_f = options['lpf_f']
+    if do_memoize:
+        coefs_g = memoize_loads('lpf', lpf_f, fs,
+                                       lpf_ncoefs,
+                                       lpf_width,
+                                       lpf_aboost)
+    else:
+        coefs_g = None
+    if coefs_g:
+        coefs,g = coefs_g
+    else:
+        coefs,g = lpf_fir_design(ncoefs = lpf_ncoefs,
+                                 fa     = lpf_f,
+                                 fs     = fs,
+                                 width  = lpf_width,
+                                 aboost = lpf_aboost,
+                                 )
+        memoize_dumps('lpf', (coefs,g), lpf_f, fs,
+                                       lpf_ncoefs,
+                                       lpf_width,
+                                       lpf_aboost)
+    return lpf_ncoefs, coefs, g
+
 class AFSKDemodulator():
     def __init__(self, samples_in_q,
                        bits_out_q,
@@ -47,16 +142,19 @@ class AFSKDemodulator():
         do_memoize = True
         if options:
             eprint('OPTIONS: {}'.format(options))
-        options = dict({
-            'bandpass_ncoefsbaud' : 3,
-            'bandpass_width'      : 460,
-            'bandpass_amark'      : 7,
-            'bandpass_aspace'     : 24,
-            'lpf_ncoefsbaud'      : 4,
-            'lpf_f'               : 1000,
-            'lpf_width'           : 360,
-            'lpf_aboost'          : 3,
-        }, **options)
+        options = dict(DEFAULT_OPTIONS, **options)
+        if options['engine'] not in ENGINES:
+            raise Exception('unknown demod engine {}, known: {}'.format(options['engine'], ', '.join(ENGINES)))
+        if options['clock'] not in CLOCKS:
+            raise Exception('unknown demod clock {}, known: {}'.format(options['clock'], ', '.join(CLOCKS)))
+        self.tasks = []
+
+        self.engine = None
+        if options['engine'] == 'goertzel':
+            from afsk.goertzel import GoertzelDemod
+            self.engine = GoertzelDemod(self.fs, options)
+            self.flush_size = self.engine.flush_size
+            return
         # options = dict({
             # 'bandpass_ncoefsbaud' : 5,
             # 'bandpass_width'      : 460,
@@ -68,80 +166,29 @@ class AFSKDemodulator():
             # 'lpf_aboost'          : 3,
         # }, **options)
 
-        nmark = int(self.tmark/self.ts)
-        bandpass_ncoefsbaud = options['bandpass_ncoefsbaud']
-        bandpass_ncoefs = int(nmark*bandpass_ncoefsbaud) if int(nmark*bandpass_ncoefsbaud)%2==1 else int(nmark*bandpass_ncoefsbaud)+1
-        bandpass_width = options['bandpass_width']
-        bandpass_amark = options['bandpass_amark']
-        bandpass_aspace = options['bandpass_aspace']
-        if do_memoize:
-            coefs_g = memoize_loads('bpf', self.fmark, self.fspace, self.fs, 
-                                           bandpass_ncoefs,
-                                           bandpass_width, 
-                                           bandpass_amark, 
-                                           bandpass_aspace)
-        else:
-            coefs_g = None
-        if coefs_g:
-            coefs,g = coefs_g
-        else: 
-            coefs,g = bandpass_fir_design(ncoefs = bandpass_ncoefs,
-                                          fmark  = self.fmark,
-                                          fspace = self.fspace,
-                                          fs     = self.fs,
-                                          width  = bandpass_width,
-                                          amark  = bandpass_amark,
-                                          aspace = bandpass_aspace,
-                                          )
-            memoize_dumps('bpf', (coefs,g), self.fmark, self.fspace, self.fs,
-                                           bandpass_ncoefs,
-                                           bandpass_width, 
-                                           bandpass_amark, 
-                                           bandpass_aspace)
+        bandpass_ncoefs, coefs, g = design_bpf(self.fs, options, do_memoize)
         self.bpf = create_fir(coefs = coefs, scale = g)
 
 
-        self.corr = create_corr(ts    = self.ts,)
-
-        nmark = int(self.tmark/self.ts)
-        lpf_ncoefsbaud = options['lpf_ncoefsbaud']
-        lpf_ncoefs = int(nmark*lpf_ncoefsbaud) if int(nmark*lpf_ncoefsbaud)%2==1 else int(nmark*lpf_ncoefsbaud)+1
-        lpf_width = options['lpf_width']
-        lpf_aboost = options['lpf_aboost']
-        lpf_f = options['lpf_f']
+        self.corr = create_corr(ts    = self.ts,
+                                delay = options['corr_delay'])
 
-        if do_memoize:
-            coefs_g = memoize_loads('lpf', lpf_f, self.fs, 
-                                           lpf_ncoefs, 
-                                           lpf_width, 
-                                           lpf_aboost)
-        else:
-            coefs_g = None
-        if coefs_g:
-            coefs,g = coefs_g
-        else: 
-            coefs,g = lpf_fir_design(ncoefs = lpf_ncoefs,
-                                     fa     = lpf_f,
-                                     fs     = self.fs,
-                                     width  = lpf_width,
-                                     aboost = lpf_aboost,
-                                     )
-            memoize_dumps('lpf', (coefs,g), lpf_f, self.fs,
-                                           lpf_ncoefs, 
-                                           lpf_width, 
-                                           lpf_aboost)
-        # eprint(coefs)
-        # eprint(g)
+        lpf_ncoefs, coefs, g = design_lpf(self.fs, options, do_memoize)
         self.lpf = create_fir(coefs = coefs, scale = g)
-        self.sampler = create_sampler(fbaud = self.fbaud,
-                                      fs    = self.fs)
+        if options['clock'] == 'pll':
+            self.sampler = create_pll_sampler(fbaud     = self.fbaud,
+                                              fs        = self.fs,
+                                              threshold = options['slicer_threshold'],
+                                              inertia   = options['pll_inertia'])
+        else:
+            self.sampler = create_sampler(fbaud     = self.fbaud,
+                                          fs        = self.fs,
+                                          threshold = options['slicer_threshold'])
         self.unnrzi = create_unnrzi()
 
         #how much we need to flush internal filters to process all sampled data
         self.flush_size = int((lpf_ncoefs+bandpass_ncoefs)*(self.tbaud/self.ts))
 
-        self.tasks = []
-
     async def __aenter__(self):
         self.tasks.append(asyncio.create_task(self.process_samples()))
         return self
@@ -151,6 +198,8 @@ class AFSKDemodulator():
         await asyncio.gather(*self.tasks, return_exceptions=True)
 
     async def process_samples(self):
+        if self.engine:
+            return await self.process_blocks()
         try:
             # Process a chunk of samples
             corr     = self.corr
@@ -183,6 +232,17 @@ class AFSKDemodulator():
         except Exception as err:
             print_exc(err)
 
+    async def process_blocks(self):
+        # block engines output bits already un-nrzi'd
+        try:
+            while True:
+                arr,arr_size = await self.samples_q.get()
+                for b in self.engine.process(arr[:arr_size]).tolist():
+                    await self.bits_q.put(b)
+                self.samples_q.task_done()
+        except Exception as err:
+            print_exc(err)
+
     # def analyze(self,start_from = 100e-3):
         # o = self.o
         # m   = max([max(o),abs(min(o))])
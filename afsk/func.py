@@ -141,9 +141,9 @@ def create_unnrzi():
     return inner
 
 CORRELATOR_DELAY = 446e-6
-def create_corr(ts,):
+def create_corr(ts, delay = CORRELATOR_DELAY):
     if IS_UPY:
-        delay = int(round(CORRELATOR_DELAY/ts)) #correlator delay (index)
+        delay = int(round(delay/ts)) #correlator delay (index)
         idx = 0
         _dat = array('i', (0 for x in range(delay)))
         _c = array('i',[idx, delay])
@@ -181,7 +181,7 @@ def create_corr(ts,):
                 return o
     else:
         # PYTHON
-        delay = int(round(CORRELATOR_DELAY/ts)) #correlator delay (index)
+        delay = int(round(delay/ts)) #correlator delay (index)
         dat = array('i', (0 for x in range(delay)))
         idx = 0
         def inner(v:int)->int:
@@ -291,7 +291,9 @@ def bandpass_fir_design(ncoefs,            # filter size
     return coefs,g
 
 def create_sampler(fbaud, 
-                   fs, ):
+                   fs,
+                   threshold = 0, # slicer level, the lpf output is compared to it
+                   ):
     tbaud = fs/fbaud #inverted for t
     ibaud = round(tbaud) #integer step
     ibaud_2 = round(tbaud/2)
@@ -312,13 +314,13 @@ def create_sampler(fbaud,
                 buf[idx] = 0x7fffffff
             else:
                 buf[idx] = -0x7fffffff
-        if (buf[(idx-1)%buflen] > 0) != (buf[idx] > 0):
+        if (buf[(idx-1)%buflen] > threshold) != (buf[idx] > threshold):
             #detected crossing
             if lastx > ibaud_2 and lastx < ibaud*8:
                 oidx = (lastx - ibaud_2)//ibaud+1 #number of baud periods
                 # o = 1 if buf[idx-1]>0 else 0
                 # the correlator inverts mark/space, invert here to mark=1, space=0
-                o = 0 if buf[idx-1]>0 else 1
+                o = 0 if buf[idx-1]>threshold else 1
                 # print('*',''.join([str(o)]*oidx))
             else:
                 oidx = 0
@@ -333,4 +335,42 @@ def create_sampler(fbaud,
         return o
     return inner
 
+PLL_INERTIA = 0.74 # phase kept at each transition, lower locks faster but jitters more
+
+def create_pll_sampler(fbaud,
+                       fs,
+                       threshold = 0, # slicer level, as create_sampler
+                       inertia   = PLL_INERTIA,
+                       ):
+    # digital pll clock recovery. The phase counts bauds, transitions are
+    # expected at 0 and the slicer is sampled when the phase wraps at 0.5,
+    # mid bit. Each transition pulls the phase towards 0 by inertia. The
+    # transition and the sampling instants are interpolated between
+    # samples, so a baud does not have to be a whole number of samples.
+    step = fbaud/fs
+    ph = 0.
+    prev = 0
+    _NONE = 2
+    def inner(v:int)->int:
+        nonlocal ph, prev
+        o = _NONE
+        if (prev > threshold) != (v > threshold):
+            #detected crossing, a of the way from prev to v
+            a = (threshold - prev)/(v - prev)
+            p = ph + a*step
+            if p >= .5:
+                # sampled before the transition, old level
+                p -= 1
+                o = 0 if prev > threshold else 1
+            ph = p*inertia + (1 - a)*step
+        else:
+            ph += step
+        if ph >= .5:
+            ph -= 1
+            # the correlator inverts mark/space, invert here to mark=1, space=0
+            o = 0 if v > threshold else 1
+        prev = v
+        return o
+    return inner
+
 
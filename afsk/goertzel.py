@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from afsk.bank import make_sampler
+
+# Tone energy demod engine, options['engine'] = 'goertzel' of AFSKDemodulator.
+# Instead of the bandpass and delay correlator the audio is
+#   - lowpassed and decimated to about goertzel_rate
+#   - mixed down by the mark and by the space tone (quadrature, phase kept
+#     across blocks)
+#   - summed over a sliding window of goertzel_window bauds, which is a
+#     sliding goertzel / dft bin at each tone
+#   - the bin energies summed again over goertzel_smooth bauds, the mixer
+#     images ripple through a one baud window and make the slicer chatter
+#     around the transitions
+# and the slicer gets (Es - Em)/(Es + Em), positive for space like the
+# correlator output. The normalized difference does not depend on the level,
+# goertzel_twist (dB of space gain) evens out tilted audio. Everything runs
+# on NumPy blocks, the sampler is the one of the demod bank.
+
+FMARK  = 1200
+FSPACE = 2200
+FBAUD  = 1200
+
+_AA_TAPS_DECIM = 8  # anti alias taps per decimation step
+
+class SlidingSum():
+    # streaming sum of the last n columns of (rows, len) blocks
+    def __init__(self, rows, n, dtype = np.float64):
+        self.n = max(1, n)
+        self.hist = np.zeros((rows, self.n - 1), dtype = dtype)
+
+    def process(self, v):
+        z = np.concatenate((self.hist, v), axis = 1)
+        cs = np.concatenate((np.zeros((z.shape[0], 1), dtype = z.dtype), np.cumsum(z, axis = 1)), axis = 1)
+        if self.n > 1:
+            self.hist = z[:,z.shape[1]-(self.n-1):]
+        return cs[:,self.n:] - cs[:,:-self.n]
+
+class GoertzelDemod():
+    # samples in, unnrzi'd bits out, a block at a time
+    def __init__(self, sampling_rate, options):
+        self.fs = sampling_rate
+        self.decim = max(1, int(sampling_rate//options['goertzel_rate']))
+        self.fd = sampling_rate/self.decim
+
+        # anti alias lowpass, evaluated at the decimated points only
+        if self.decim > 1:
+            from scipy import signal
+            ntaps = _AA_TAPS_DECIM*self.decim + 1
+            cutoff = 0.45*self.fd # flat at the tones, folded noise is off the bins
+            self.aa = signal.firwin(ntaps, cutoff, fs = sampling_rate)[::-1]
+        else:
+            self.aa = np.ones(1)
+        self.aa_hist = np.zeros(len(self.aa) - 1)
+        self.offset = 0 # index of the next decimated sample in the next block
+
+        # mixers, phase in radians at the next decimated sample
+        self.w = np.array([2*math.pi*FMARK/self.fd, 2*math.pi*FSPACE/self.fd])
+        self.phase = np.zeros(2)
+
+        self.nwin = max(1, int(round(self.fd/FBAUD*options['goertzel_window'])))
+        self.nsmooth = max(1, int(round(self.fd/FBAUD*options['goertzel_smooth'])))
+        self.bins   = SlidingSum(2, self.nwin, np.complex128)
+        self.smooth = SlidingSum(2, self.nsmooth)
+        self.space_gain = 10**(options['goertzel_twist']/10.)
+
+        self.sampler = make_sampler(self.fd, options)
+
+        #how much we need to flush internal filters to process all sampled data
+        self.flush_size = int(len(self.aa) + (2*(self.nwin + self.nsmooth) + self.fd/FBAUD)*self.decim)
+
+    def decimate(self, x):
+        if not len(x):
+            return np.zeros(0)
+        buf = np.concatenate((self.aa_hist, x))
+        W = sliding_window_view(buf, len(self.aa))[self.offset::self.decim]
+        if len(self.aa_hist):
+            self.aa_hist = buf[len(buf)-len(self.aa_hist):]
+        self.offset = (self.offset + len(W)*self.decim) - len(x)
+        return W @ self.aa
+
+    def energies(self, y):
+        # (2, len(y)) smoothed bin energy at the mark and the space tone
+        n = len(y)
+        ph = self.phase[:,None] + self.w[:,None]*np.arange(n)
+        self.phase = (self.phase + self.w*n) % (2*math.pi)
+        s = self.bins.process(y[None,:]*np.exp(-1j*ph))
+        return self.smooth.process(s.real**2 + s.imag**2)
+
+    def process(self, samples):
+        x = np.asarray(samples, dtype = np.float64)
+        y = self.decimate(x)
+        if not len(y):
+            return np.zeros(0, dtype = np.uint8)
+        em, es = self.energies(y)
+        es = es*self.space_gain
+        return self.sampler.process((es - em)/(es + em + 1e-9))
@@ -10,6 +10,7 @@ from lib.compat import Queue
 
 from lib.utils import eprint
 from lib.compat import const
+from lib.compat import print_exc
 
 from afsk.sin_table import get_sin_table
 from afsk.func import gen_bits_from_bytes
@@ -109,7 +110,7 @@ class AFSKModulator():
             #as we switch between mark/space
             #increment by residual amount if we overflow residue size
             self.markspace_index += self.markspace_residue_accumulator // self.residue_size 
-            self.markspace_residue_accumulator %= self.markspace_residue_accumulator
+            self.markspace_residue_accumulator %= self.residue_size
             
             #push the next point to the waveform
             yield self.sintbl[self.markspace_index%self.sintbl_sz]
@@ -167,7 +168,7 @@ class AFSKModulator():
             if verbose:
                 eprint('\n')
         except Exception as err:
-            traceback.print_exc()
+            print_exc(err)
 
     # return the array and size
     async def flush(self):
@@ -177,7 +178,7 @@ class AFSKModulator():
             a_s = await self._q.get() # array,size
             ls.append(a_s)
             s += a_s[1]
-        arr = array(self.arr_t, range(s))
+        arr = array(self.arr_t, (0 for x in range(s)))
         s = 0
         for a_s in ls:
             arr[s:s+a_s[1]] = a_s[0]
@@ -0,0 +1,260 @@
+import math
+from fractions import Fraction
+
+import numpy as np
+
+# NumPy port of the AFSKReceiver IQ -> audio chain in core/receiver.py, so
+# IQ can be turned into demod audio without GNU Radio (offline decodes,
+# process pool workers, benchmarks). Blocks are processed with carried
+# state, consecutive process() calls behave like one long call.
+#
+#   GNU Radio                                 here
+#   sig_source_c(lo_offset) * source          nco table, phase carried
+#   moving_average_cc(1000, 30)               folded into the decimating fir
+#   pwr_squelch_cc(52, 75e-6, 10, gate)       per decimated sample, no ramp
+#   agc3_cc                                   left out, the fm demod ignores amplitude
+#   fir_filter_ccf(400, low_pass 12k/1k)      polyphase fir, one gemm per block
+#   rational_resampler_ccc(4, 1)              polyphase interpolator
+#   nbfm_rx(48k, 48k, 75e-6, 5e3)             quadrature demod, deemph, 2.7k lpf
+#   * 0.05 * vol, float_to_short(32767)       same
+#
+# Filters are designed the way gr firdes designs them, so the taps match.
+
+_MAX_ATTENUATION = {
+    'rect'     : 21.,
+    'hann'     : 44.,
+    'hamming'  : 53.,
+    'blackman' : 74.,
+}
+
+def firdes_low_pass(gain, fs, cutoff, width, window = 'hamming', beta = 6.76):
+    # gr firdes.low_pass, windowed sinc normalized to gain at dc
+    if window == 'kaiser':
+        atten = beta/0.1102 + 8.7
+    else:
+        atten = _MAX_ATTENUATION[window]
+    ntaps = int(atten*fs/(22.*width))
+    ntaps |= 1
+    if window == 'kaiser':
+        w = np.kaiser(ntaps, beta)
+    elif window == 'rect':
+        w = np.ones(ntaps)
+    else:
+        w = getattr(np, window)(ntaps)
+    m = (ntaps - 1)//2
+    n = np.arange(-m, m + 1)
+    fwt0 = 2*math.pi*cutoff/fs
+    taps = np.where(n == 0, fwt0/math.pi, np.sin(n*fwt0)/(np.where(n == 0, 1, n)*math.pi))*w
+    return taps*(gain/np.sum(taps))
+
+def resampler_taps(interpolation, decimation, fractional_bw = 0.4, beta = 7.):
+    # gr rational_resampler default design (taps = [])
+    halfband = 0.5
+    rate = interpolation/decimation
+    if rate >= 1.:
+        width = halfband - fractional_bw
+        mid = halfband - width/2
+    else:
+        width = rate*(halfband - fractional_bw)
+        mid = rate*halfband - width/2
+    return firdes_low_pass(interpolation, interpolation, mid, width, 'kaiser', beta)
+
+def deemph_taps(fs, tau):
+    # gr fm_deemph, bilinear transform of w/(s+w) with a prewarped corner,
+    # y[n] = b0*x[n] + b1*x[n-1] + p*y[n-1]
+    w_ca = 2.*fs*math.tan(1./(tau*2.*fs))
+    k = -w_ca/(2.*fs)
+    p = (1. + k)/(1. - k)
+    b0 = -k/(1. - k)
+    return b0, b0, p
+
+def iir1(x, b0, b1, p, state, block = 64):
+    # first order iir without a per sample python loop: inside a block of
+    # size block the zero state response is a scaled cumsum, the blocks are
+    # then chained with the carried output. state = (x[-1], y[-1])
+    x = np.asarray(x, dtype = np.float64)
+    n = len(x)
+    if not n:
+        return x, state
+    x1, y1 = state
+    u = b0*x
+    u[0] += b1*x1
+    u[1:] += b1*x[:-1]
+    nblocks = -(-n//block)
+    pad = np.zeros(nblocks*block)
+    pad[:n] = u
+    u = pad.reshape(nblocks, block)
+    pw = p**np.arange(block)
+    zs = np.cumsum(u/pw, axis = 1)*pw
+    carry = p*pw # effect of the previous block's last output
+    y = np.empty_like(u)
+    for i in range(nblocks):
+        y[i] = zs[i] + carry*y1
+        y1 = y[i,-1]
+    y = y.reshape(-1)[:n]
+    return y, (x[-1], y[-1])
+
+class FIRDecimator():
+    # streaming fir with decimation. The taps are cut into phases of
+    # length decimation, so all outputs of a block come from one matrix
+    # product of the input rows with the phase matrix
+    def __init__(self, taps, decimation):
+        self.d = decimation
+        self.m = -(-len(taps)//decimation)
+        g = np.zeros(self.m*decimation, dtype = np.float32)
+        g[self.m*decimation - len(taps):] = taps[::-1]
+        self.g = np.ascontiguousarray(g.reshape(self.m, decimation).T)
+        self.hist = np.zeros((self.m - 1)*decimation, dtype = np.complex64)
+
+    def process(self, x):
+        buf = np.concatenate((self.hist, x))
+        rows = len(buf)//self.d
+        nout = rows - self.m + 1
+        if nout <= 0:
+            self.hist = buf
+            return np.zeros(0, dtype = np.complex64)
+        xr = buf[:rows*self.d].reshape(rows, self.d)
+        z = (xr.real @ self.g) + 1j*(xr.imag @ self.g)
+        y = np.zeros(nout, dtype = np.complex64)
+        for j in range(self.m):
+            y += z[j:j+nout, j]
+        self.hist = buf[nout*self.d:]
+        return y
+
+class FIRInterpolator():
+    # streaming polyphase interpolation by an integer factor
+    def __init__(self, taps, interpolation):
+        self.l = interpolation
+        ntaps = -(-len(taps)//interpolation)*interpolation
+        h = np.zeros(ntaps)
+        h[:len(taps)] = taps
+        self.phases = [h[p::interpolation] for p in range(interpolation)]
+        self.hist = np.zeros(len(self.phases[0]) - 1, dtype = np.complex64)
+
+    def process(self, x):
+        n = len(x)
+        if not n:
+            return np.zeros(0, dtype = np.complex64)
+        buf = np.concatenate((self.hist, x))
+        y = np.empty(n*self.l, dtype = np.complex64)
+        for p, h in enumerate(self.phases):
+            y[p::self.l] = np.convolve(buf, h, mode = 'valid')
+        self.hist = buf[len(buf) - len(self.hist):]
+        return y
+
+class FIRFilter():
+    # streaming real fir, one output per input
+    def __init__(self, taps):
+        self.taps = taps
+        self.hist = np.zeros(len(taps) - 1)
+
+    def process(self, x):
+        if not len(x):
+            return np.zeros(0)
+        buf = np.concatenate((self.hist, x))
+        self.hist = buf[len(buf) - len(self.hist):]
+        return np.convolve(buf, self.taps, mode = 'valid')
+
+class NBFMReceiver():
+    def __init__(self, samp_rate      = 48e3*100,
+                       lo_offset      = 500e3,
+                       nbfm_bandwidth = 12e3,
+                       audio_rate     = 48000,
+                       tau            = 75e-6,
+                       max_dev        = 5e3,
+                       vol            = 8,
+                       sql            = 52,    # squelch threshold (dB), None to keep every sample
+                       ):
+        self.samp_rate  = samp_rate
+        self.lo_offset  = lo_offset
+        self.audio_rate = audio_rate
+        self.vol        = vol
+        self.sql        = sql
+
+        # nco, a table when the lo repeats in a few thousand samples
+        ratio = Fraction(lo_offset/samp_rate).limit_denominator(1 << 16)
+        self.nco_phase = 0
+        self.nco_step  = 2*math.pi*lo_offset/samp_rate
+        self.nco_table = None
+        if ratio.denominator <= 4096 and abs(float(ratio) - lo_offset/samp_rate) < 1e-12:
+            n = np.arange(ratio.denominator)
+            self.nco_table = np.exp(1j*2*math.pi*float(ratio)*n).astype(np.complex64)
+
+        # moving_average_cc(1000, 30) followed by the decimating low pass
+        decimation = int(samp_rate/nbfm_bandwidth)
+        lpf = firdes_low_pass(1, samp_rate, nbfm_bandwidth, 1e3, 'hamming', 6.76)
+        self.decimator = FIRDecimator(30*np.convolve(lpf, np.ones(1000)), decimation)
+        quad_rate = samp_rate/decimation
+
+        # pwr_squelch_cc alpha, applied once per decimated sample
+        self.sql_alpha = 1 - (1 - 75e-6)**decimation
+        self.sql_state = (0., 0.)
+
+        interpolation = int(round(audio_rate/quad_rate))
+        self.interpolator = FIRInterpolator(resampler_taps(interpolation, 1), interpolation)
+
+        # nbfm_rx
+        self.quad_gain = audio_rate/(2*math.pi*max_dev)
+        self.last      = np.complex64(0)
+        self.deemph    = deemph_taps(audio_rate, tau)
+        self.deemph_state = (0., 0.)
+        self.audio_lpf = FIRFilter(firdes_low_pass(1, audio_rate, 2.7e3, 0.5e3, 'hamming'))
+
+        self.stats = {
+            'iq_samples'    : 0,
+            'audio_samples' : 0,
+            'squelched'     : 0,
+        }
+
+    def mix(self, iq):
+        n = len(iq)
+        if self.nco_table is not None:
+            period = len(self.nco_table)
+            idx = (self.nco_phase + np.arange(n)) % period
+            self.nco_phase = (self.nco_phase + n) % period
+            return iq*self.nco_table[idx]
+        ph = self.nco_phase + self.nco_step*np.arange(n)
+        self.nco_phase = (self.nco_phase + self.nco_step*n) % (2*math.pi)
+        return iq*np.exp(1j*ph).astype(np.complex64)
+
+    def squelch(self, x):
+        # drop the samples while the averaged power is under sql (gate mode)
+        if self.sql is None:
+            return x
+        pwr = x.real.astype(np.float64)**2 + x.imag.astype(np.float64)**2
+        a = self.sql_alpha
+        avg, self.sql_state = iir1(pwr, a, 0., 1 - a, self.sql_state)
+        keep = avg >= 10**(self.sql/10.)
+        self.stats['squelched'] += len(x) - int(np.count_nonzero(keep))
+        return x[keep]
+
+    def process(self, iq):
+        # complex iq block -> int16 audio at audio_rate
+        iq = np.asarray(iq, dtype = np.complex64)
+        self.stats['iq_samples'] += len(iq)
+        x = self.decimator.process(self.mix(iq))
+        x = self.squelch(x)
+        x = self.interpolator.process(x)
+        if not len(x):
+            return np.zeros(0, dtype = np.int16)
+        # quadrature demod
+        prev = np.concatenate(([self.last], x[:-1]))
+        self.last = x[-1]
+        f = self.quad_gain*np.angle(x*np.conj(prev))
+        b0, b1, p = self.deemph
+        f, self.deemph_state = iir1(f, b0, b1, p, self.deemph_state)
+        f = self.audio_lpf.process(f)
+        audio = np.clip(np.rint(f*(0.05*self.vol*32767)), -32768, 32767).astype(np.int16)
+        self.stats['audio_samples'] += len(audio)
+        return audio
+
+def iq_from_bytes(data, fmt = 'cs8'):
+    # raw capture bytes -> complex64, cs8 is the hackrf_transfer format,
+    # cf32 the gr_complex file_sink format
+    if fmt == 'cs8':
+        a = np.frombuffer(data, dtype = np.int8).astype(np.float32)/128.
+    elif fmt == 'cf32':
+        a = np.frombuffer(data, dtype = np.float32)
+    else:
+        raise ValueError('unknown iq format {}'.format(fmt))
+    return a[:len(a) & ~1].view(np.complex64)
@@ -0,0 +1,212 @@
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from afsk.decode import decode_samples, _DECODE_CHUNK
+from afsk.nbfm import NBFMReceiver
+from ax25.dedup import FrameDeduplicator, frame_crc
+
+# Offline decode of long recordings. The file is memory mapped, never read
+# into memory, and cut into overlapping segments that are decoded on a
+# process pool. Workers map the file themselves, only the segment bounds
+# cross the process boundary. The overlap is longer than the longest AX25
+# frame, so a frame cut by one segment end is whole in the next segment; the
+# frames decoded twice in the overlap are merged on CRC and sample offset.
+# IQ recordings go through the NumPy NBFM chain first, offsets stay in IQ
+# samples.
+
+SEGMENT_S = 30.  # seconds per segment
+OVERLAP_S = 3.   # longest frame, 330 bytes at 1200 baud with stuffing, is ~2.6s
+IQ_BLOCK  = 1 << 20 # iq samples demodulated at a time
+
+NBFM_IQ_RATE    = 48e3*100 # AFSKReceiver samp_rate
+NBFM_AUDIO_RATE = 48000
+
+IQ_FORMATS = {
+    # extension : (format, numpy dtype of one component, scale to +-1)
+    '.cs8'  : ('cs8',  'i1',  1/128.),  # hackrf_transfer
+    '.cf32' : ('cf32', '<f4', 1.),      # gr file_sink of gr_complex
+    '.cfile': ('cf32', '<f4', 1.),
+}
+
+class Recording():
+    __slots__ = (
+        'path',
+        'offset',        # byte offset of the first sample
+        'nsamples',      # samples per channel
+        'nchannels',     # interleaved channels, channel 0 is decoded
+        'sampling_rate',
+        'iq',            # None for audio, else (format, dtype, scale)
+    )
+    def __init__(self, path, offset, nsamples, nchannels, sampling_rate, iq = None):
+        self.path          = path
+        self.offset        = offset
+        self.nsamples      = nsamples
+        self.nchannels     = nchannels
+        self.sampling_rate = sampling_rate
+        self.iq            = iq
+
+    @property
+    def audio_rate(self):
+        # rate of the audio the demod sees
+        return NBFM_AUDIO_RATE if self.iq else self.sampling_rate
+
+    def samples(self):
+        # int16 view of channel 0 (audio) or (n, 2) view of i/q, backed by the page cache
+        dtype = self.iq[1] if self.iq else '<i2'
+        if not self.nsamples:
+            return np.zeros((0, self.nchannels), dtype=dtype)
+        mm = np.memmap(self.path, dtype = dtype, mode = 'r',
+                       offset = self.offset,
+                       shape  = (self.nsamples, self.nchannels))
+        return mm if self.iq else mm[:,0]
+
+    def __repr__(self):
+        return 'Recording({}, {} samples, {} ch, {} Hz{})'.format(self.path, self.nsamples, self.nchannels,
+                                                                self.sampling_rate, ', ' + self.iq[0] if self.iq else '')
+
+def wav_data_chunk(path):
+    # (data offset, data length, channels, rate) of a 16 bit PCM wav file,
+    # the wave module reads the data instead of telling where it is
+    with open(path, 'rb') as f:
+        riff, _, wave = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise ValueError('{}: not a wav file'.format(path))
+        fmt = None
+        while True:
+            hdr = f.read(8)
+            if len(hdr) < 8:
+                raise ValueError('{}: no data chunk'.format(path))
+            cid, size = struct.unpack('<4sI', hdr)
+            if cid == b'fmt ':
+                fmt = struct.unpack('<HHIIHH', f.read(16))
+                f.seek(size - 16 + (size & 1), os.SEEK_CUR)
+            elif cid == b'data':
+                if fmt is None:
+                    raise ValueError('{}: data before fmt chunk'.format(path))
+                tag, nchannels, rate, _, _, bits = fmt
+                if tag not in (1, 0xfffe) or bits != 16:
+                    raise ValueError('{}: only 16 bit PCM is supported'.format(path))
+                # streamed wav files leave the size at 0 or 0xffffffff
+                remaining = os.path.getsize(path) - f.tell()
+                size = min(size, remaining) if size else remaining
+                return f.tell(), size, nchannels, rate
+            else:
+                f.seek(size + (size & 1), os.SEEK_CUR)
+
+def open_recording(path, sampling_rate = None):
+    # .wav files carry their rate, .cs8/.cf32/.cfile are IQ as captured by
+    # AFSKReceiver (default 4.8 MHz, signal lo_offset below the center),
+    # anything else is raw mono int16 (default 22050 Hz)
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.wav':
+        offset, size, nchannels, sampling_rate = wav_data_chunk(path)
+        width, iq = 2, None
+    elif ext in IQ_FORMATS:
+        iq = IQ_FORMATS[ext]
+        offset, size, nchannels = 0, os.path.getsize(path), 2
+        width = np.dtype(iq[1]).itemsize
+        sampling_rate = sampling_rate or NBFM_IQ_RATE
+    else:
+        offset, size, nchannels = 0, os.path.getsize(path), 1
+        width, iq = 2, None
+        sampling_rate = sampling_rate or 22050
+    return Recording(path          = path,
+                     offset        = offset,
+                     nsamples      = size//(width*nchannels),
+                     nchannels     = nchannels,
+                     sampling_rate = sampling_rate,
+                     iq            = iq)
+
+def segment_bounds(nsamples, segment, overlap):
+    # [(start, stop)], consecutive segments share overlap samples
+    if segment <= overlap:
+        raise ValueError('segment must be longer than the overlap')
+    bounds = []
+    start = 0
+    while start < nsamples:
+        stop = min(start + segment, nsamples)
+        bounds.append((start, stop))
+        if stop == nsamples:
+            break
+        start = stop - overlap
+    return bounds
+
+def segment_audio(rec, start, stop):
+    # demodulated audio of an IQ segment, without squelch so audio sample
+    # n lines up with IQ sample n*sampling_rate/audio_rate
+    rx = NBFMReceiver(samp_rate = rec.sampling_rate, audio_rate = NBFM_AUDIO_RATE, sql = None)
+    mm = rec.samples()
+    audio = []
+    for idx in range(start, stop, IQ_BLOCK):
+        block = mm[idx:min(idx+IQ_BLOCK, stop)].astype(np.float32)*rec.iq[2]
+        audio.append(rx.process(block.view(np.complex64)[:,0]))
+    return np.concatenate(audio) if audio else np.zeros(0, dtype=np.int16)
+
+def decode_segment(rec, start, stop, options = {}, chunk_size = _DECODE_CHUNK):
+    # process pool entry point, returns [(stream sample offset, AX25)]
+    if rec.iq:
+        samples = segment_audio(rec, start, stop)
+    else:
+        samples = rec.samples()[start:stop]
+    frames = decode_samples(samples       = samples,
+                            sampling_rate = rec.audio_rate,
+                            options       = options,
+                            chunk_size    = chunk_size)
+    scale = rec.sampling_rate/rec.audio_rate
+    return [(start + int(off*scale), ax25) for off, ax25 in frames]
+
+class OfflineDecoder():
+    # frames(rec) yields (sample offset, AX25) in stream order as the
+    # segments complete; decoding runs ahead of the consumer on all workers
+    def __init__(self, workers    = None,
+                       segment_s  = SEGMENT_S,
+                       overlap_s  = OVERLAP_S,
+                       options    = {},
+                       chunk_size = _DECODE_CHUNK,
+                       ):
+        self.workers    = workers or os.cpu_count() or 1
+        self.segment_s  = segment_s
+        self.overlap_s  = overlap_s
+        self.options    = options
+        self.chunk_size = chunk_size
+        self.stats      = {
+            'segments'   : 0,
+            'samples'    : 0,
+            'frames'     : 0,
+            'duplicates' : 0,
+        }
+
+    def frames(self, rec):
+        fs = rec.sampling_rate
+        bounds = segment_bounds(rec.nsamples,
+                                segment = int(self.segment_s*fs),
+                                overlap = int(self.overlap_s*fs))
+        # the two decodes of one frame report the end of the chunk it
+        # completed in, so their offsets differ by less than two chunks
+        dedup = FrameDeduplicator(window = 2*self.chunk_size/rec.audio_rate, max_keys = 1024)
+        with ProcessPoolExecutor(max_workers = self.workers) as pool:
+            results = pool.map(decode_segment,
+                               [rec]*len(bounds),
+                               [b[0] for b in bounds],
+                               [b[1] for b in bounds],
+                               [self.options]*len(bounds),
+                               [self.chunk_size]*len(bounds))
+            done = 0
+            pending = [] # frames in the overlap with the next segment
+            for idx, ((start, stop), frames) in enumerate(zip(bounds, results)):
+                self.stats['segments'] += 1
+                self.stats['samples']  += stop - max(start, done)
+                done = stop
+                # merge in stream order, the deduplicator expects time to move forward
+                frames = sorted(pending + frames, key = lambda f: f[0])
+                nxt = bounds[idx+1][0] if idx+1 < len(bounds) else stop + 1
+                pending = [f for f in frames if f[0] >= nxt]
+                for off, ax25 in frames[:len(frames)-len(pending)]:
+                    if dedup.is_duplicate(frame_crc(ax25), now = off/fs):
+                        continue
+                    self.stats['frames'] += 1
+                    yield off, ax25
+        self.stats['duplicates'] = dedup.duplicates
@@ -0,0 +1,32 @@
+
+import os
+import json
+
+# Tuned demod options, one profile per sampling rate, written by aprs_tune.py
+#   {"48000": {"options": {"lpf_f": 1100, ...}, "decoded": 57, "packets": 60,
+#              "cpu_per_audio_s": 1.9, "corpus": {...}, "time": 1700000000.0}}
+# load_profile() gives the options dict to hand to AFSKDemodulator, {} when
+# nothing was tuned for that rate, so the built in defaults apply.
+
+PROFILES_FILE = 'demod_profiles.json'
+RECEIVER_RATE = 48000 # AFSKReceiver audio rate, the one profile it loads
+
+def load_profiles(path = PROFILES_FILE):
+    try:
+        with open(path, 'r') as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+def load_profile(sampling_rate, path = PROFILES_FILE):
+    profile = load_profiles(path).get(str(int(sampling_rate)))
+    return dict(profile['options']) if profile else {}
+
+def save_profile(sampling_rate, profile, path = PROFILES_FILE):
+    # replace the profile of one rate, the others are kept
+    profiles = load_profiles(path)
+    profiles[str(int(sampling_rate))] = profile
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(json.dumps(profiles, indent = 2))
+    os.replace(tmp, path)
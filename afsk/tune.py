@@ -0,0 +1,146 @@
+import time
+import random
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from afsk.bench import Corpus, CONDITIONS
+from afsk.channel import apply_channel
+from afsk.decode import decode_samples
+from afsk.offline import open_recording, segment_audio
+from afsk.profiles import RECEIVER_RATE
+
+# Demod option sweep. The test audio (a simulated corpus through a few
+# channel conditions, or a recording) is prepared once and shipped to every
+# pool worker when it starts, each task is then one options dict decoding
+# all of it. Results are ranked by decodes per cpu second, among the
+# combinations that decode within tolerance of the best count, so a cheap
+# setting that misses packets does not win on speed alone.
+
+# option : values tried, the AFSKDemodulator defaults are in every list
+GRID = {
+    'bandpass_ncoefsbaud' : [2, 3, 4],
+    'bandpass_width'      : [360, 460, 560],
+    'lpf_ncoefsbaud'      : [3, 4, 5],
+    'lpf_f'               : [900, 1000, 1100],
+    'lpf_aboost'          : [2, 3],
+    'corr_delay'          : [416e-6, 446e-6],
+}
+
+# simulated conditions tuned against by default, moderate snr and the
+# tilted channels real radios produce
+TUNE_CONDITIONS = ('snr10', 'snr6', 'twist+6', 'twist-6', 'preemph_snr6')
+
+TOLERANCE = 0.02 # fraction of the best decode count a candidate may miss
+
+def option_grid(grid = GRID, max_combos = None, seed = 0):
+    # [options dict], every combination, or max_combos of them at random
+    keys = list(grid)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    if max_combos and len(combos) > max_combos:
+        combos = random.Random(seed).sample(combos, max_combos)
+    return combos
+
+class TestSet():
+    # audio the sweep decodes, [(name, int16 samples, expected aprs set or None)]
+    def __init__(self, sampling_rate, tests, description):
+        self.sampling_rate = sampling_rate
+        self.tests = tests
+        self.description = description
+
+    @classmethod
+    def simulated(cls, npackets = 30, sampling_rate = RECEIVER_RATE, conditions = TUNE_CONDITIONS, seed = 0):
+        corpus = Corpus(npackets, sampling_rate, seed)
+        if not isinstance(conditions, dict):
+            conditions = {name: CONDITIONS[name] for name in conditions}
+        tests = []
+        for name, channel in conditions.items():
+            samples = apply_channel(corpus.samples, sampling_rate,
+                                    signal_power = corpus.signal_power,
+                                    rng          = np.random.default_rng(seed),
+                                    **channel)
+            tests.append((name, samples, set(corpus.packets)))
+        return cls(sampling_rate, tests, {
+            'type'       : 'simulated',
+            'packets'    : npackets,
+            'seed'       : seed,
+            'conditions' : dict(conditions),
+        })
+
+    @classmethod
+    def recording(cls, path, sampling_rate = None):
+        # no ground truth, every distinct frame decoded counts
+        rec = open_recording(path, sampling_rate = sampling_rate)
+        if rec.iq:
+            samples = segment_audio(rec, 0, rec.nsamples)
+        else:
+            samples = np.array(rec.samples())
+        return cls(rec.audio_rate, [(path, samples, None)], {
+            'type' : 'recording',
+            'path' : path,
+        })
+
+    @property
+    def seconds(self):
+        return sum(len(s) for _, s, _ in self.tests)/self.sampling_rate
+
+_tests = None # TestSet of this worker
+
+def _init_worker(tests):
+    global _tests
+    _tests = tests
+
+def evaluate(options, tests = None):
+    # decode every test with options, process pool entry point
+    tests = tests or _tests
+    decoded = 0
+    packets = 0
+    false   = 0
+    stats   = {}
+    cpu0 = time.process_time()
+    for name, samples, expected in tests.tests:
+        frames = decode_samples(samples, sampling_rate = tests.sampling_rate, options = options, stats = stats)
+        seen = set(bytes(ax25.to_aprs()) for _, ax25 in frames)
+        if expected is None:
+            decoded += len(seen)
+        else:
+            decoded += len(seen & expected)
+            false   += len(seen - expected)
+            packets += len(expected)
+    cpu = time.process_time() - cpu0
+    return {
+        'options'           : dict(options),
+        'decoded'           : decoded,
+        'packets'           : packets,
+        'false'             : false,
+        'fixed'             : stats.get('fixed_src_dst', 0) + stats.get('fixed_info', 0),
+        'cpu_s'             : cpu,
+        'cpu_per_audio_s'   : cpu/tests.seconds if tests.seconds else 0.,
+        'decoded_per_cpu_s' : decoded/cpu if cpu else 0.,
+    }
+
+def rank(results, tolerance = TOLERANCE):
+    # candidates within tolerance of the best decode count, fastest first,
+    # then the rest by decode count
+    if not results:
+        return []
+    best = max(r['decoded'] for r in results)
+    floor = best*(1. - tolerance)
+    good = [r for r in results if r['decoded'] >= floor]
+    rest = [r for r in results if r['decoded'] < floor]
+    good.sort(key = lambda r: (-r['decoded_per_cpu_s'], -r['decoded']))
+    rest.sort(key = lambda r: (-r['decoded'], -r['decoded_per_cpu_s']))
+    return good + rest
+
+def sweep(tests, combos, workers = None, on_result = None):
+    # [evaluate()] in combos order
+    results = []
+    with ProcessPoolExecutor(max_workers = workers,
+                             initializer = _init_worker,
+                             initargs    = (tests,)) as pool:
+        for r in pool.map(evaluate, combos):
+            results.append(r)
+            if on_result:
+                on_result(r)
+    return results
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+import sys
+import json
+import subprocess
+
+from afsk.bench import CONDITIONS, Corpus, run_benchmark
+from afsk.bank import BANK_PROFILES
+
+from lib.parse_args import bench_parse_args
+from lib.utils import eprint
+
+# Packet error rate of the demod over simulated channels, as a json report
+# to diff across commits or demod options
+#   python aprs_bench.py -n 200 -t report.json
+#   python aprs_bench.py -c snr6,twist-6 -o '{"lpf_f": 1100}'
+#   python aprs_bench.py -b default
+#   python aprs_bench.py -e goertzel
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output = True,
+                              text = True, timeout = 5).stdout.strip() or None
+    except Exception:
+        return None
+
+def get_conditions(arg):
+    if not arg:
+        return CONDITIONS
+    if arg.lstrip().startswith('{'):
+        return json.loads(arg)
+    names = arg.split(',')
+    unknown = [n for n in names if n not in CONDITIONS]
+    if unknown:
+        raise Exception('unknown conditions {}, known: {}'.format(', '.join(unknown), ', '.join(CONDITIONS)))
+    return {n: CONDITIONS[n] for n in names}
+
+def main():
+    args = bench_parse_args(sys.argv)
+    if not args:
+        return
+    quiet = args['args']['quiet']
+    conditions = get_conditions(args['args']['conditions'])
+    bank = args['args']['bank']
+    if bank:
+        bank = BANK_PROFILES if bank == 'default' else json.loads(bank)
+
+    corpus = Corpus(npackets      = args['args']['packets'],
+                    sampling_rate = args['args']['rate'],
+                    seed          = args['args']['seed'])
+    if not quiet:
+        eprint(corpus)
+
+    def on_result(name, r):
+        if not quiet:
+            eprint('{:14s} {:4d}/{:<4d} decoded, {:3d} fixed, {:3d} false, {:.3f} cpu s per audio s'.format(
+                   name, r['decoded'], r['packets'], r['fixed'], r['false'], r['cpu_per_audio_s']))
+
+    report = run_benchmark(corpus,
+                           conditions = conditions,
+                           options    = args['args']['options'],
+                           seed       = args['args']['seed'],
+                           on_result  = on_result,
+                           bank       = bank)
+    report['commit'] = git_commit()
+
+    out = sys.stdout if args['out']['file'] == '-' else open(args['out']['file'], 'w')
+    json.dump(report, out, indent = 2)
+    out.write('\n')
+    if out is not sys.stdout:
+        out.close()
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+import sys
+import time
+
+from afsk.offline import OfflineDecoder, open_recording
+
+from lib.parse_args import decode_parse_args
+from lib.utils import eprint
+
+# Decode a long recording on all cores and print the APRS lines in order
+#   python aprs_decode.py -t incident.wav
+#   python aprs_decode.py -r 48000 -w 4 -t frames.txt -t capture.raw
+
+def main():
+    args = decode_parse_args(sys.argv)
+    if not args or not args['in']['file']:
+        return
+    rec = open_recording(args['in']['file'], sampling_rate = args['args']['rate'])
+    out = sys.stdout if args['out']['file'] == '-' else open(args['out']['file'], 'w')
+    decoder = OfflineDecoder(workers   = args['args']['workers'],
+                             segment_s = args['args']['segment'],
+                             overlap_s = args['args']['overlap'],
+                             options   = args['args']['options'])
+    if args['args']['verbose']:
+        eprint(rec)
+
+    t0 = time.monotonic()
+    for off, ax25 in decoder.frames(rec):
+        out.write('{:.3f} {}\n'.format(off/rec.sampling_rate, ax25.to_aprs().decode(errors = 'replace')))
+    out.flush()
+    dt = time.monotonic() - t0
+
+    if not args['args']['quiet']:
+        stats = decoder.stats
+        eprint('{} samples in {:.2f}s on {} workers, {:.0f} samples/s ({:.1f}x real time), {} frames, {} duplicates merged'.format(
+               stats['samples'], dt, decoder.workers, stats['samples']/dt if dt else 0.,
+               stats['samples']/rec.sampling_rate/dt if dt else 0., stats['frames'], stats['duplicates']))
+    if out is not sys.stdout:
+        out.close()
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+import sys
+import time
+import asyncio
+from array import array
+
+from afsk.demod import AFSKDemodulator
+from ax25.from_afsk import AX25FromAFSK
+
+from lib.parse_args import demod_parse_args
+from lib.compat import Queue
+from lib.compat import get_stdin_streamreader
+from lib.utils import eprint
+
+# Stream raw signed 16 bit PCM into the demodulator and print APRS lines
+#   rtl_fm -f 144.39M -s 22050 | python aprs_demod.py
+#   python aprs_demod.py -r 48000 -t - -t capture.raw
+
+READ_SIZE  = 65536 # bytes per read, large reads keep the syscall count low
+CHUNK_SIZE = 2048  # samples per demod chunk, small chunks keep latency low
+MAX_CHUNKS = 16    # samples in flight, bounds memory when input outruns the demod
+
+async def open_reader(infile):
+    # returns an async read(n) for stdin or a file that never blocks the loop
+    loop = asyncio.get_running_loop()
+    if infile in ('-', 'rtl_fm'):
+        try:
+            reader = await get_stdin_streamreader()
+            return reader.read
+        except ValueError:
+            # regular file redirected to stdin, pipe transports refuse those
+            f = sys.stdin.buffer
+    else:
+        f = open(infile, 'rb')
+    async def read(n):
+        return await loop.run_in_executor(None, f.read, n)
+    return read
+
+async def print_frames(ax25_q, out, stats):
+    while True:
+        ax25 = await ax25_q.get()
+        out.write(ax25.to_aprs().decode(errors = 'replace') + '\n')
+        out.flush()
+        stats['frames'] += 1
+        ax25_q.task_done()
+
+async def main():
+    args = demod_parse_args(sys.argv)
+    rate    = args['args']['rate']
+    options = args['args']['options']
+    verbose = args['args']['verbose']
+    out = sys.stdout if args['out']['file'] == '-' else open(args['out']['file'], 'w')
+
+    samples_q = Queue(MAX_CHUNKS)
+    bits_q    = Queue()
+    ax25_q    = Queue()
+    stats     = {'samples' : 0, 'frames' : 0}
+
+    read = await open_reader(args['in']['file'])
+    t0 = time.monotonic()
+    async with AFSKDemodulator(sampling_rate = rate,
+                               samples_in_q  = samples_q,
+                               bits_out_q    = bits_q,
+                               verbose       = verbose,
+                               options       = options,
+                               ) as afsk_demod:
+        async with AX25FromAFSK(bits_in_q = bits_q,
+                                ax25_q    = ax25_q,
+                                verbose   = verbose,
+                                ):
+            printer = asyncio.create_task(print_frames(ax25_q, out, stats))
+            carry = b''
+            while True:
+                data = await read(READ_SIZE)
+                if not data:
+                    break
+                data = carry + data
+                # keep an odd trailing byte for the next read
+                even = len(data) & ~1
+                carry = data[even:]
+                arr = array('h')
+                arr.frombytes(data[:even])
+                for idx in range(0, len(arr), CHUNK_SIZE):
+                    chunk = arr[idx:idx+CHUNK_SIZE]
+                    await samples_q.put((chunk, len(chunk)))
+                stats['samples'] += len(arr)
+
+            # zeros to flush the filters, then drain the pipeline
+            flush = array('h', bytes(2*afsk_demod.flush_size))
+            await samples_q.put((flush, len(flush)))
+            await samples_q.join()
+            await bits_q.join()
+            await ax25_q.join()
+            printer.cancel()
+            await asyncio.gather(printer, return_exceptions = True)
+
+    dt = time.monotonic() - t0
+    if not args['args']['quiet']:
+        eprint('{} samples in {:.2f}s, {:.0f} samples/s ({:.1f}x real time), {} frames'.format(
+               stats['samples'], dt, stats['samples']/dt if dt else 0.,
+               stats['samples']/rate/dt if dt else 0., stats['frames']))
+    if out is not sys.stdout:
+        out.close()
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+import sys
+import asyncio
+
+from ax25.ax25 import AX25
+
+from lib.parse_args import is_parse_args
+from lib.compat import get_stdin_streamreader
+from lib.compat import print_exc
+from lib.aprs_is import APRSISClient, beacon_line
+
+# RX only iGate: gate the APRS lines printed by aprs_demod.py to APRS-IS
+#   rtl_fm -f 144.39M -s 22050 | python aprs_demod.py | python aprs_is.py -c N0CALL -p 12345
+
+async def main():
+    args = is_parse_args(sys.argv)
+    call = args['args']['call']
+    lat  = args['args']['lat']
+    lon  = args['args']['lon']
+    msg  = args['args']['msg']
+    if isinstance(msg, list):
+        msg = ' '.join(msg)
+
+    beacon = None
+    if lat is not None and lon is not None:
+        beacon = beacon_line(call, lat, lon, msg)
+
+    log = open(args['args']['log_file'], 'a') if args['args']['log_file'] else None
+    reader = await get_stdin_streamreader()
+    async with APRSISClient(call     = call,
+                            passcode = args['args']['passcode'],
+                            beacon   = beacon,
+                            ) as client:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                ax25 = AX25(aprs = line)
+            except Exception as err:
+                print_exc(err)
+                continue
+            if client.gate(ax25):
+                print(line.decode(errors = 'replace'))
+            if log:
+                log.write(line.decode(errors = 'replace') + '\n')
+                log.flush()
+        # give the last batch a chance to go out
+        await asyncio.sleep(client.batch_delay + 1)
+        print(client.get_stats(), file = sys.stderr)
+    if log:
+        log.close()
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+import sys
+import time
+import wave
+import shutil
+import asyncio
+import subprocess
+from array import array
+
+from afsk.mod import AFSKModulator
+from ax25.ax25 import AX25
+
+from lib.parse_args import mod_parse_args
+from lib.compat import get_stdin_streamreader
+from lib.compat import print_exc
+from lib.utils import eprint
+
+# Encode APRS lines, one per input line, into one continuous sample stream
+#   echo 'N0CALL>APRS:>hello' | python aprs_mod.py -t out.wav -t -
+#   python aprs_mod.py -r 48000 -t - -t messages.txt > out.raw
+
+FLAGS_BEFORE     = 10
+FLAGS_BEFORE_VOX = 150  # ~1s of flags to key a vox radio
+FLAGS_AFTER      = 4
+GAP_S            = 0.1  # silence between packets
+
+class SampleWriter():
+    # raw 16 bit samples to a file or stdout, a wav file, a player or nowhere
+    def __init__(self, outfile, rate):
+        self.wav  = None
+        self.f    = None
+        self.proc = None
+        if outfile == 'null':
+            pass
+        elif outfile == 'play':
+            player = shutil.which('aplay')
+            if not player:
+                raise Exception('play output needs aplay')
+            self.proc = subprocess.Popen([player, '-q', '-t', 'raw', '-f', 'S16_LE',
+                                          '-c', '1', '-r', str(rate)],
+                                         stdin = subprocess.PIPE)
+            self.f = self.proc.stdin
+        elif outfile.endswith('.wav'):
+            self.wav = wave.open(outfile, 'wb')
+            self.wav.setnchannels(1)
+            self.wav.setsampwidth(2)
+            self.wav.setframerate(rate)
+        elif outfile == '-':
+            self.f = sys.stdout.buffer
+        else:
+            self.f = open(outfile, 'wb')
+
+    def write(self, arr):
+        if self.wav:
+            self.wav.writeframes(arr)
+        elif self.f:
+            self.f.write(arr)
+
+    def close(self):
+        if self.wav:
+            self.wav.close()
+        elif self.f:
+            self.f.flush()
+            if self.f is not sys.stdout.buffer:
+                self.f.close()
+        if self.proc:
+            self.proc.wait()
+
+async def read_lines(infile):
+    # async iterator over input lines
+    if infile == '-':
+        try:
+            reader = await get_stdin_streamreader()
+        except ValueError:
+            # regular file redirected to stdin
+            reader = None
+        if reader:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                yield line
+            return
+        f = sys.stdin.buffer
+    else:
+        f = open(infile, 'rb')
+    loop = asyncio.get_running_loop()
+    while True:
+        line = await loop.run_in_executor(None, f.readline)
+        if not line:
+            return
+        yield line
+
+async def main():
+    args = mod_parse_args(sys.argv)
+    if not args:
+        return
+    rate    = args['args']['rate']
+    verbose = args['args']['verbose']
+    flags_before = FLAGS_BEFORE_VOX if args['args']['vox'] else FLAGS_BEFORE
+
+    out = SampleWriter(args['out']['file'], rate)
+    gap = array('h', bytes(2*int(GAP_S*rate)))
+    count = 0
+    nsamples = 0
+    t0 = time.monotonic()
+    try:
+        async with AFSKModulator(sampling_rate = rate,
+                                 verbose       = verbose) as afsk_mod:
+            async for line in read_lines(args['in']['file']):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    ax25 = AX25(aprs = line)
+                    afsk, stop_bit = ax25.to_afsk()
+                except Exception as err:
+                    print_exc(err)
+                    continue
+                # one packet at a time, memory stays bounded by a single frame
+                await afsk_mod.send_flags(flags_before)
+                await afsk_mod.to_samples(afsk = afsk, stop_bit = stop_bit)
+                await afsk_mod.send_flags(FLAGS_AFTER)
+                arr, s = await afsk_mod.flush()
+                out.write(arr[:s])
+                out.write(gap)
+                count += 1
+                nsamples += s + len(gap)
+    finally:
+        out.close()
+
+    dt = time.monotonic() - t0
+    if not args['args']['quiet']:
+        eprint('{} messages, {} samples in {:.2f}s, {:.1f} messages/s ({:.1f}x real time)'.format(
+               count, nsamples, dt, count/dt if dt else 0., nsamples/rate/dt if dt else 0.))
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+import sys
+import json
+import time
+
+from afsk.tune import GRID, TUNE_CONDITIONS, TOLERANCE, TestSet, option_grid, rank, sweep
+from afsk.profiles import PROFILES_FILE, RECEIVER_RATE, save_profile
+
+from aprs_bench import get_conditions, git_commit
+
+from lib.parse_args import tune_parse_args
+from lib.utils import eprint
+
+# Sweep the demod options on all cores, rank them and save the best one as
+# the profile of the sampling rate (demod_profiles.json), which the receiver
+# loads at startup
+#   python aprs_tune.py -r 48000 -m 40 -t tune.json
+#   python aprs_tune.py -i capture.wav -g '{"lpf_f": [900, 1000, 1100]}'
+
+def main():
+    args = tune_parse_args(sys.argv)
+    if not args:
+        return
+    quiet = args['args']['quiet']
+    profiles = args['args']['profiles'] or PROFILES_FILE
+    tolerance = args['args']['tolerance'] if args['args']['tolerance'] is not None else TOLERANCE
+
+    if args['args']['input']:
+        tests = TestSet.recording(args['args']['input'], sampling_rate = args['args']['rate'])
+    else:
+        conditions = get_conditions(args['args']['conditions']) if args['args']['conditions'] else TUNE_CONDITIONS
+        tests = TestSet.simulated(npackets      = args['args']['packets'],
+                                  sampling_rate = args['args']['rate'] or RECEIVER_RATE,
+                                  conditions    = conditions,
+                                  seed          = args['args']['seed'])
+    combos = option_grid(args['args']['grid'] or GRID, args['args']['max'], args['args']['seed'])
+    if not quiet:
+        eprint('{} combinations over {:.1f}s of audio at {} Hz'.format(len(combos), tests.seconds, tests.sampling_rate))
+
+    done = []
+    def on_result(r):
+        done.append(r)
+        if not quiet:
+            eprint('[{}/{}] {:4d} decoded, {:.3f} cpu s per audio s  {}'.format(
+                   len(done), len(combos), r['decoded'], r['cpu_per_audio_s'], json.dumps(r['options'])))
+
+    t0 = time.monotonic()
+    results = rank(sweep(tests, combos, workers = args['args']['workers'], on_result = on_result), tolerance)
+    dt = time.monotonic() - t0
+
+    report = {
+        'sampling_rate' : tests.sampling_rate,
+        'corpus'        : tests.description,
+        'tolerance'     : tolerance,
+        'wall_s'        : dt,
+        'commit'        : git_commit(),
+        'ranked'        : results,
+    }
+    if results and args['args']['save']:
+        best = results[0]
+        save_profile(tests.sampling_rate, dict(best, corpus = tests.description, time = time.time()), profiles)
+        if not quiet:
+            eprint('saved {} Hz profile to {}: {}'.format(tests.sampling_rate, profiles, json.dumps(best['options'])))
+        if int(tests.sampling_rate) != RECEIVER_RATE:
+            eprint('warning: the receiver only loads the {} Hz profile, this {} Hz one is not used by it'.format(
+                   RECEIVER_RATE, tests.sampling_rate))
+
+    out = sys.stdout if args['out']['file'] == '-' else open(args['out']['file'], 'w')
+    json.dump(report, out, indent = 2)
+    out.write('\n')
+    if out is not sys.stdout:
+        out.close()
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
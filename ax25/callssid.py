@@ -50,10 +50,11 @@ class CallSSID():
             # return self.call+b'-'+self.ssid
             # return self.call+b'-'+bytes([48+self.ssid])
             lcall = len(self.call)
-            b = bytearray(lcall + 1 + 1)
+            ssid = str(self.ssid).encode() # 0 to 15
+            b = bytearray(lcall + 1 + len(ssid))
             b[:lcall] = self.call
             b[lcall:lcall+1] = b'-'
-            b[-1] = 48+self.ssid # classic '0'+# trick
+            b[lcall+1:] = ssid
             return b
             # return str(self.call)+'-'+str(self.ssid)
         else:
@@ -73,7 +74,7 @@ class CallSSID():
             self.call[i] = self.call[i]>>1
 
         # self.call = self.call.decode()
-        self.ssid = (mv[6] & 0x17)>>1
+        self.ssid = (mv[6] & 0x1e)>>1 # ssid in bits 1-4
 
     def is_valid(self):
         if not self.call:
@@ -0,0 +1,54 @@
+
+import time
+from collections import OrderedDict
+
+# Duplicate suppression for decoded frames. A frame heard twice (digipeated,
+# decoded by two demodulators, or in two overlapping file segments) has the
+# same source, destination and info; only the digipeater path differs. The
+# APRS-IS convention is to drop such duplicates for 30 seconds.
+
+def frame_key(ax25):
+    info = ax25.info
+    if isinstance(info, str):
+        info = info.encode()
+    # to_aprs() gives a bytearray for calls with an ssid or decoded from a frame
+    return (bytes(ax25.src.to_aprs()), bytes(ax25.dst.to_aprs()), bytes(info).strip())
+
+def frame_crc(ax25):
+    # the frame check sequence, unlike frame_key it tells digipeated copies apart
+    frame = ax25.to_frame(flags_pre = 0, flags_post = 0)
+    return bytes(frame[-2:])
+
+class FrameDeduplicator():
+    def __init__(self, window = 30.,  # seconds a key stays known
+                       max_keys = 4096,
+                       clock = time.monotonic,
+                       ):
+        self.window   = window
+        self.max_keys = max_keys
+        self.clock    = clock
+        self.seen     = OrderedDict() # key -> first time seen, oldest first
+        self.duplicates = 0
+
+    def is_duplicate(self, key, now = None):
+        # True if key was seen within the window, and remember it either way
+        if now is None:
+            now = self.clock()
+        self._expire(now)
+        if key in self.seen:
+            self.duplicates += 1
+            return True
+        self.seen[key] = now
+        if len(self.seen) > self.max_keys:
+            self.seen.popitem(last = False)
+        return False
+
+    def is_duplicate_frame(self, ax25, now = None):
+        return self.is_duplicate(frame_key(ax25), now)
+
+    def _expire(self, now):
+        while self.seen:
+            key, t = next(iter(self.seen.items()))
+            if now - t < self.window:
+                break
+            self.seen.popitem(last = False)
@@ -31,14 +31,23 @@ class AX25FromAFSK():
     def __init__(self, bits_in_q,
                        ax25_q,
                        ax25_crc_err_q = None,
-                       verbose        = False):
+                       verbose        = False,
+                       fix            = True): # False: crc errors go to ax25_crc_err_q unfixed
         self.bits_q = bits_in_q
         self.ax25_q = ax25_q
         self.ax25_crc_err_q = ax25_crc_err_q
         self.verbose = verbose
+        self.fix = fix
 
         # self.frames_q = Queue()
         self.tasks = []
+        self.stats = {
+            'frames'        : 0, # flag delimited candidates
+            'decoded'       : 0, # crc ok as received
+            'fixed_src_dst' : 0, # crc ok after flipping address bits
+            'fixed_info'    : 0, # crc ok after flipping info bits
+            'crc_errors'    : 0, # no fix found
+        }
 
     async def __aenter__(self):
         self.tasks.append(asyncio.create_task(self.delimin_coro()))
@@ -99,33 +108,52 @@ class AX25FromAFSK():
             pretty_binary(mv)
 
         #decode
+        self.stats['frames'] += 1
         try:
             ax25 = AX25(frame = mv)
+            self.stats['decoded'] += 1
             await self.ax25_q.put(ax25)
             return
         except DecodeErrorNoFix as err:
+            self.stats['crc_errors'] += 1
             return
         except DecodeErrorFix as err:
             _ax25 = err.ax25
 
+        if not self.fix:
+            # fixing is left to the owner of ax25_crc_err_q (see afsk.bank)
+            if self.ax25_crc_err_q is not None:
+                await self.ax25_crc_err_q.put((bytes(mv), _ax25))
+            return
+
+        ax25 = self.fix_frame(mv, _ax25)
+        if ax25:
+            await self.ax25_q.put(ax25)
+        return
+
+    def fix_frame(self, mv, _ax25):
+        # bit flip search on a frame that failed the crc, _ax25 is its
+        # partial decode. Returns the fixed AX25 or None
         #try fixing src/dst
         ax25 = self.fixer_src_dst(mv = mv)
         if ax25:
-            await self.ax25_q.put(ax25)
-            return
+            self.stats['fixed_src_dst'] += 1
+            return ax25
 
         #no src/dst, don't bother additional fixing
         #this way we avoid trying to fix messages that have no chance of fixing
         if not (_ax25.src and _ax25.src.is_valid()) or\
            not (_ax25.dst and _ax25.dst.is_valid()):
+            self.stats['crc_errors'] += 1
             return
 
         #try fixing info/rest of message
         ax25 = self.fixer_info(mv = mv)
         if ax25:
-            await self.ax25_q.put(ax25)
-            return
+            self.stats['fixed_info'] += 1
+            return ax25
 
+        self.stats['crc_errors'] += 1
         return
 
     def fixer_src_dst(self, mv):
@@ -0,0 +1,119 @@
+
+import struct
+
+from ax25.ax25 import AX25
+from ax25.ax25 import AX25_FLAG
+from ax25.defs import DecodeErrorFix
+from ax25.defs import DecodeErrorNoFix
+from ax25.defs import CallSSIDError
+
+from lib.crc16 import crc16_ccit
+
+# KISS framing (https://www.ax25.net/kiss.aspx) shared by the TCP server and
+# the pty TNC. A KISS data frame carries the AX.25 frame from the first
+# address byte to the end of the info field: no flags, no FCS.
+
+FEND  = 0xc0
+FESC  = 0xdb
+TFEND = 0xdc
+TFESC = 0xdd
+
+CMD_DATA = 0x00
+
+_ESCAPE = {FEND: bytes((FESC, TFEND)),
+           FESC: bytes((FESC, TFESC))}
+
+def kiss_escape(data):
+    if FEND not in data and FESC not in data:
+        return bytes(data)
+    return b''.join(_ESCAPE.get(b, bytes((b,))) for b in data)
+
+def kiss_encode(payload, port = 0, cmd = CMD_DATA):
+    # one complete KISS frame, FEND delimited on both sides
+    return bytes((FEND, ((port & 0x0f) << 4) | (cmd & 0x0f))) + kiss_escape(payload) + bytes((FEND,))
+
+def ax25_to_kiss_payload(ax25):
+    # to_frame() adds flags and crc, strip them
+    frame = ax25.to_frame(flags_pre = 0, flags_post = 0)
+    return bytes(frame[:-2])
+
+def kiss_payload_to_ax25(payload):
+    # rebuild the flag/crc framing AX25.from_frame expects
+    crc = struct.pack('<H', crc16_ccit(payload))
+    frame = bytes((AX25_FLAG,)) + bytes(payload) + crc + bytes((AX25_FLAG,))
+    try:
+        ax25 = AX25(frame = frame)
+    except (DecodeErrorFix, DecodeErrorNoFix, CallSSIDError, IndexError):
+        return None
+    if not (ax25.src.is_valid() and ax25.dst.is_valid()):
+        return None
+    return ax25
+
+def decode_data_frames(decoder, data):
+    # feed a chunk to decoder, returns (AX25 frames, invalid frame count).
+    # Non-data commands (TXDELAY, PERSIST...) are ignored, the modem has
+    # its own timing
+    frames = []
+    bad = 0
+    for port, cmd, payload in decoder.feed(data):
+        if cmd != CMD_DATA:
+            continue
+        ax25 = kiss_payload_to_ax25(payload)
+        if ax25 is None:
+            bad += 1
+        else:
+            frames.append(ax25)
+    return frames, bad
+
+def encode_ax25(ax25, port = 0):
+    return kiss_encode(ax25_to_kiss_payload(ax25), port = port)
+
+class KISSDecoder():
+    # Incremental KISS deframer, feed() any chunk of the byte stream and get
+    # back the complete (port, cmd, payload) frames it contained. Frames
+    # longer than max_len are discarded and counted in errors.
+    def __init__(self, max_len = 1024):
+        self.max_len = max_len
+        self.buf     = bytearray()
+        self.in_frame = False
+        self.escape  = False
+        self.overrun = False
+        self.errors  = 0
+
+    def feed(self, data):
+        frames = []
+        for b in data:
+            if b == FEND:
+                if self.in_frame and self.buf and not self.overrun:
+                    frames.append(self._frame())
+                self.buf     = bytearray()
+                self.in_frame = True
+                self.escape  = False
+                self.overrun = False
+                continue
+            if not self.in_frame or self.overrun:
+                continue
+            if self.escape:
+                self.escape = False
+                if b == TFEND:
+                    b = FEND
+                elif b == TFESC:
+                    b = FESC
+                else:
+                    # protocol violation, drop the frame
+                    self.errors += 1
+                    self.overrun = True
+                    continue
+            elif b == FESC:
+                self.escape = True
+                continue
+            if len(self.buf) > self.max_len:
+                self.errors += 1
+                self.overrun = True
+                continue
+            self.buf.append(b)
+        return frames
+
+    def _frame(self):
+        t = self.buf[0]
+        return (t >> 4, t & 0x0f, bytes(self.buf[1:]))
@@ -6,6 +6,7 @@ from .receiver import Receiver
 from .udp_listener import UDPListenerThread
 from .carrier_transmission import CarrierTransmission
 from .message_processor import MessageProcessor
+from .runtime import AsyncRuntime
 
 __all__ = [
     'Backend',
@@ -13,5 +14,6 @@ __all__ = [
     'Receiver',
     'UDPListenerThread',
     'CarrierTransmission',
-    'MessageProcessor'
+    'MessageProcessor',
+    'AsyncRuntime'
 ]
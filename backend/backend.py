@@ -1,22 +1,35 @@
 # backend/backend.py
 
+import asyncio
 import threading
 import logging
 import sys
 import queue
 import time
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List
 
 from backend.config_manager import ConfigurationManager
 from backend.receiver import Receiver
 from backend.udp_listener import UDPListenerThread
 from backend.carrier_transmission import CarrierTransmission
 from backend.message_processor import MessageProcessor
+from backend.radio_arbiter import RadioArbiter
+from backend.runtime import AsyncRuntime
 
 from core.thread_safe import ThreadSafeVariable
+from core import device_lifecycle
+from core.sdr import SDRDevice, get_device
+from core.bounded_queue import make_queue, queue_stats
+from core.udp_transmitter import UDPEgress
+from core.kiss_server import KISSServer
+from core.kiss_pty import KISSPty
+from lib.aprs_is import APRSISClient, APRS_IS_HOST, APRS_IS_PORT, beacon_line
 
 logger = logging.getLogger(__name__)
 
+# Queued on message_queue to wake and end Backend.run
+_STOP = object()
+
 class Backend:
     def __init__(self, config_file: str, socketio):
         # Configuration Manager
@@ -24,6 +37,10 @@ class Backend:
         
         self.lock = threading.Lock()
 
+        # Last status emitted per event, so run() only emits transitions
+        self._status_lock = threading.Lock()
+        self._last_status: Dict[str, str] = {}
+
         # SocketIO instance for emitting events
         self.socketio = socketio
 
@@ -36,17 +53,18 @@ class Backend:
             'transmitting_var': threading.Event()
         }
 
-        # Queues and Events
+        # Queues and Events, stage queues are bounded (see core.bounded_queue)
+        queue_config = self.config_manager.get("queues", {})
         self.queues = {
             'stop_event': threading.Event(),
             'transmitting_var': self.vars['transmitting_var'],
-            'message_queue': queue.SimpleQueue(),
+            'message_queue': make_queue('message_queue', queue_config),
             'frequency_var': self.vars['frequency_var'],
             'gain_var': self.vars['gain_var'],
             'if_gain_var': self.vars['if_gain_var'],
             'receiver_stop_event': threading.Event(),
             'receiver': None,  # Receiver instance
-            'received_message_queue': queue.Queue(),
+            'received_message_queue': make_queue('received_message_queue', queue_config),
             'device_index_var': ThreadSafeVariable(self.config_manager.get("device_index", 0)),
             'carrier_stop_event': threading.Event(),
             'carrier_transmission': None,  # CarrierTransmission instance
@@ -54,14 +72,43 @@ class Backend:
             'udp_listener': None  # UDPListenerThread instance
         }
 
+        # Half-duplex owner of the radio, keeps RX and TX flowgraphs alive
+        self.radio_arbiter = RadioArbiter(backend=self)
+
+        # Decoded frames are fanned out to every subscriber
+        self.frame_subscribers: List[Callable[[Any], None]] = [self._emit_frame, self._queue_frame]
+
+        # Forward decoded frames to UDP destinations as soon as they are decoded
+        self.udp_egress = UDPEgress(
+            destinations=self.config_manager.get("udp_egress_destinations", []),
+            sndbuf=self.config_manager.get("udp_egress_sndbuf", 0)
+        )
+        self.subscribe_frames(self._forward_frame)
+
+        # Optional single event loop owning ingress, TX scheduling and fan-out
+        self.runtime = None
+        if self.config_manager.get("backend_runtime", "threads") == "asyncio":
+            self.runtime = AsyncRuntime(backend=self)
+
         # Initialize Message Processor
         self.message_processor = MessageProcessor(
             config_manager=self.config_manager,
             queues=self.queues,
             vars=self.vars,
-            backend=self  # Pass reference to Backend for emitting events
+            backend=self,  # Pass reference to Backend for emitting events
+            loop=self.runtime.loop if self.runtime else None
         )
 
+        # KISS TNC over TCP, served on the message processor (or runtime) loop
+        self.kiss_server = None
+        self.kiss_pty = None
+        self._start_kiss_server()
+        self._start_kiss_pty()
+
+        # APRS-IS uplink for decoded frames (RX iGate)
+        self.igate = None
+        self._start_igate()
+
         # Initialize Receiver
         if not hasattr(self, 'receiver') or self.queues['receiver'] is None:   
             self.receiver = Receiver(
@@ -74,8 +121,8 @@ class Backend:
             self.receiver.start()
             self.queues['receiver'] = self.receiver
 
-        # Initialize UDP Listener
-        if not hasattr(self, 'udp_listener') or self.queues['udp_listener'] is None:
+        # Initialize UDP Listener (the async runtime binds its own endpoint)
+        if self.runtime is None and (not hasattr(self, 'udp_listener') or self.queues['udp_listener'] is None):
             self.udp_listener = UDPListenerThread(
                 stop_event=self.queues['udp_listener_stop_event'],
                 message_queue=self.queues['message_queue'],
@@ -84,11 +131,166 @@ class Backend:
                 backend=self  # Pass reference to Backend for emitting events
             )
             self.udp_listener.start()
+            self.queues['udp_listener'] = self.udp_listener
 
         # Initialize Carrier Transmission if enabled in config
         if self.config_manager.get("carrier_only", False):
             logger.info("Carrier-only mode enabled in configuration. Queuing CARRIER_ONLY message.")
-            self.queues['message_queue'].put("CARRIER_ONLY")
+            self.submit("CARRIER_ONLY")
+
+    def submit(self, message: Any, block: bool = True) -> None:
+        """
+        Queue a message for the message processor.
+
+        Args:
+            message (Any): APRS payload, message tuple or AX25 frame, as for MessageProcessor.
+            block (bool): Wait for room in the message queue. Callers on an
+                event loop pass False, a full queue then rejects the message.
+        """
+        if self.runtime is not None:
+            self.runtime.submit(message)
+            return
+        try:
+            self.queues['message_queue'].put(message, block=block)
+        except queue.Full:
+            logger.warning("Message queue full, message rejected.")
+
+    def _start_kiss_server(self) -> None:
+        """Start the KISS TCP server if kiss_tcp_port is set."""
+        port = self.config_manager.get("kiss_tcp_port", 0)
+        if not port:
+            return
+        self.kiss_server = KISSServer(
+            on_frame=lambda ax25: self.submit(ax25, block=False),
+            client_queue=self.config_manager.get("kiss_client_queue", 64),
+            write_timeout=self.config_manager.get("kiss_write_timeout", 5.0)
+        )
+        self._start_on_loop(
+            self.kiss_server.start(self.config_manager.get("kiss_tcp_host", "127.0.0.1"), port),
+            "KISS server"
+        )
+        self.subscribe_frames(self.kiss_server.broadcast_threadsafe)
+
+    def _start_kiss_pty(self) -> None:
+        """Create the virtual serial KISS TNC if kiss_pty is enabled."""
+        if not self.config_manager.get("kiss_pty", False):
+            return
+        try:
+            self.kiss_pty = KISSPty(
+                on_frame=lambda ax25: self.submit(ax25, block=False),
+                link=self.config_manager.get("kiss_pty_link", "") or None,
+                max_buffer=self.config_manager.get("kiss_pty_buffer", 65536)
+            )
+        except OSError as e:
+            logger.error("KISS pty could not be created: %s", e)
+            return
+        self._start_on_loop(self.kiss_pty.start(), "KISS pty")
+        self.subscribe_frames(self.kiss_pty.broadcast_threadsafe)
+
+    def _start_igate(self) -> None:
+        """Connect the APRS-IS iGate client if igate_enabled is set."""
+        config = self.config_manager
+        if not config.get("igate_enabled", False):
+            return
+        call = config.get("igate_call") or config.get("callsign_source")
+        beacon = None
+        if config.get("igate_lat") is not None and config.get("igate_lon") is not None:
+            beacon = beacon_line(call, config.get("igate_lat"), config.get("igate_lon"), config.get("igate_msg"))
+        self.igate = APRSISClient(
+            call=call,
+            passcode=config.get("igate_passcode", ""),
+            host=config.get("igate_host", APRS_IS_HOST),
+            port=config.get("igate_port", APRS_IS_PORT),
+            rate=config.get("igate_rate", 10.0),
+            beacon=beacon
+        )
+        self._start_on_loop(self.igate.start(), "APRS-IS iGate")
+        self.subscribe_frames(self.igate.gate_threadsafe)
+
+    def _stop_igate(self) -> None:
+        """Disconnect from APRS-IS."""
+        if self.igate is None:
+            return
+        self.unsubscribe_frames(self.igate.gate_threadsafe)
+        loop = self.message_processor.loop
+        if not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self.igate.stop(), loop)
+        self.igate = None
+
+    def _start_on_loop(self, coro, name: str) -> None:
+        """Run a service start coroutine on the message processor loop, reporting failures."""
+        def done(future):
+            if future.exception() is not None:
+                logger.error("%s failed to start: %s", name, future.exception())
+                self.socketio.emit('system_error', {'message': f"{name} error: {future.exception()}"})
+        asyncio.run_coroutine_threadsafe(coro, self.message_processor.loop).add_done_callback(done)
+
+    def _stop_kiss_server(self) -> None:
+        """Disconnect the KISS clients and stop listening."""
+        if self.kiss_server is None:
+            return
+        self.unsubscribe_frames(self.kiss_server.broadcast_threadsafe)
+        loop = self.message_processor.loop
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(self.kiss_server.close)
+        self.kiss_server = None
+
+    def _stop_kiss_pty(self) -> None:
+        """Close the virtual serial KISS TNC."""
+        if self.kiss_pty is None:
+            return
+        self.unsubscribe_frames(self.kiss_pty.broadcast_threadsafe)
+        loop = self.message_processor.loop
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(self.kiss_pty.close)
+        self.kiss_pty = None
+
+    def subscribe_frames(self, callback: Callable[[Any], None]) -> None:
+        """
+        Register a callback for every decoded AX.25 frame.
+
+        Args:
+            callback (Callable): Called with the AX25 frame object.
+        """
+        self.frame_subscribers.append(callback)
+
+    def unsubscribe_frames(self, callback: Callable[[Any], None]) -> None:
+        """Remove a callback registered with subscribe_frames."""
+        if callback in self.frame_subscribers:
+            self.frame_subscribers.remove(callback)
+
+    def publish_frame(self, ax25: Any) -> None:
+        """
+        Entry point for decoded frames, called from the receiver thread.
+        With the async runtime the fan-out runs on its loop.
+        """
+        if self.runtime is not None:
+            self.runtime.publish_frame(ax25)
+        else:
+            self.dispatch_frame(ax25)
+
+    def dispatch_frame(self, ax25: Any) -> None:
+        """Hand a frame to every subscriber, isolating their failures."""
+        for callback in list(self.frame_subscribers):
+            try:
+                callback(ax25)
+            except Exception as e:
+                logger.exception("Frame subscriber %r failed: %s", callback, e)
+
+    def _forward_frame(self, ax25: Any) -> None:
+        self.udp_egress.send(str(ax25))
+
+    def _emit_frame(self, ax25: Any) -> None:
+        message = str(ax25)
+        logger.info("Receiver received message: %s", message)
+        self.socketio.emit('aprs_message', {'message': message})
+
+    def _queue_frame(self, ax25: Any) -> None:
+        # Text of the frame for set_aprs_queue readers, never blocks the fan-out
+        try:
+            self.queues['received_message_queue'].put(str(ax25), block=False)
+        except queue.Full:
+            pass  # Counted as a drop by a bounded queue
 
     def set_aprs_queue(self, aprs_queue: queue.Queue):
         """
@@ -117,7 +319,7 @@ class Backend:
             self.receiver.start()
             self.queues['receiver'] = self.receiver
             logger.info("Reception started.")
-            self.socketio.emit('reception_status', {'status': 'active'})
+            self.publish_status()
         else:
             logger.info("Receiver is already running.")
 
@@ -128,7 +330,7 @@ class Backend:
             self.queues['receiver_stop_event'].set()  # Signal receiver thread to stop
             self.queues['receiver'] = None
             logger.info("Reception stopped.")
-            self.socketio.emit('reception_status', {'status': 'idle'})
+            self.publish_status()
         else:
             logger.info("Receiver is not running.")
                 
@@ -138,6 +340,12 @@ class Backend:
         """
         logger.info("Shutting down...")
 
+        # Wake and end the run loop
+        self.queues['stop_event'].set()
+        self.queues['message_queue'].force_put(_STOP)
+        if self.runtime is not None:
+            self.runtime.stop()
+
         # Stop carrier transmission if running
         if self.queues.get('carrier_transmission'):
             self.queues['carrier_transmission'].stop()
@@ -161,12 +369,69 @@ class Backend:
             self.queues['receiver'] = None
             self.socketio.emit('reception_status', {'status': 'stopped'})
 
+        # Release the transmit flowgraph
+        self.radio_arbiter.shutdown()
+
+        # Stop forwarding decoded frames
+        self.udp_egress.close()
+        self._stop_kiss_server()
+        self._stop_kiss_pty()
+        self._stop_igate()
+
         # Save configuration
         self.config_manager.save_config()
 
         logger.info("Shutdown complete.")
         sys.exit(0)
 
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Collect runtime metrics from the backend components.
+        """
+        runtime = {'mode': 'asyncio' if self.runtime else 'threads', 'threads': threading.active_count()}
+        if self.runtime is not None:
+            runtime.update(self.runtime.get_metrics())
+        return {
+            'radio': self.radio_arbiter.get_metrics(),
+            'device': device_lifecycle.stats(),
+            'sdr': self.sdr_device(self.config_manager.get("device_index", 0)).stats(),
+            'runtime': runtime,
+            'queues': queue_stats(),
+            'ingress': self.ingress_stats(),
+            'egress': self.udp_egress.stats(),
+            'kiss': self.kiss_server.stats() if self.kiss_server else None,
+            'kiss_pty': self.kiss_pty.stats() if self.kiss_pty else None,
+            'igate': self.igate.get_stats() if self.igate else None,
+        }
+
+    def sdr_device(self, device_index: int) -> SDRDevice:
+        """
+        The radio behind device_index, a HackRF or the simulated loopback
+        radio selected by the "sdr_device" setting. The receiver and the
+        transmitters share one instance per device.
+        """
+        kind = self.config_manager.get("sdr_device", "hackrf")
+        options = {}
+        if kind == "simulated":
+            options = {
+                'noise': self.config_manager.get("sim_noise", 0.01),
+                'delay_s': self.config_manager.get("sim_delay_s", 0.0),
+                'freq_offset': self.config_manager.get("sim_freq_offset_hz", 0.0),
+                'mode': self.config_manager.get("sim_mode", "audio"),
+                'realtime': self.config_manager.get("sim_realtime", True),
+            }
+        return get_device(kind, device_index, **options)
+
+    def ingress_stats(self) -> Any:
+        """
+        Counters of the UDP/TCP ingress server, None if it is not running.
+        """
+        if self.runtime is not None:
+            return self.runtime.get_ingress_stats()
+        if self.queues.get('udp_listener'):
+            return self.queues['udp_listener'].get_stats()
+        return None
+
     def apply_new_config(self, new_config: Dict[str, Any]) -> None:
         """
         Apply new configuration by updating variables and restarting components if necessary.
@@ -188,7 +453,10 @@ class Backend:
                 new_freq = new_config['frequency_hz']
                 self.vars['frequency_var'].set(new_freq)
                 logger.info("Frequency updated to %s Hz.", new_freq)
-                self.restart_receiver()
+                # Retune in place, only rebuild the receiver if it is not running
+                receiver = self.queues['receiver']
+                if not (receiver and receiver.set_frequency(new_freq)):
+                    self.restart_receiver()
 
             # === Handle Device Index Change ===
             if 'device_index' in new_config and new_config['device_index'] != old_config.get('device_index'):
@@ -197,6 +465,21 @@ class Backend:
                 logger.info("Device index updated to %s.", new_device_index)
                 self.restart_receiver()
 
+            # === Handle Receive Profile Change ===
+            if 'rx_profile' in new_config and new_config['rx_profile'] != old_config.get('rx_profile'):
+                logger.info("Receive profile changed to %s.", new_config['rx_profile'])
+                self.restart_receiver()
+
+            # === Handle Monitor Tap Change (applied live) ===
+            if 'rx_monitor_tap' in new_config and new_config['rx_monitor_tap'] != old_config.get('rx_monitor_tap'):
+                receiver = self.queues['receiver']
+                if receiver:
+                    if new_config['rx_monitor_tap']:
+                        receiver.attach_monitor()
+                    else:
+                        receiver.detach_monitor()
+                logger.info("Monitor tap %s.", "attached" if new_config['rx_monitor_tap'] else "detached")
+
             # === Handle Send IP or Send Port Change ===
             send_ip_changed = 'send_ip' in new_config and new_config['send_ip'] != old_config.get('send_ip')
             send_port_changed = 'send_port' in new_config and new_config['send_port'] != old_config.get('send_port')
@@ -206,23 +489,52 @@ class Backend:
                 new_port = new_config.get('send_port', self.config_manager.get('send_port'))
                 logger.info("Send IP or Port changed. New IP: %s, New Port: %s.", new_ip, new_port)
 
-                # Restart UDP Listener with new IP and/or Port
-                if self.queues['udp_listener']:
-                    self.queues['udp_listener'].stop()
-                    self.queues['udp_listener_stop_event'].set()
-                    logger.info("UDP Listener stopped.")
-
-                # Create and start a new UDP Listener instance
-                self.queues['udp_listener'] = UDPListenerThread(
-                    stop_event=self.queues['udp_listener_stop_event'],
-                    message_queue=self.queues['message_queue'],
-                    ip=new_ip,
-                    port=new_port,
-                    backend=self  # Pass reference to Backend for emitting events
-                )
-                self.queues['udp_listener'].start()
-                logger.info("UDP Listener restarted with IP: %s and Port: %s.", new_ip, new_port)
-                self.socketio.emit('udp_listener_status', {'status': 'active'})
+                if self.runtime is not None:
+                    # The async runtime rebinds its UDP endpoint in place
+                    self.runtime.restart_udp(new_ip, new_port)
+                else:
+                    # Restart UDP Listener with new IP and/or Port
+                    if self.queues['udp_listener']:
+                        self.queues['udp_listener'].stop()
+                        self.queues['udp_listener_stop_event'].set()
+                        logger.info("UDP Listener stopped.")
+
+                    # Create and start a new UDP Listener instance
+                    self.queues['udp_listener_stop_event'] = threading.Event()
+                    self.queues['udp_listener'] = UDPListenerThread(
+                        stop_event=self.queues['udp_listener_stop_event'],
+                        message_queue=self.queues['message_queue'],
+                        ip=new_ip,
+                        port=new_port,
+                        backend=self  # Pass reference to Backend for emitting events
+                    )
+                    self.queues['udp_listener'].start()
+                    logger.info("UDP Listener restarted with IP: %s and Port: %s.", new_ip, new_port)
+                    self.socketio.emit('udp_listener_status', {'status': 'active'})
+
+            # === Handle UDP Egress Destinations Change (applied live) ===
+            if 'udp_egress_destinations' in new_config and new_config['udp_egress_destinations'] != old_config.get('udp_egress_destinations'):
+                self.udp_egress.set_destinations(new_config['udp_egress_destinations'])
+                logger.info("UDP egress destinations set to %s.", new_config['udp_egress_destinations'])
+
+            # === Handle KISS Server Change ===
+            kiss_keys = ('kiss_tcp_host', 'kiss_tcp_port', 'kiss_client_queue', 'kiss_write_timeout')
+            if any(k in new_config and new_config[k] != old_config.get(k) for k in kiss_keys):
+                self._stop_kiss_server()
+                self._start_kiss_server()
+                logger.info("KISS server restarted on port %s.", self.config_manager.get("kiss_tcp_port", 0))
+
+            pty_keys = ('kiss_pty', 'kiss_pty_link', 'kiss_pty_buffer')
+            if any(k in new_config and new_config[k] != old_config.get(k) for k in pty_keys):
+                self._stop_kiss_pty()
+                self._start_kiss_pty()
+                logger.info("KISS pty %s.", "enabled" if self.kiss_pty else "disabled")
+
+            # === Handle iGate Change ===
+            if any(k.startswith('igate_') and new_config[k] != old_config.get(k) for k in new_config):
+                self._stop_igate()
+                self._start_igate()
+                logger.info("APRS-IS iGate %s.", "restarted" if self.igate else "disabled")
 
             # === Handle Gain Change ===
             if 'gain' in new_config and new_config['gain'] != old_config.get('gain'):
@@ -238,6 +550,17 @@ class Backend:
                 logger.info("IF Gain updated to %s.", new_if_gain)
                 # If IF Gain affects other components dynamically, update them here
 
+            # === Handle Receiver Gain Changes (applied live) ===
+            if 'rx_gain' in new_config and new_config['rx_gain'] != old_config.get('rx_gain'):
+                if self.queues['receiver']:
+                    self.queues['receiver'].set_gain(new_config['rx_gain'])
+                logger.info("Receiver gain updated to %s.", new_config['rx_gain'])
+
+            if 'rx_if_gain' in new_config and new_config['rx_if_gain'] != old_config.get('rx_if_gain'):
+                if self.queues['receiver']:
+                    self.queues['receiver'].set_if_gain(new_config['rx_if_gain'])
+                logger.info("Receiver IF gain updated to %s.", new_config['rx_if_gain'])
+
             # === Handle Carrier Only Change ===
             if 'carrier_only' in new_config and new_config['carrier_only'] != old_config.get('carrier_only'):
                 carrier_only = new_config['carrier_only']
@@ -290,6 +613,7 @@ class Backend:
 
             # === Final Logging ===
             logger.info("Configuration applied successfully.")
+        self.publish_status()
 
     def restart_receiver(self):
         """Stops and restarts the receiver with the current configuration."""
@@ -316,33 +640,59 @@ class Backend:
         logger.info("Receiver restarted.")
 
 
+    def status_snapshot(self) -> Dict[str, str]:
+        """
+        Current status of each component, as emitted to the frontend.
+        """
+        receiver = self.queues['receiver']
+        return {
+            'system_status': 'running',
+            'reception_status': 'active' if receiver is not None and receiver.is_receiving else 'idle',
+            'carrier_status': 'active' if self.queues['carrier_transmission'] else 'idle',
+        }
+
+    def publish_status(self, force: bool = False) -> None:
+        """
+        Emit the status events that changed since the last emit.
+
+        Args:
+            force (bool): Emit every status even if unchanged.
+        """
+        status = self.status_snapshot()
+        with self._status_lock:
+            changed = {k: v for k, v in status.items() if force or self._last_status.get(k) != v}
+            self._last_status.update(changed)
+        for event, value in changed.items():
+            self.socketio.emit(event, {'status': value})
+
     def run(self):
         """
         Run the main processing loop.
+
+        Blocks on the message queue, so the loop uses no CPU while idle and
+        handles messages back to back as soon as they are queued. Status is
+        only emitted when it changes. With backend_runtime set to "asyncio"
+        the async runtime loop runs here instead.
         """
+        if self.runtime is not None:
+            try:
+                self.runtime.run()
+            except KeyboardInterrupt:
+                logger.info("KeyboardInterrupt received. Exiting gracefully.")
+                self.shutdown()
+            return
         try:
-            self.socketio.emit('system_status', {'status': 'running'})
+            self.publish_status(force=True)
             while not self.queues['stop_event'].is_set():
-                self.socketio.emit('system_status', {'status': 'running'})
-
-                if self.queues['receiver']:
-                    self.socketio.emit('reception_status', {'status': 'active'})
-                else:
-                    self.socketio.emit('reception_status', {'status': 'idle'})
-
-                if self.queues['carrier_transmission']:
-                    self.socketio.emit('carrier_status', {'status': 'active'})
-                else:
-                    self.socketio.emit('carrier_status', {'status': 'idle'})
+                message = self.queues['message_queue'].get()
+                if message is _STOP:
+                    break
                 try:
-                    message = self.queues['message_queue'].get_nowait()
                     self.message_processor.process_message(message)
-                except queue.Empty:
-                    pass
                 except Exception as e:
                     logger.exception("Error in message processing: %s", e)
                     self.socketio.emit('system_error', {'message': f"Message processing error: {e}"})
-                time.sleep(0.1)  # Prevents CPU overuse
+                self.publish_status()
         except KeyboardInterrupt:
             logger.info("KeyboardInterrupt received. Exiting gracefully.")
             self.shutdown()
@@ -5,7 +5,7 @@ import time
 import logging
 from typing import Any, Dict  # Import Dict and Any from typing
 
-from core import ResampleAndSend, reset_hackrf
+from core import ResampleAndSend
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +32,8 @@ class CarrierTransmission:
                 output_rate=2205000,
                 device_index=self.config.get('device_index', 0),
                 carrier_only=True,
-                carrier_freq=current_frequency
+                carrier_freq=current_frequency,
+                device=self.backend.sdr_device(self.config.get('device_index', 0))
             )
 
             if carrier_top_block.initialize_hackrf(gain, if_gain):
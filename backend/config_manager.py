@@ -18,7 +18,50 @@ DEFAULT_CONFIG = {
     "send_ip": "127.0.0.1",
     "send_port": 14581,
     "carrier_only": False,
-    "device_index": 0
+    "device_index": 0,
+    "rx_decoder": "stream",
+    "rx_decode_workers": 0,
+    "rx_demod_bank": [],
+    "rx_profile": "monitor",
+    "rx_monitor_tap": False,
+    "rx_monitor_rate": 8000,
+    "rx_gain": 0,
+    "rx_if_gain": 32,
+    "iq_capture_dir": "",
+    "iq_capture_chunk_s": 10.0,
+    "iq_capture_format": "cf32",
+    "iq_replay_dir": "",
+    "iq_replay_rate": 0,
+    "sdr_device": "hackrf",
+    "sim_noise": 0.01,
+    "sim_delay_s": 0.0,
+    "sim_freq_offset_hz": 0.0,
+    "sim_mode": "audio",
+    "sim_realtime": True,
+    "backend_runtime": "threads",
+    "queues": {},
+    "udp_max_datagram": 65535,
+    "udp_recv_batch": 64,
+    "udp_rcvbuf": 0,
+    "tcp_ingress_port": 0,
+    "udp_egress_destinations": [],
+    "udp_egress_sndbuf": 0,
+    "kiss_tcp_host": "127.0.0.1",
+    "kiss_tcp_port": 0,
+    "kiss_client_queue": 64,
+    "kiss_write_timeout": 5.0,
+    "kiss_pty": False,
+    "kiss_pty_link": "",
+    "kiss_pty_buffer": 65536,
+    "igate_enabled": False,
+    "igate_call": "",
+    "igate_passcode": "",
+    "igate_host": "rotate.aprs2.net",
+    "igate_port": 14580,
+    "igate_rate": 10.0,
+    "igate_lat": None,
+    "igate_lon": None,
+    "igate_msg": ""
 }
 
 class ConfigurationManager:
@@ -34,7 +77,8 @@ class ConfigurationManager:
             with open(self.config_file, "r") as f:
                 config = json.load(f)
             logger.info("Configuration loaded from %s.", self.config_file)
-            return config
+            # Fill in keys added since the file was written
+            return {**DEFAULT_CONFIG, **config}
         else:
             logger.warning("Config file not found. Using default configuration.")
             return DEFAULT_CONFIG.copy()
@@ -4,7 +4,7 @@ import asyncio
 import logging
 import threading
 import queue
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import time
 
@@ -12,8 +12,8 @@ from backend.config_manager import ConfigurationManager
 from backend.receiver import Receiver
 from backend.carrier_transmission import CarrierTransmission
 
-from core import generate_aprs_wav, add_silence, reset_hackrf, ResampleAndSend
-from core.udp_transmitter import udp_transmitter
+from core import generate_aprs_samples
+from ax25.ax25 import AX25
 
 logger = logging.getLogger(__name__)
 
@@ -24,16 +24,22 @@ class MessageProcessor:
         config_manager: ConfigurationManager,
         queues: Dict[str, Any],
         vars: Dict[str, Any],
-        backend: Any  # Reference to Backend for emitting events
+        backend: Any,  # Reference to Backend for emitting events
+        loop: Optional[asyncio.AbstractEventLoop] = None
     ):
         self.config_manager = config_manager
         self.queues = queues
         self.vars = vars
         self.backend = backend  # Reference to Backend for emitting events
-        self.loop = asyncio.new_event_loop()
         self.lock = threading.Lock()  # Lock for thread-safe operations
-        threading.Thread(target=self._start_event_loop, daemon=True).start()
-        logger.info("MessageProcessor initialized and event loop started.")
+        if loop is not None:
+            # Shared loop owned by the async runtime
+            self.loop = loop
+            logger.info("MessageProcessor initialized on the runtime event loop.")
+        else:
+            self.loop = asyncio.new_event_loop()
+            threading.Thread(target=self._start_event_loop, daemon=True).start()
+            logger.info("MessageProcessor initialized and event loop started.")
 
     def _start_event_loop(self):
         asyncio.set_event_loop(self.loop)
@@ -68,7 +74,7 @@ class MessageProcessor:
                         self.queues['receiver_stop_event'].set()  # Signal receiver thread to stop
                         self.queues['receiver'] = None
                         logger.info("Receiver stopped before carrier transmission.")
-                        self.backend.socketio.emit('reception_status', {'status': 'idle'})
+                        self.backend.publish_status()
 
                     if self.queues.get('receiver_done_event'):
                         logger.info("Waiting for receiver thread to stop...")
@@ -93,63 +99,49 @@ class MessageProcessor:
             # Handle normal APRS message processing
             logger.info("Processing message: %s", aprs_message)
 
-            # Generate WAV
-            silence_before = 0
-            silence_after = 0
-
             source_callsign = self.config_manager.get("callsign_source", "VE2FPD")
             destination_callsign = self.config_manager.get("callsign_dest", "VE2FPD")
 
-            aprs_line = f"{source_callsign}>{destination_callsign}:{aprs_message}"
+            if isinstance(aprs_message, AX25):
+                # Complete frame (e.g. from a KISS client), send as is
+                aprs_line = aprs_message
+            else:
+                aprs_line = f"{source_callsign}>{destination_callsign}:{aprs_message}"
 
-            # Schedule asynchronous WAV generation
-            asyncio.run_coroutine_threadsafe(
-                self._handle_wav_generation(aprs_line, flags_before, flags_after),
-                self.loop
-            )
+            # Modulate in memory, no WAV round trip. This runs on the caller's
+            # thread (the tx executor or the backend thread) with a private
+            # loop: the pure Python modulator would otherwise stall the shared
+            # runtime loop and its ingress, fan-out, KISS and APRS-IS tasks.
+            samples = asyncio.run(generate_aprs_samples(aprs_line, flags_before, flags_after))
+            if samples is None:
+                raise RuntimeError("APRS modulation failed.")
 
             gain = self.vars['gain_var'].get()
             if_gain = self.vars['if_gain_var'].get()
 
-            # Transmit
-            reset_hackrf()
-
-            # Stop receiver before transmission if it's running
-            
+            # Transmit: the arbiter pauses the receiver, sends and resumes it
             with self.lock:
-                if self.queues.get('receiver'):
-                    receiver = self.queues['receiver']
-                    receiver.stop()
-                    self.queues['receiver_stop_event'].set()  # Signal receiver thread to stop
-                    self.queues['receiver'] = None
-                    logger.info("Receiver stopped before transmission.")
-                    self.backend.socketio.emit('reception_status', {'status': 'idle'})
-
-                if self.queues.get('receiver_done_event'):
-                    logger.info("Waiting for receiver thread to stop...")
-                    self.queues['receiver_done_event'].wait()
-                time.sleep(0.1)
-                # Initialize transmission
-                tb = ResampleAndSend("processed_output.wav", 2205000, device_index=device_index)
-                if tb.initialize_hackrf(gain, if_gain):
-                    current_frequency = self.vars['frequency_var'].get()
-                    tb.set_center_freq(current_frequency)
-                    self.vars['transmitting_var'].set()
-                    self.backend.socketio.emit('transmission_status', {'status': 'active'})
-                    logger.info("Transmission started.")
-                    tb.start()
-                    logger.debug("Transmission thread started.")
-                    tb.wait()  # Wait for transmission to complete
-                    logger.info("Transmission done.")
-                    tb.stop_and_wait()
+                self.vars['transmitting_var'].set()
+                self.backend.socketio.emit('transmission_status', {'status': 'active'})
+                logger.info("Transmission started.")
+                try:
+                    transmitted = self.backend.radio_arbiter.transmit(
+                        samples,
+                        device_index=device_index,
+                        frequency=self.vars['frequency_var'].get(),
+                        gain=gain,
+                        if_gain=if_gain
+                    )
+                finally:
                     self.vars['transmitting_var'].clear()
                     self.backend.socketio.emit('transmission_status', {'status': 'idle'})
-                    logger.info("Transmission stopped.")
+                if transmitted:
+                    logger.info("Transmission done.")
                 else:
                     logger.error("HackRF initialization failed.")
                     self.backend.socketio.emit('system_error', {'message': 'HackRF initialization failed.'})
 
-                # Restart receiver
+                # Start a receiver if none was running before the transmission
                 if not self.queues.get('receiver'):
                     receiver_stop_event = threading.Event()
                     receiver = Receiver(
@@ -163,46 +155,14 @@ class MessageProcessor:
                     self.queues['receiver'] = receiver  # Store the new receiver instance
                     self.queues['receiver_stop_event'] = receiver_stop_event  # Store the stop event
                     logger.info("Receiver thread restarted.")
-                    self.backend.socketio.emit('reception_status', {'status': 'active'})
+                    self.backend.publish_status()
                 else:
                     logger.info("Receiver is already running, not restarting.")
 
-            # Handle received messages
-            while not self.queues['received_message_queue'].empty():
-                received_message = self.queues['received_message_queue'].get()
-                udp_transmitter(
-                    self.config_manager.get('send_ip'),
-                    self.config_manager.get('send_port'),
-                    received_message
-                )
-                logger.info(
-                    "Received message transmitted to %s:%d: %s",
-                    self.config_manager.get('send_ip'),
-                    self.config_manager.get('send_port'),
-                    received_message
-                )
-                # Emit the received message to the frontend
-                self.backend.socketio.emit('aprs_message', {'message': received_message})
-
         except Exception as e:
             logger.exception("Error in processing message: %s", e)
             self.backend.socketio.emit('system_error', {'message': f"Error in processing message: {e}"})
 
-    async def _handle_wav_generation(self, aprs_line: str, flags_before: int, flags_after: int):
-        """
-        Asynchronous handler for WAV generation.
-        """
-        try:
-            logger.debug("Starting WAV generation for line: %s", aprs_line)
-            await generate_aprs_wav(aprs_line, "raw_output.wav", flags_before, flags_after)
-            logger.debug("WAV generation completed. Adding silence.")
-            add_silence("raw_output.wav", "processed_output.wav", 0, 0)
-            logger.info("WAV files generated successfully.")
-            self.backend.socketio.emit('wav_generation', {'status': 'completed'})
-        except Exception as e:
-            logger.exception("Error generating WAV files: %s", e)
-            self.backend.socketio.emit('system_error', {'message': f"Error generating WAV files: {e}"})
-
     def restart_receiver(self):
         """ Restart the receiver by stopping and then restarting it. """
         try:
@@ -222,7 +182,7 @@ class MessageProcessor:
                         logger.info("Receiver thread stopped successfully.")
                     self.queues['receiver'] = None
                     logger.info("Receiver stopped.")
-                    self.backend.socketio.emit('reception_status', {'status': 'idle'})
+                    self.backend.publish_status()
 
                 time.sleep(0.1)
                 # Start a new receiver instance
@@ -238,7 +198,7 @@ class MessageProcessor:
                 self.queues['receiver'] = receiver  # Store the new receiver instance
                 self.queues['receiver_stop_event'] = receiver_stop_event  # Store the stop event
                 logger.info("Receiver restarted successfully.")
-                self.backend.socketio.emit('reception_status', {'status': 'active'})
+                self.backend.publish_status()
 
         except Exception as e:
             logger.exception("Failed to restart receiver: %s", e)
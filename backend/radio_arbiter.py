@@ -0,0 +1,129 @@
+# backend/radio_arbiter.py
+
+import threading
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from core import SampleTransmitter
+
+logger = logging.getLogger(__name__)
+
+# Radio ownership states
+STATE_IDLE = 'idle'
+STATE_RX = 'rx'
+STATE_TX = 'tx'
+
+class RadioArbiter:
+    """
+    Half-duplex owner of the HackRF.
+
+    The receive flowgraph (owned by Receiver) and the transmit flowgraph
+    (a SampleTransmitter) are both kept alive. A transmission pauses the
+    receiver, runs the transmitter to completion and resumes the receiver,
+    so no graph is rebuilt and no device reset is needed between packets.
+    """
+    def __init__(self, backend: Any, output_rate: int = 2205000):
+        self.backend = backend
+        self.output_rate = output_rate
+        self.lock = threading.Lock()
+        self.state = STATE_IDLE
+        self.transmitter: Optional[SampleTransmitter] = None
+        self.transmitter_device: Optional[int] = None
+        self._turnarounds = 0
+        self.metrics = {
+            'transmissions': 0,
+            'rx_to_tx_last_s': None,   # receiver paused -> transmitter ready
+            'tx_to_rx_last_s': None,   # transmission done -> receiver streaming
+            'tx_to_rx_max_s': None,
+            'tx_to_rx_avg_s': None,
+            'tx_duration_last_s': None,
+        }
+
+    def _get_transmitter(self, device_index: int, gain: float, if_gain: float) -> Optional[SampleTransmitter]:
+        """Build the transmit flowgraph once per device and reuse it."""
+        if self.transmitter is not None and self.transmitter_device != device_index:
+            self.transmitter.stop_and_wait()
+            self.transmitter = None
+        if self.transmitter is None:
+            tx = SampleTransmitter(self.output_rate, device_index=device_index,
+                                   device=self.backend.sdr_device(device_index))
+            if not tx.initialize_hackrf(gain, if_gain):
+                return None
+            self.transmitter = tx
+            self.transmitter_device = device_index
+        else:
+            self.transmitter.set_gain(gain, if_gain)
+        return self.transmitter
+
+    def transmit(self, samples, device_index: int, frequency: float, gain: float, if_gain: float) -> bool:
+        """
+        Take the radio from the receiver, send samples and hand it back.
+
+        Args:
+            samples: int16 AFSK samples at 22050 Hz.
+            device_index (int): HackRF index to transmit on.
+            frequency (float): Carrier frequency in Hz.
+            gain (float): TX RF gain.
+            if_gain (float): TX IF gain.
+
+        Returns:
+            bool: True if the samples were transmitted.
+        """
+        with self.lock:
+            receiver = self.backend.queues.get('receiver')
+            t_start = time.monotonic()
+            paused = receiver.pause() if receiver else False
+
+            tx = self._get_transmitter(device_index, gain, if_gain)
+            if tx is None:
+                if paused:
+                    receiver.resume()
+                    self.state = STATE_RX
+                return False
+            tx.set_center_freq(frequency)
+            t_ready = time.monotonic()
+
+            self.state = STATE_TX
+            try:
+                tx.transmit(samples)
+            finally:
+                t_done = time.monotonic()
+                if paused:
+                    receiver.resume()
+                    self.state = STATE_RX
+                else:
+                    self.state = STATE_IDLE
+                t_rx = time.monotonic()
+
+            self._record(t_ready - t_start, t_done - t_ready, t_rx - t_done if paused else None)
+            return True
+
+    def _record(self, rx_to_tx: float, tx_duration: float, tx_to_rx: Optional[float]) -> None:
+        m = self.metrics
+        m['transmissions'] += 1
+        m['rx_to_tx_last_s'] = rx_to_tx
+        m['tx_duration_last_s'] = tx_duration
+        if tx_to_rx is not None:
+            m['tx_to_rx_last_s'] = tx_to_rx
+            m['tx_to_rx_max_s'] = max(tx_to_rx, m['tx_to_rx_max_s'] or 0.0)
+            self._turnarounds += 1
+            avg = m['tx_to_rx_avg_s'] or 0.0
+            m['tx_to_rx_avg_s'] = avg + (tx_to_rx - avg) / self._turnarounds
+            logger.info("TX->RX turnaround %.1f ms.", tx_to_rx * 1e3)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return a copy of the arbiter metrics, including the current state."""
+        metrics = dict(self.metrics)
+        if self.state == STATE_TX:
+            metrics['state'] = STATE_TX
+        else:
+            metrics['state'] = STATE_RX if self.backend.queues.get('receiver') else STATE_IDLE
+        return metrics
+
+    def shutdown(self) -> None:
+        """Release the transmit flowgraph."""
+        with self.lock:
+            if self.transmitter is not None:
+                self.transmitter.stop_and_wait()
+                self.transmitter = None
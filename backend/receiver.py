@@ -1,10 +1,11 @@
 import threading
 import logging
+import time
 from typing import Any
 import queue  # Import the queue module
 
 from core.udp_listener import udp_listener  # Assuming this is defined in core
-from core import reset_hackrf, start_receiver
+from core import start_receiver
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +24,8 @@ class Receiver:
         self.frequency = frequency
         self.backend = backend  # Reference to Backend for emitting events
         self.is_receiving = False  # Add a state variable to track if receiving is active
+        self.tb = None  # Running AFSKReceiver flowgraph, set once the chain is up
+        self.idle_cpu_s = None  # CPU time used by the supervisor thread, set at exit
         self.thread = threading.Thread(
             target=self.receiver_thread,
             args=(self.stop_event, self.message_queue, self.device_index, self.frequency),
@@ -31,40 +34,136 @@ class Receiver:
 
     def receiver_thread(self, stop_event, message_queue, device_index, frequency):
         """
-        The thread function that handles receiving data. This simulates receiving.
+        Supervise the receive chain. Decoded frames are pushed to _on_frame by
+        the decoder itself, so this thread only blocks until the chain exits.
         """
-        start_receiver(stop_event, message_queue, device_index, frequency)
-
+        config = self.backend.config_manager
+        wall_start = time.monotonic()
+        cpu_start = time.thread_time()
         self.is_receiving = True  # Update to active receiving state once receiving starts
-        self.backend.socketio.emit('reception_status', {'status': 'active'})
+        self.backend.publish_status()
         try:
-            while not stop_event.is_set():
-                if not message_queue.empty():
-                    message = message_queue.get()  # Simulate processing received messages
-                    # Process the message here (e.g., log or handle the received data)
-                    logger.info(f"Receiver received message: {message}")
-                    self.backend.socketio.emit('aprs_message', {'message': message})
-                else:
-                    pass  # If no message, continue receiving
+            rx_thread = start_receiver(
+                stop_event,
+                message_queue,
+                device_index,
+                frequency,
+                decoder=config.get("rx_decoder", "stream"),
+                decode_workers=config.get("rx_decode_workers", 0) or None,
+                demod_bank=config.get("rx_demod_bank", []) or None,
+                profile=config.get("rx_profile", "monitor"),
+                on_ready=self._on_ready,
+                gain=config.get("rx_gain", 0),
+                if_gain=config.get("rx_if_gain", 32),
+                on_frame=self._on_frame,
+                queue_config=config.get("queues", {}),
+                capture_dir=config.get("iq_capture_dir", "") or None,
+                capture_chunk_s=config.get("iq_capture_chunk_s", 10.0),
+                capture_format=config.get("iq_capture_format", "cf32"),
+                replay_dir=config.get("iq_replay_dir", "") or None,
+                replay_rate=config.get("iq_replay_rate", 0) or None,
+                device=self.backend.sdr_device(device_index)
+            )
+            rx_thread.join()  # Returns once stop_event is set and the flowgraph is down
         except Exception as e:
             logger.error("Error during receiving: %s", e)
             self.backend.socketio.emit('system_error', {'message': f"Receiver error: {e}"})
         finally:
             self.is_receiving = False  # Mark receiving as stopped once the loop ends
-            self.backend.socketio.emit('reception_status', {'status': 'idle'})
-            logger.info("Receiver stopped.")
+            self.tb = None
+            self.idle_cpu_s = time.thread_time() - cpu_start
+            self.backend.publish_status()
+            logger.info("Receiver stopped (supervisor used %.3f s CPU over %.1f s).",
+                        self.idle_cpu_s, time.monotonic() - wall_start)
+
+    def _on_frame(self, ax25):
+        """Forward a decoded frame to the backend as soon as it arrives."""
+        self.backend.publish_frame(ax25)
+
+    def _on_ready(self, tb):
+        """Keep a handle on the running flowgraph for runtime control."""
+        self.tb = tb
+        if self.backend.config_manager.get("rx_monitor_tap", False):
+            self.attach_monitor()
+
+    def set_frequency(self, frequency: float) -> bool:
+        """
+        Retune the running receiver without tearing it down.
+
+        Returns:
+            bool: True if applied in place, False if the flowgraph is not running.
+        """
+        if self.tb is None:
+            return False
+        self.tb.set_frequency(frequency)
+        self.frequency = frequency
+        logger.info("Receiver retuned to %.2f Hz.", frequency)
+        return True
+
+    def set_gain(self, gain: float) -> bool:
+        """Apply a new RF gain to the running receiver."""
+        if self.tb is None:
+            return False
+        self.tb.set_gain(gain)
+        logger.info("Receiver gain set to %s.", gain)
+        return True
+
+    def set_if_gain(self, if_gain: float) -> bool:
+        """Apply a new IF gain to the running receiver."""
+        if self.tb is None:
+            return False
+        self.tb.set_if_gain(if_gain)
+        logger.info("Receiver IF gain set to %s.", if_gain)
+        return True
+
+    def pause(self) -> bool:
+        """
+        Stop streaming from the device but keep the flowgraph object alive,
+        so the radio can be handed to the transmitter and back quickly.
+
+        Returns:
+            bool: True if the flowgraph was paused.
+        """
+        if self.tb is None:
+            return False
+        self.tb.stop()
+        self.tb.wait()
+        self.is_receiving = False
+        return True
+
+    def resume(self) -> bool:
+        """Restart streaming on the paused flowgraph."""
+        if self.tb is None:
+            return False
+        self.tb.start()
+        self.is_receiving = True
+        return True
+
+    def attach_monitor(self):
+        """Attach the low rate listening tap to the running receiver."""
+        if self.tb is None:
+            logger.warning("Receiver flowgraph not running, cannot attach monitor tap.")
+            return
+        try:
+            self.tb.attach_monitor(rate=self.backend.config_manager.get("rx_monitor_rate", 8000))
+        except Exception as e:
+            logger.error("Failed to attach monitor tap: %s", e)
+
+    def detach_monitor(self):
+        """Detach the listening tap from the running receiver."""
+        if self.tb is not None:
+            self.tb.detach_monitor()
 
     def start(self):
         """Start the receiver thread."""
         self.thread.start()
         logger.info("Receiver thread started on device %d at %.2f Hz.", self.device_index, self.frequency)
-        self.backend.socketio.emit('reception_status', {'status': 'active'})
+        self.backend.publish_status()
 
     def stop(self):
         """Stop the receiver thread."""
         logger.info("Stopping receiver thread...")
-        self.stop_event.set()
-        reset_hackrf()  # Ensure HackRF is reset before joining the thread
+        self.stop_event.set()  # The flowgraph releases the device as it stops
         if self.thread.is_alive():
             self.thread.join()  # Wait for the thread to finish
             if self.thread.is_alive():
@@ -0,0 +1,181 @@
+# backend/runtime.py
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.udp_listener import IngressServer
+from core.bounded_queue import BoundedAsyncQueue, queue_settings
+
+logger = logging.getLogger(__name__)
+
+class AsyncRuntime:
+    """
+    Single asyncio loop for the backend services.
+
+    Replaces the Backend.run thread, the MessageProcessor loop thread and the
+    UDP listener thread. The loop owns UDP ingress, the transmit queue,
+    decoded frame fan-out and status events. Blocking work (modulation and
+    the radio) runs on one transmit executor thread, so transmissions stay
+    serialized, and demodulation stays in the receiver flowgraph.
+    """
+    def __init__(self, backend: Any):
+        self.backend = backend
+        self.loop = asyncio.new_event_loop()
+        self.tx_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tx')
+        self.tx_queue: Optional[asyncio.Queue] = None
+        self.ingress: Optional[IngressServer] = None
+        self.udp_addr: Optional[Tuple[str, int]] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._ready = threading.Event()
+        self._ready_lock = threading.Lock()
+        self._backlog = []  # Messages submitted before the loop is running
+        self._stop_requested = False
+        self.metrics = {
+            'messages': 0,
+            'frames': 0,
+            'dispatch_latency_last_s': None,  # submit -> processing started
+            'dispatch_latency_max_s': None,
+        }
+
+    def run(self) -> None:
+        """Run the loop in the calling thread until stop() is called."""
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._main())
+        finally:
+            self.tx_executor.shutdown(wait=True)
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+            logger.info("Async runtime stopped.")
+
+    async def _main(self) -> None:
+        self._stopped = asyncio.Event()
+        config = self.backend.config_manager
+        settings = queue_settings('message_queue', config.get("queues", {}))
+        self.tx_queue = BoundedAsyncQueue(settings['maxsize'], settings['policy'], name='tx_queue')
+        await self.start_udp(config.get('send_ip', "127.0.0.1"), config.get('send_port', 14581))
+        worker = asyncio.create_task(self._tx_worker())
+        with self._ready_lock:
+            for _, message in self._backlog:
+                self._enqueue(message)
+            self._backlog = []
+            if self._stop_requested:
+                self._stopped.set()
+            self._ready.set()
+        logger.info("Async runtime started.")
+        self.backend.publish_status(force=True)
+        try:
+            await self._stopped.wait()
+        finally:
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+            self._close_udp()
+
+    async def start_udp(self, ip: str, port: int) -> None:
+        """Bind the UDP (and optional TCP) ingress, replacing any previous one."""
+        self._close_udp()
+        config = self.backend.config_manager
+        ingress = IngressServer(
+            self._enqueue_batch,
+            max_datagram=config.get("udp_max_datagram", 65535),
+            batch_size=config.get("udp_recv_batch", 64),
+            rcvbuf=config.get("udp_rcvbuf", 0)
+        )
+        try:
+            await ingress.start(ip, port, tcp_port=config.get("tcp_ingress_port", 0))
+        except OSError as e:
+            ingress.close()
+            logger.error("UDP ingress failed to bind %s:%d: %s", ip, port, e)
+            self.backend.socketio.emit('system_error', {'message': f"UDP Listener error: {e}"})
+            return
+        self.ingress = ingress
+        self.udp_addr = (ip, port)
+        logger.info("UDP ingress listening on %s:%d.", ip, port)
+        self.backend.socketio.emit('udp_listener_status', {'status': 'active'})
+
+    def _close_udp(self) -> None:
+        if self.ingress is not None:
+            self.ingress.close()
+            self.ingress = None
+            self.backend.socketio.emit('udp_listener_status', {'status': 'stopped'})
+
+    def restart_udp(self, ip: str, port: int) -> None:
+        """Rebind UDP ingress from another thread."""
+        if self._ready.is_set():
+            asyncio.run_coroutine_threadsafe(self.start_udp(ip, port), self.loop)
+
+    def _enqueue(self, message: Any) -> None:
+        try:
+            self.tx_queue.put_nowait((time.monotonic(), message))
+        except asyncio.QueueFull:
+            # Counted as a drop by the queue, the loop must never block
+            logger.warning("Transmit queue full, message rejected.")
+
+    def _enqueue_batch(self, messages: List[str]) -> None:
+        for message in messages:
+            self._enqueue(message)
+
+    def submit(self, message: Any) -> None:
+        """
+        Queue a message for transmission. Safe to call from any thread.
+
+        Args:
+            message (Any): APRS payload or message tuple, as for MessageProcessor.
+        """
+        with self._ready_lock:
+            if not self._ready.is_set():
+                self._backlog.append((time.monotonic(), message))
+                return
+        self.loop.call_soon_threadsafe(self._enqueue, message)
+
+    async def _tx_worker(self) -> None:
+        processor = self.backend.message_processor
+        while True:
+            t_submit, message = await self.tx_queue.get()
+            self._record_dispatch(time.monotonic() - t_submit)
+            try:
+                await self.loop.run_in_executor(self.tx_executor, processor.process_message, message)
+            except Exception as e:
+                logger.exception("Error in message processing: %s", e)
+                self.backend.socketio.emit('system_error', {'message': f"Message processing error: {e}"})
+            finally:
+                self.tx_queue.task_done()
+            self.backend.publish_status()
+
+    def _record_dispatch(self, latency: float) -> None:
+        m = self.metrics
+        m['messages'] += 1
+        m['dispatch_latency_last_s'] = latency
+        m['dispatch_latency_max_s'] = max(latency, m['dispatch_latency_max_s'] or 0.0)
+
+    def publish_frame(self, ax25: Any) -> None:
+        """Hand a decoded frame to the loop for fan-out. Safe from any thread."""
+        if self._ready.is_set() and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._fan_out, ax25)
+
+    def _fan_out(self, ax25: Any) -> None:
+        self.metrics['frames'] += 1
+        self.backend.dispatch_frame(ax25)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return a copy of the runtime metrics."""
+        metrics = dict(self.metrics)
+        metrics['tx_queue'] = self.tx_queue.qsize() if self.tx_queue is not None else 0
+        return metrics
+
+    def get_ingress_stats(self) -> Optional[Dict[str, Any]]:
+        """Counters of the UDP/TCP ingress, None if it is not bound."""
+        return self.ingress.stats() if self.ingress is not None else None
+
+    def stop(self) -> None:
+        """Ask the loop to finish. Safe to call from any thread."""
+        with self._ready_lock:
+            if not self._ready.is_set():
+                self._stop_requested = True
+                return
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._stopped.set)
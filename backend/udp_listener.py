@@ -1,10 +1,11 @@
 # backend/udp_listener.py
 
+import asyncio
 import threading
 import logging
 import queue  # Import the queue module
 
-from core.udp_listener import udp_listener  # Assuming this is defined in core
+from core.udp_listener import IngressServer
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +33,9 @@ class UDPListenerThread:
         self.ip = ip
         self.port = port
         self.backend = backend  # Reference to Backend for emitting events
+        self.loop = None
+        self.ingress = None
+        self._stopped = None
         self.thread = threading.Thread(
             target=self.udp_listener_thread,
             args=(self.ip, self.port, self.message_queue, self.stop_event),
@@ -42,6 +46,9 @@ class UDPListenerThread:
         """
         The thread function that handles listening to UDP messages.
 
+        Runs a private event loop with an IngressServer, so datagrams are
+        drained in batches as they arrive instead of polled with a timeout.
+
         Args:
             ip (str): IP address to listen on.
             port (int): Port number to listen on.
@@ -51,7 +58,7 @@ class UDPListenerThread:
         logger.info(f"UDP Listener started on {ip}:{port}.")
         self.backend.socketio.emit('udp_listener_status', {'status': 'active'})
         try:
-            udp_listener(ip, port, message_queue, stop_event)  # Assuming this function blocks and listens
+            asyncio.run(self._serve(ip, port, message_queue, stop_event))
         except Exception as e:
             logger.exception("UDP Listener encountered an error: %s", e)
             self.backend.socketio.emit('system_error', {'message': f"UDP Listener error: {e}"})
@@ -59,6 +66,38 @@ class UDPListenerThread:
             self.backend.socketio.emit('udp_listener_status', {'status': 'stopped'})
             logger.info(f"UDP Listener stopped on {ip}:{port}.")
 
+    async def _serve(self, ip, port, message_queue, stop_event):
+        config = self.backend.config_manager
+        self._stopped = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        if stop_event.is_set():
+            return
+
+        def on_messages(messages):
+            for message in messages:
+                try:
+                    message_queue.put(message, block=False)
+                except queue.Full:
+                    logger.warning("Message queue full, UDP message rejected.")
+
+        self.ingress = IngressServer(
+            on_messages,
+            max_datagram=config.get("udp_max_datagram", 65535),
+            batch_size=config.get("udp_recv_batch", 64),
+            rcvbuf=config.get("udp_rcvbuf", 0)
+        )
+        await self.ingress.start(ip, port, tcp_port=config.get("tcp_ingress_port", 0))
+        try:
+            await self._stopped.wait()
+        finally:
+            self.ingress.close()
+
+    def get_stats(self):
+        """
+        Counters of the ingress server, None if it is not running.
+        """
+        return self.ingress.stats() if self.ingress is not None else None
+
     def start(self):
         """
         Start the UDP listener thread.
@@ -73,6 +112,11 @@ class UDPListenerThread:
         """
         logger.info("Stopping UDP listener thread...")
         self.stop_event.set()
+        if self.loop is not None and not self.loop.is_closed():
+            try:
+                self.loop.call_soon_threadsafe(self._stopped.set)
+            except RuntimeError:
+                pass  # Loop already closed
         if self.thread.is_alive():
             self.thread.join()
             logger.info("UDP listener thread stopped successfully.")
@@ -1,6 +1,7 @@
-from .hackrf_utils import reset_hackrf, list_hackrf_devices
-from .aprs_utils import generate_aprs_wav, add_silence
-from .transmitter import ResampleAndSend
+from .hackrf_utils import reset_hackrf, list_hackrf_devices, device_lifecycle
+from .aprs_utils import generate_aprs_wav, generate_aprs_samples, add_silence
+from .sdr import SDRDevice, HackRFDevice, SimulatedDevice, get_device
+from .transmitter import ResampleAndSend, SampleTransmitter
 from .receiver import start_receiver
 from .utils import Frequency, ThreadSafeVariable
 from .gui import Application
@@ -8,9 +9,16 @@ from .gui import Application
 __all__ = [
     "reset_hackrf",
     "list_hackrf_devices",
+    "device_lifecycle",
     "generate_aprs_wav",
+    "generate_aprs_samples",
     "add_silence",
+    "SDRDevice",
+    "HackRFDevice",
+    "SimulatedDevice",
+    "get_device",
     "ResampleAndSend",
+    "SampleTransmitter",
     "start_receiver",
     "Frequency",
     "ThreadSafeVariable",
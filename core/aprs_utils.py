@@ -23,6 +23,69 @@ logging.basicConfig(
     ]
 )
 
+async def generate_aprs_samples(aprs_message, flags_before=10, flags_after=4, rate=22050):
+    """
+    Modulate an APRS message into an int16 NumPy array of AFSK samples.
+    aprs_message is a "SRC>DST,PATH:info" line or an AX25 frame object.
+    """
+    if AFSKModulator is None or AX25 is None:
+        logging.error("AFSKModulator or AX25 not available. Cannot generate APRS samples.")
+        return None
+
+    async with AFSKModulator(sampling_rate=rate, verbose=False) as afsk_mod:
+
+        if isinstance(aprs_message, AX25):
+            ax25_frame = aprs_message
+        else:
+            ax25_frame = AX25(aprs=aprs_message.encode())
+        afsk, stop_bit = ax25_frame.to_afsk()
+
+        await afsk_mod.send_flags(flags_before)
+        await afsk_mod.to_samples(afsk=afsk, stop_bit=stop_bit)
+        await afsk_mod.send_flags(flags_after)
+        arr, s = await afsk_mod.flush()
+
+    # Convert arr to a NumPy array for efficient processing
+    arr = np.array(arr, dtype=np.float32)
+
+    # Log the data type and range of audio samples before processing
+    logging.debug(f"Audio data type before processing: {arr.dtype}")
+    logging.debug(f"Audio sample range before processing: {arr.min()} to {arr.max()}")
+
+    # Check for NaNs or Infs in the audio data
+    if np.isnan(arr).any() or np.isinf(arr).any():
+        logging.error("Audio samples contain NaN or Inf values.")
+        raise ValueError("Invalid audio samples detected.")
+
+    # Normalize the audio signal if necessary
+    max_val = np.max(np.abs(arr))
+    if max_val == 0:
+        logging.warning("Maximum audio value is 0. Skipping normalization.")
+        audio_normalized = arr
+    elif max_val > 32767:
+        scaling_factor = 32767 / max_val
+        audio_normalized = arr * scaling_factor
+        logging.debug(f"Audio normalized by scaling factor: {scaling_factor}")
+    else:
+        audio_normalized = arr
+        logging.debug("Audio normalization not required.")
+
+    # Clip the audio samples to the int16 range
+    audio_clipped = np.clip(audio_normalized, -32768, 32767)
+
+    # Log the range after normalization and clipping
+    logging.debug(f"Audio sample range after normalization and clipping: {audio_clipped.min()} to {audio_clipped.max()}")
+
+    # Convert to int16
+    audio_int16 = audio_clipped.astype(np.int16)
+
+    # Final check to ensure no overflow
+    if np.any(audio_int16 > 32767) or np.any(audio_int16 < -32768):
+        logging.error("Audio samples exceed int16 range after processing.")
+        raise ValueError("Audio samples exceed int16 range after processing.")
+
+    return audio_int16
+
 async def generate_aprs_wav(aprs_message, output_wav, flags_before=10, flags_after=4):
     """Generate a WAV file from an APRS message."""
     if AFSKModulator is None or AX25 is None:
@@ -32,63 +95,16 @@ async def generate_aprs_wav(aprs_message, output_wav, flags_before=10, flags_aft
     rate = 22050  # Sample rate in Hz
     logging.info(f"Generating APRS WAV for message: {aprs_message}")
     try:
-        async with AFSKModulator(sampling_rate=rate, verbose=False) as afsk_mod:
+        audio_int16 = await generate_aprs_samples(aprs_message, flags_before, flags_after, rate)
 
-            ax25_frame = AX25(aprs=aprs_message.encode())
-            afsk, stop_bit = ax25_frame.to_afsk()
-            
-            await afsk_mod.send_flags(flags_before)
-            await afsk_mod.to_samples(afsk=afsk, stop_bit=stop_bit)
-            await afsk_mod.send_flags(flags_after)
-            arr, s = await afsk_mod.flush()
-
-            # Convert arr to a NumPy array for efficient processing
-            arr = np.array(arr, dtype=np.float32)
-
-            # Log the data type and range of audio samples before processing
-            logging.debug(f"Audio data type before processing: {arr.dtype}")
-            logging.debug(f"Audio sample range before processing: {arr.min()} to {arr.max()}")
-
-            # Check for NaNs or Infs in the audio data
-            if np.isnan(arr).any() or np.isinf(arr).any():
-                logging.error("Audio samples contain NaN or Inf values.")
-                raise ValueError("Invalid audio samples detected.")
-
-            # Normalize the audio signal if necessary
-            max_val = np.max(np.abs(arr))
-            if max_val == 0:
-                logging.warning("Maximum audio value is 0. Skipping normalization.")
-                audio_normalized = arr
-            elif max_val > 32767:
-                scaling_factor = 32767 / max_val
-                audio_normalized = arr * scaling_factor
-                logging.debug(f"Audio normalized by scaling factor: {scaling_factor}")
-            else:
-                audio_normalized = arr
-                logging.debug("Audio normalization not required.")
-
-            # Clip the audio samples to the int16 range
-            audio_clipped = np.clip(audio_normalized, -32768, 32767)
-
-            # Log the range after normalization and clipping
-            logging.debug(f"Audio sample range after normalization and clipping: {audio_clipped.min()} to {audio_clipped.max()}")
-
-            # Convert to int16
-            audio_int16 = audio_clipped.astype(np.int16)
-
-            # Final check to ensure no overflow
-            if np.any(audio_int16 > 32767) or np.any(audio_int16 < -32768):
-                logging.error("Audio samples exceed int16 range after processing.")
-                raise ValueError("Audio samples exceed int16 range after processing.")
-
-            # Write to WAV file in bulk
-            with wave.open(output_wav, 'wb') as wav_out:
-                wav_out.setnchannels(1)        # Mono
-                wav_out.setsampwidth(2)        # 2 bytes per sample (int16)
-                wav_out.setframerate(rate)     # Sample rate
-                wav_out.writeframes(audio_int16.tobytes())
-
-            logging.info(f"WAV file successfully generated: {output_wav}")
+        # Write to WAV file in bulk
+        with wave.open(output_wav, 'wb') as wav_out:
+            wav_out.setnchannels(1)        # Mono
+            wav_out.setsampwidth(2)        # 2 bytes per sample (int16)
+            wav_out.setframerate(rate)     # Sample rate
+            wav_out.writeframes(audio_int16.tobytes())
+
+        logging.info(f"WAV file successfully generated: {output_wav}")
     except Exception as e:
         logging.error(f"Error generating APRS WAV: {e}")
 
@@ -0,0 +1,154 @@
+# core/bounded_queue.py
+
+import asyncio
+import queue
+import weakref
+
+# What to do with a new item when the queue is full
+BLOCK = 'block'              # wait for room (backpressure on the producer)
+DROP_OLDEST = 'drop-oldest'  # discard the oldest queued item to make room
+DROP_NEWEST = 'drop-newest'  # discard the new item
+POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST)
+
+# Default size and policy of each pipeline queue, overridden by the "queues"
+# entry of the configuration
+QUEUE_DEFAULTS = {
+    # 480 sample blocks from the flowgraph, about 10 ms each
+    'samples_q': {'maxsize': 200, 'policy': DROP_OLDEST},
+    # single demodulated bits, dropping any would corrupt the frame
+    'bits_q': {'maxsize': 4096, 'policy': BLOCK},
+    # decoded AX.25 frames
+    'ax25_q': {'maxsize': 256, 'policy': DROP_OLDEST},
+    'received_message_queue': {'maxsize': 256, 'policy': DROP_OLDEST},
+    # messages waiting to be transmitted
+    'message_queue': {'maxsize': 128, 'policy': BLOCK},
+}
+
+_registry = weakref.WeakValueDictionary()
+
+def queue_settings(name, overrides=None):
+    """
+    Size and policy for the named queue, defaults merged with overrides.
+    """
+    settings = dict(QUEUE_DEFAULTS.get(name, {'maxsize': 0, 'policy': BLOCK}))
+    if overrides and name in overrides:
+        settings.update(overrides[name])
+    if settings['policy'] not in POLICIES:
+        raise ValueError(f"Unknown queue policy {settings['policy']!r} for {name}.")
+    return settings
+
+def queue_stats():
+    """
+    Counters of every live named queue.
+    """
+    return {name: q.stats() for name, q in list(_registry.items())}
+
+class _QueueStats:
+    """
+    High-water mark and drop counters shared by both queue flavours.
+    """
+    def _init_stats(self, name, policy):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy {policy!r}.")
+        self.name = name
+        self.policy = policy
+        self.high_water = 0
+        self.enqueued = 0
+        self.dropped = 0
+        if name:
+            _registry[name] = self
+
+    def _note_put(self, size):
+        self.enqueued += 1
+        if size > self.high_water:
+            self.high_water = size
+
+    def stats(self):
+        return {
+            'maxsize': self.maxsize,
+            'policy': self.policy,
+            'size': self.qsize(),
+            'high_water': self.high_water,
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+        }
+
+class BoundedAsyncQueue(_QueueStats, asyncio.Queue):
+    """
+    asyncio.Queue with a full-queue policy. With BLOCK, put() waits for room
+    and put_nowait() raises QueueFull (counted as a drop); the drop policies
+    never block.
+    """
+    def __init__(self, maxsize=0, policy=BLOCK, name=None):
+        asyncio.Queue.__init__(self, maxsize)
+        self._init_stats(name, policy)
+
+    def put_nowait(self, item):
+        if self.full():
+            if self.policy == DROP_NEWEST:
+                self.dropped += 1
+                return
+            if self.policy == DROP_OLDEST:
+                self.get_nowait()
+                self.task_done()
+                self.dropped += 1
+            else:
+                self.dropped += 1
+                raise asyncio.QueueFull
+        asyncio.Queue.put_nowait(self, item)
+        self._note_put(self.qsize())
+
+    async def put(self, item):
+        if self.policy == BLOCK:
+            return await asyncio.Queue.put(self, item)
+        return self.put_nowait(item)
+
+class BoundedQueue(_QueueStats, queue.Queue):
+    """
+    Thread-safe queue.Queue with a full-queue policy. With BLOCK it behaves
+    like queue.Queue; the drop policies never block.
+    """
+    def __init__(self, maxsize=0, policy=BLOCK, name=None):
+        queue.Queue.__init__(self, maxsize)
+        self._init_stats(name, policy)
+
+    def _put(self, item):
+        # Called with the mutex held
+        queue.Queue._put(self, item)
+        self._note_put(self._qsize())
+
+    def put(self, item, block=True, timeout=None):
+        if self.policy == BLOCK:
+            try:
+                return queue.Queue.put(self, item, block, timeout)
+            except queue.Full:
+                self.dropped += 1
+                raise
+        with self.mutex:
+            if 0 < self.maxsize <= self._qsize():
+                self.dropped += 1
+                if self.policy == DROP_NEWEST:
+                    return
+                self._get()
+                self.unfinished_tasks -= 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def force_put(self, item):
+        """
+        Enqueue regardless of maxsize, for control sentinels that must
+        never be dropped or block.
+        """
+        with self.mutex:
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+def make_async_queue(name, overrides=None):
+    settings = queue_settings(name, overrides)
+    return BoundedAsyncQueue(settings['maxsize'], settings['policy'], name=name)
+
+def make_queue(name, overrides=None):
+    settings = queue_settings(name, overrides)
+    return BoundedQueue(settings['maxsize'], settings['policy'], name=name)
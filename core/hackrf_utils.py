@@ -1,5 +1,7 @@
 import subprocess
 import re
+import threading
+from collections import Counter
 
 def reset_hackrf():
     """Reset the HackRF device."""
@@ -7,6 +9,75 @@ def reset_hackrf():
     subprocess.run(["hackrf_transfer", "-t", "/dev/null"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     print("HackRF reset completed.")
 
+class HackRFLifecycle:
+    """
+    Track which osmosdr blocks hold each HackRF open.
+
+    The device is opened by constructing an osmosdr source/sink and released
+    by dropping that object, so a clean hand-over between RX and TX needs no
+    external tool. The hackrf_transfer reset is only used as a fallback when
+    opening the device actually fails.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._holders = {}  # device_index -> Counter of open blocks per owner name
+        self.counters = {
+            'opens': 0,
+            'releases': 0,
+            'open_failures': 0,
+            'fallback_resets': 0,
+        }
+
+    def open(self, device_index, factory, owner):
+        """
+        Open the device by calling factory() (which builds the osmosdr block).
+        On failure, reset the device with hackrf_transfer and retry once.
+        """
+        try:
+            block = factory()
+        except RuntimeError as e:
+            with self._lock:
+                self.counters['open_failures'] += 1
+            print(f"Opening HackRF {device_index} for {owner} failed ({e}), resetting device.")
+            self.fallback_reset()
+            block = factory()
+        with self._lock:
+            self._holders.setdefault(device_index, Counter())[owner] += 1
+            self.counters['opens'] += 1
+        return block
+
+    def release(self, device_index, owner):
+        """Record that owner dropped one of its osmosdr blocks for device_index."""
+        with self._lock:
+            holders = self._holders.get(device_index, Counter())
+            if holders[owner] > 0:
+                holders[owner] -= 1
+                if not holders[owner]:
+                    del holders[owner]
+                self.counters['releases'] += 1
+
+    def is_open(self, device_index):
+        with self._lock:
+            return bool(self._holders.get(device_index))
+
+    def holders(self, device_index):
+        with self._lock:
+            return set(self._holders.get(device_index, ()))
+
+    def fallback_reset(self):
+        with self._lock:
+            self.counters['fallback_resets'] += 1
+        reset_hackrf()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['open_devices'] = {k: dict(sorted(v.items())) for k, v in self._holders.items() if v}
+        return stats
+
+# Shared by every flowgraph in the process
+device_lifecycle = HackRFLifecycle()
+
 def list_hackrf_devices():
     """List all connected HackRF devices using hackrf_info."""
     try:
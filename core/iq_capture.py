@@ -0,0 +1,104 @@
+import threading
+import time
+
+import numpy as np
+from gnuradio import gr
+
+from lib.iq_store import IQCaptureReader
+
+
+class IQCaptureSink(gr.sync_block):
+    """
+    A GNU Radio block that records the raw source IQ into a chunked,
+    memory-mapped capture (see lib.iq_store). work() only copies into the
+    mapped chunk, the kernel writes it back, so the flowgraph never waits on
+    the disk.
+    """
+    def __init__(self, writer):
+        gr.sync_block.__init__(
+            self,
+            name='IQCaptureSink',
+            in_sig=[np.complex64],
+            out_sig=None
+        )
+        self.writer = writer
+        self.lock = threading.Lock()  # set_metadata comes from the control thread
+
+    def work(self, input_items, output_items):
+        in0 = input_items[0]
+        # The samples were buffered upstream, date the first one accordingly
+        timestamp = time.time() - len(in0) / self.writer.samp_rate
+        with self.lock:
+            self.writer.write(in0, timestamp)
+        return len(in0)
+
+    def set_metadata(self, **kwargs):
+        """Record new radio settings, the following samples start a new chunk."""
+        with self.lock:
+            self.writer.set_metadata(**kwargs)
+
+    def close(self):
+        with self.lock:
+            self.writer.close()
+
+
+class IQReplaySource(gr.sync_block):
+    """
+    A GNU Radio source that plays a capture back in place of osmosdr_source.
+    With rate=None it runs as fast as the flowgraph consumes, rate=1.0 paces
+    it to real time. The osmosdr setters used by AFSKReceiver are accepted
+    and ignored, the capture already carries the settings it was made with.
+    """
+    def __init__(self, directory, rate=None, block_size=1 << 16):
+        gr.sync_block.__init__(
+            self,
+            name='IQReplaySource',
+            in_sig=None,
+            out_sig=[np.complex64]
+        )
+        self.reader = IQCaptureReader(directory)
+        self.rate = rate
+        self.samp_rate = self.reader.metadata.get('samp_rate', 4.8e6)
+        self.blocks = self.reader.blocks(block_size)
+        self.chunk = self.reader.metadata
+        self.pending = np.zeros(0, dtype=np.complex64)
+        self.sent = 0
+        self.t0 = None
+        self.done = threading.Event()
+
+    def work(self, input_items, output_items):
+        out = output_items[0]
+        if self.t0 is None:
+            self.t0 = time.monotonic()
+        if not len(self.pending):
+            try:
+                self.chunk, _, self.pending = next(self.blocks)
+            except StopIteration:
+                self.done.set()
+                return -1  # WORK_DONE
+        n = min(len(out), len(self.pending))
+        out[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        self.sent += n
+        if self.rate:
+            ahead = self.sent / (self.samp_rate * self.rate) - (time.monotonic() - self.t0)
+            if ahead > 0:
+                time.sleep(ahead)
+        return n
+
+    def progress(self):
+        """Fraction of the capture played back."""
+        return self.sent / len(self.reader) if len(self.reader) else 1.0
+
+    # osmosdr_source interface used by AFSKReceiver
+    def set_center_freq(self, freq, chan=0):
+        return freq
+
+    def set_gain(self, gain, chan=0):
+        return gain
+
+    def set_if_gain(self, gain, chan=0):
+        return gain
+
+    def set_bb_gain(self, gain, chan=0):
+        return gain
@@ -0,0 +1,128 @@
+# core/kiss_pty.py
+
+import asyncio
+import os
+import tty
+
+from ax25.kiss import FEND, KISSDecoder, decode_data_frames, encode_ax25
+
+class KISSPty:
+    """
+    Virtual serial KISS TNC on a pseudo-terminal.
+
+    Serial-only KISS clients open the slave side (slave_name, or the link
+    path if one is given) as if it were a hardware TNC. Decoded frames are
+    written to the master side and KISS data frames read from it are handed
+    to on_frame(ax25), with the same framing as the TCP server.
+
+    The master fd is non-blocking and watched by the loop. Outbound frames
+    are appended to a buffer of at most max_buffer bytes; when nobody reads
+    the port the buffer fills and whole frames are dropped, so the KISS
+    stream never carries a truncated frame.
+
+    Pass master_fd to drive an existing pty (e.g. one end of os.openpty()
+    in a test) instead of creating one.
+    """
+    def __init__(self, on_frame=None, link=None, max_buffer=65536, max_frame=1024, master_fd=None):
+        self.on_frame = on_frame
+        self.link = link
+        self.max_buffer = max_buffer
+        self.decoder = KISSDecoder(max_len=max_frame)
+        self.loop = None
+        self.slave_fd = None
+        self.slave_name = None
+        if master_fd is None:
+            master_fd, self.slave_fd = os.openpty()
+            tty.setraw(self.slave_fd)
+            self.slave_name = os.ttyname(self.slave_fd)
+        self.master_fd = master_fd
+        os.set_blocking(self.master_fd, False)
+        self.out = bytearray()
+        self.writing = False
+        self.counters = {
+            'frames_out': 0,
+            'frames_in': 0,
+            'bad_frames': 0,
+            'dropped': 0,
+            'write_errors': 0,
+            'buffer_high_water': 0,
+        }
+
+    async def start(self):
+        """Watch the pty on the running loop and create the link, if any."""
+        self.loop = asyncio.get_running_loop()
+        if self.link and self.slave_name:
+            if os.path.islink(self.link):
+                os.unlink(self.link)
+            os.symlink(self.slave_name, self.link)
+        self.loop.add_reader(self.master_fd, self._read_ready)
+        print(f"KISS pty on {self.link or self.slave_name}")
+
+    def _read_ready(self):
+        try:
+            data = os.read(self.master_fd, 4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            # EIO while no process holds the slave side open
+            return
+        frames, bad = decode_data_frames(self.decoder, data)
+        self.counters['bad_frames'] += bad
+        self.counters['frames_in'] += len(frames)
+        if self.on_frame is not None:
+            for ax25 in frames:
+                self.on_frame(ax25)
+
+    def broadcast(self, ax25):
+        """Queue a frame for the serial client. Must run on the pty loop."""
+        data = encode_ax25(ax25)
+        if len(self.out) + len(data) > self.max_buffer:
+            self.counters['dropped'] += 1
+            return
+        self.out += data
+        self.counters['frames_out'] += 1
+        self.counters['buffer_high_water'] = max(self.counters['buffer_high_water'], len(self.out))
+        if not self.writing:
+            self._write_ready()
+
+    def broadcast_threadsafe(self, ax25):
+        """broadcast() from any thread."""
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.broadcast, ax25)
+
+    def _write_ready(self):
+        try:
+            n = os.write(self.master_fd, self.out)
+        except (BlockingIOError, InterruptedError):
+            n = 0
+        except OSError as e:
+            # The error would repeat on every write: give up on what is
+            # buffered, each frame (or frame tail) ends with a FEND
+            self.counters['write_errors'] += 1
+            self.counters['dropped'] += (self.out.count(FEND) + 1)//2
+            print(f"KISS pty write error: {e}")
+            n = len(self.out)
+        del self.out[:n]
+        if self.out and not self.writing:
+            self.loop.add_writer(self.master_fd, self._write_ready)
+            self.writing = True
+        elif not self.out and self.writing:
+            self.loop.remove_writer(self.master_fd)
+            self.writing = False
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats['buffered'] = len(self.out)
+        stats['bad_frames'] += self.decoder.errors
+        return stats
+
+    def close(self):
+        """Stop watching the pty and close it. Must run on the pty loop."""
+        if self.loop is not None:
+            self.loop.remove_reader(self.master_fd)
+            self.loop.remove_writer(self.master_fd)
+        os.close(self.master_fd)
+        if self.slave_fd is not None:
+            os.close(self.slave_fd)
+        if self.link and os.path.islink(self.link):
+            os.unlink(self.link)
@@ -0,0 +1,121 @@
+# core/kiss_server.py
+
+import asyncio
+
+from ax25.kiss import KISSDecoder, decode_data_frames, encode_ax25
+
+class KISSServer:
+    """
+    KISS TNC over TCP.
+
+    Every decoded AX25 frame is sent as a KISS data frame to all connected
+    clients, and KISS data frames received from any client are handed to
+    on_frame(ax25) for transmission. Frames are encoded once per broadcast
+    and written by one task per client; a client whose queue fills up or
+    whose socket does not drain within write_timeout is disconnected so it
+    cannot hold up the others.
+    """
+    def __init__(self, on_frame=None, client_queue=64, write_timeout=5.0, max_frame=1024):
+        self.on_frame = on_frame
+        self.client_queue = client_queue
+        self.write_timeout = write_timeout
+        self.max_frame = max_frame
+        self.loop = None
+        self.server = None
+        self.clients = set()
+        self.counters = {
+            'connections': 0,
+            'evicted': 0,
+            'frames_out': 0,
+            'frames_in': 0,
+            'bad_frames': 0,
+        }
+
+    async def start(self, host, port):
+        """Listen on host:port, on the running loop."""
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._handle, host, port)
+        print(f"KISS server listening on {host}:{port}")
+
+    def broadcast(self, ax25):
+        """Queue a frame for every client. Must run on the server loop."""
+        if not self.clients:
+            return
+        data = encode_ax25(ax25)
+        self.counters['frames_out'] += 1
+        for client in list(self.clients):
+            try:
+                client.queue.put_nowait(data)
+            except asyncio.QueueFull:
+                self._evict(client, "queue full")
+
+    def broadcast_threadsafe(self, ax25):
+        """broadcast() from any thread."""
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.broadcast, ax25)
+
+    async def _handle(self, reader, writer):
+        client = _KISSClient(writer, self.client_queue)
+        self.clients.add(client)
+        self.counters['connections'] += 1
+        client.writer_task = asyncio.create_task(self._write(client))
+        decoder = KISSDecoder(max_len=self.max_frame)
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                frames, bad = decode_data_frames(decoder, data)
+                self.counters['bad_frames'] += bad
+                self.counters['frames_in'] += len(frames)
+                if self.on_frame is not None:
+                    for ax25 in frames:
+                        self.on_frame(ax25)
+        except ConnectionError:
+            pass
+        finally:
+            self.counters['bad_frames'] += decoder.errors
+            self._drop(client)
+
+    async def _write(self, client):
+        try:
+            while True:
+                data = await client.queue.get()
+                client.writer.write(data)
+                await asyncio.wait_for(client.writer.drain(), self.write_timeout)
+        except asyncio.TimeoutError:
+            self._evict(client, "write timeout")
+        except (ConnectionError, asyncio.CancelledError):
+            self._drop(client)
+
+    def _evict(self, client, reason):
+        if client in self.clients:
+            self.counters['evicted'] += 1
+            print(f"KISS client {client.peer} evicted: {reason}")
+        self._drop(client)
+
+    def _drop(self, client):
+        self.clients.discard(client)
+        if client.writer_task is not None and client.writer_task is not asyncio.current_task():
+            client.writer_task.cancel()
+        client.writer.close()
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats['clients'] = len(self.clients)
+        return stats
+
+    def close(self):
+        """Stop listening and disconnect every client. Must run on the server loop."""
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+        for client in list(self.clients):
+            self._drop(client)
+
+class _KISSClient:
+    def __init__(self, writer, maxsize):
+        self.writer = writer
+        self.peer = writer.get_extra_info('peername')
+        self.queue = asyncio.Queue(maxsize)
+        self.writer_task = None
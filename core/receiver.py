@@ -4,9 +4,14 @@ import queue
 import socket
 import numpy as np
 
-from gnuradio import gr, blocks, filter, analog, audio
+from gnuradio import gr, blocks, filter, analog
 from gnuradio.filter import firdes
-import osmosdr
+
+from core.sdr import HackRFDevice
+from core.bounded_queue import BLOCK, make_async_queue
+from core.iq_capture import IQCaptureSink, IQReplaySource
+from lib.iq_store import IQCaptureWriter
+from afsk.profiles import PROFILES_FILE, RECEIVER_RATE, load_profile
 
 # Assuming AFSKDemodulator and AX25FromAFSK are available
 try:
@@ -17,10 +22,31 @@ except ImportError as e:
     AX25FromAFSK = None
     print("Warning: AFSKDemodulator or AX25FromAFSK not available.")
 
+try:
+    from afsk.burst import BurstSegmenter, BurstDecoder
+except ImportError:
+    BurstSegmenter = None
+    BurstDecoder = None
+
+try:
+    from afsk.bank import DemodBank
+except ImportError:
+    DemodBank = None
+
+def _put_nowait(q, item):
+    # Loop callback for producers in other threads, a full BLOCK queue
+    # rejects the item (and counts it) instead of raising into the loop
+    try:
+        q.put_nowait(item)
+    except asyncio.QueueFull:
+        pass
+
 class QueueSink(gr.sync_block):
     """
     A GNU Radio block that puts samples into an asyncio queue using run_coroutine_threadsafe().
     It detects audio presence by a threshold and only forwards samples if energy is above it.
+    With a BLOCK policy queue the work thread waits for room, which pushes back
+    on the flowgraph; the drop policies never stall it.
     """
     def __init__(self, samples_q, threshold=500):
         gr.sync_block.__init__(
@@ -42,6 +68,7 @@ class QueueSink(gr.sync_block):
 
         self.set_output_multiple(480)
         self.threshold = threshold
+        self.block_timeout = 1.0  # Give up on a full queue so a stopped loop cannot hang the flowgraph
 
     def work(self, input_items, output_items):
         in0 = input_items[0]
@@ -50,15 +77,65 @@ class QueueSink(gr.sync_block):
         if energy > self.threshold:
             samples = in0.copy()
             idx = len(samples)
-            # Schedule the coroutine to put samples into the queue
-            # without awaiting directly here
-            future = asyncio.run_coroutine_threadsafe(self.samples_q.put((samples, idx)), self.loop)
-            # future.result() if you need to catch exceptions, but generally not required here.
+            if getattr(self.samples_q, 'policy', None) == BLOCK:
+                # Wait for room in the queue
+                future = asyncio.run_coroutine_threadsafe(self.samples_q.put((samples, idx)), self.loop)
+                try:
+                    future.result(self.block_timeout)
+                except Exception:
+                    future.cancel()
+                    self.samples_q.dropped += 1
+            else:
+                self.loop.call_soon_threadsafe(_put_nowait, self.samples_q, (samples, idx))
+
+        return len(in0)
+
+class BurstSink(gr.sync_block):
+    """
+    A GNU Radio block that cuts the audio into discrete bursts and hands each
+    burst to a process pool for demodulation and deframing. Decoded frames are
+    pushed to ax25_q on the receiver event loop, in completion order.
+    """
+    def __init__(self, ax25_q, loop, sampling_rate=48000, threshold=500, workers=None, options=None):
+        gr.sync_block.__init__(
+            self,
+            name='BurstSink',
+            in_sig=[np.int16],
+            out_sig=None
+        )
+        self.ax25_q = ax25_q
+        self.loop = loop
+        self.segmenter = BurstSegmenter(sampling_rate=sampling_rate, threshold=threshold)
+        self.decoder = BurstDecoder(self.on_burst_decoded, sampling_rate=sampling_rate, workers=workers,
+                                    options=options or {})
+        self.set_output_multiple(480)
 
+    def work(self, input_items, output_items):
+        in0 = input_items[0]
+        for burst in self.segmenter.feed(in0):
+            self.decoder.submit(burst)
         return len(in0)
 
+    def on_burst_decoded(self, burst, frames):
+        # Called from the executor result thread
+        for ax25 in frames:
+            self.loop.call_soon_threadsafe(_put_nowait, self.ax25_q, ax25)
+
+    def close(self):
+        """
+        Decode the burst still open and wait for the pool, the frames are on
+        their way to ax25_q (via the loop) when this returns.
+        """
+        for burst in self.segmenter.flush():
+            self.decoder.submit(burst)
+        self.decoder.shutdown(wait=True, cancel=False)
+
 class AFSKReceiver(gr.top_block):
-    def __init__(self, samples_q, device_index=0, frequency=50.01e6):
+    PROFILES = ('monitor', 'headless')
+    SAMP_RATE = 48e3 * 100
+
+    def __init__(self, samples_q, device_index=0, frequency=50.01e6, demod_sink=None, profile='monitor',
+                 gain=0, if_gain=32, capture=None, replay=None, device=None):
         super(AFSKReceiver, self).__init__()
         ##################################################
         # Variables
@@ -67,32 +144,43 @@ class AFSKReceiver(gr.top_block):
         self.freq = frequency           # Frequency in Hz
         self.vol = 8                  # Volume multiplier
         self.sql = 52                 # Squelch threshold
-        self.samp_rate = 48e3 * 100   # Sample rate (4.8e6 Hz)
+        self.samp_rate = self.SAMP_RATE  # Sample rate (4.8e6 Hz)
         self.nbfm_bandwidth = 12e3    # Narrowband FM bandwidth
-        self.ifg = 32                 # IF Gain
-        self.center_freq = self.freq + 500e3  # Center frequency (28.62e6 Hz)
+        self.gain = gain              # RF Gain
+        self.ifg = if_gain            # IF Gain
+        self.lo_offset = 500e3        # Tune off the carrier to stay clear of the DC spike
+        self.center_freq = self.freq + self.lo_offset  # Center frequency (28.62e6 Hz)
         self.bbg = 32                 # BB Gain
 
+        # A replayed capture brings its own rate and tuning
+        self.replay = replay
+        if replay is not None:
+            meta = replay.chunk
+            self.samp_rate = replay.samp_rate
+            self.freq = meta.get('freq', self.freq)
+            self.lo_offset = meta.get('center_freq', self.freq + self.lo_offset) - self.freq
+            self.center_freq = self.freq + self.lo_offset
+
         ##################################################
         # Blocks
         ##################################################
 
-        # SDR Source Block
-        self.osmosdr_source = osmosdr.source(
-            args=f"numchan={1} hackrf={device_index}"
-        )
-        self.osmosdr_source.set_time_unknown_pps(osmosdr.time_spec_t())
-        self.osmosdr_source.set_sample_rate(self.samp_rate)
-        self.osmosdr_source.set_center_freq(self.center_freq, 0)
-        self.osmosdr_source.set_freq_corr(0, 0)
-        self.osmosdr_source.set_dc_offset_mode(0, 0)
-        self.osmosdr_source.set_iq_balance_mode(0, 0)
-        self.osmosdr_source.set_gain_mode(False, 0)
-        self.osmosdr_source.set_gain(0, 0)
-        self.osmosdr_source.set_if_gain(self.ifg, 0)
-        self.osmosdr_source.set_bb_gain(self.bbg, 0)
-        self.osmosdr_source.set_antenna('', 0)
-        self.osmosdr_source.set_bandwidth(0, 0)
+        # SDR Source Block (a HackRF unless another device is given)
+        self.device_index = device_index
+        self.device = None
+        if replay is not None:
+            self.osmosdr_source = replay
+        else:
+            self.device = device if device is not None else HackRFDevice(device_index)
+            self.osmosdr_source = self.device.open_source(
+                self.samp_rate, self.center_freq, gain=self.gain, if_gain=self.ifg, bb_gain=self.bbg
+            )
+
+        # Optional raw IQ recorder on the source output
+        self.capture_sink = None
+        if capture is not None:
+            capture.set_metadata(**self.capture_metadata())
+            self.capture_sink = IQCaptureSink(capture)
 
         # Low Pass Filter
         self.low_pass_filter = filter.fir_filter_ccf(
@@ -147,12 +235,21 @@ class AFSKReceiver(gr.top_block):
         # Moving Average for Squelch
         self.moving_average = blocks.moving_average_cc(1000, 30, 1000, 1)
 
-        # Audio Sink
-        self.audio_sink = audio.sink(48000, '', True)
+        # Audio Sink (monitor profile only, headless leaves the speaker branch out)
+        self.profile = profile if profile in self.PROFILES else 'monitor'
+        self.audio_sink = None
+        if self.profile == 'monitor':
+            from gnuradio import audio
+            self.audio_sink = audio.sink(48000, '', True)
+
+        # Optional low rate listening tap, attached at runtime
+        self.monitor_tap = None
 
         self.blocks_float_to_short_0 = blocks.float_to_short(1, 32767)
 
-        self.queue_sink_0 = QueueSink(samples_q)
+        # Decoded audio goes either to the streaming demod (QueueSink) or to
+        # a caller-supplied sink such as BurstSink
+        self.queue_sink_0 = demod_sink if demod_sink is not None else QueueSink(samples_q)
 
         ##################################################
         # Connections
@@ -163,14 +260,91 @@ class AFSKReceiver(gr.top_block):
         self.connect((self.sig_source, 0), (self.multiply, 1))
         self.connect((self.moving_average, 0), (self.pwr_squelch, 0))
         self.connect((self.multiply_const, 0), (self.multiply_vol, 0))
-        self.connect((self.multiply_vol, 0), (self.audio_sink, 0))
+        if self.audio_sink is not None:
+            self.connect((self.multiply_vol, 0), (self.audio_sink, 0))
         self.connect((self.multiply, 0), (self.moving_average, 0))
         self.connect((self.low_pass_filter, 0), (self.rational_resampler, 0))
         self.connect((self.osmosdr_source, 0), (self.multiply, 0))
+        if self.capture_sink is not None:
+            self.connect((self.osmosdr_source, 0), (self.capture_sink, 0))
         self.connect((self.rational_resampler, 0), (self.nbfm_rx, 0))
         self.connect((self.blocks_float_to_short_0, 0), (self.queue_sink_0, 0))
         self.connect((self.multiply_vol, 0), (self.blocks_float_to_short_0, 0))
 
+    def set_frequency(self, frequency):
+        """Retune the running receiver in place."""
+        self.freq = frequency
+        self.center_freq = self.freq + self.lo_offset
+        self.osmosdr_source.set_center_freq(self.center_freq, 0)
+        self.sig_source.set_frequency(self.center_freq - self.freq)
+        self._update_capture()
+
+    def set_gain(self, gain):
+        """Apply a new RF gain to the running source."""
+        self.gain = gain
+        self.osmosdr_source.set_gain(self.gain, 0)
+        self._update_capture()
+
+    def set_if_gain(self, if_gain):
+        """Apply a new IF gain to the running source."""
+        self.ifg = if_gain
+        self.osmosdr_source.set_if_gain(self.ifg, 0)
+        self._update_capture()
+
+    def capture_metadata(self):
+        """Radio settings recorded with every capture chunk."""
+        return {
+            'freq': self.freq,
+            'center_freq': self.center_freq,
+            'gain': self.gain,
+            'if_gain': self.ifg,
+            'bb_gain': self.bbg,
+            'device_index': self.device_index,
+        }
+
+    def _update_capture(self):
+        if self.capture_sink is not None:
+            self.capture_sink.set_metadata(**self.capture_metadata())
+
+    def attach_monitor(self, rate=8000, sink=None):
+        """
+        Attach a low rate listening tap to the demodulated audio while the
+        flowgraph is running. The default sink is a non-blocking audio.sink so
+        a slow sound device can never throttle the receive chain.
+        """
+        if self.monitor_tap is not None:
+            return self.monitor_tap[1]
+        resampler = filter.rational_resampler_fff(
+            interpolation=1,
+            decimation=max(1, int(48000 // rate))
+        )
+        if sink is None:
+            from gnuradio import audio
+            sink = audio.sink(int(48000 // resampler.decimation()), '', False)
+        self.lock()
+        try:
+            self.connect((self.multiply_vol, 0), (resampler, 0))
+            self.connect((resampler, 0), (sink, 0))
+        finally:
+            self.unlock()
+        self.monitor_tap = (resampler, sink)
+        print(f"Monitor tap attached at {48000 // resampler.decimation()} Hz.")
+        return sink
+
+    def detach_monitor(self):
+        """Remove the listening tap without restarting the flowgraph."""
+        if self.monitor_tap is None:
+            return
+        resampler, sink = self.monitor_tap
+        self.lock()
+        try:
+            self.disconnect((self.multiply_vol, 0), (resampler, 0))
+            self.disconnect((resampler, 0), (sink, 0))
+        finally:
+            self.unlock()
+        self.monitor_tap = None
+        print("Monitor tap detached.")
+
     def stop_and_wait(self):
         """Gracefully stop the flowgraph."""
         try:
@@ -179,7 +353,10 @@ class AFSKReceiver(gr.top_block):
             self.disconnect((self.rational_resampler, 0), (self.nbfm_rx, 0))
             self.disconnect((self.nbfm_rx, 0), (self.multiply_const, 0))
             self.disconnect((self.multiply_const, 0), (self.multiply_vol, 0))
-            self.disconnect((self.multiply_vol, 0), (self.audio_sink, 0))
+            if self.audio_sink is not None:
+                self.disconnect((self.multiply_vol, 0), (self.audio_sink, 0))
+            if self.monitor_tap is not None:
+                self.detach_monitor()
             self.disconnect((self.multiply_vol, 0), (self.blocks_float_to_short_0, 0))
             self.disconnect((self.blocks_float_to_short_0, 0), (self.queue_sink_0, 0))
             self.disconnect((self.pwr_squelch, 0), (self.agc, 0))
@@ -188,18 +365,30 @@ class AFSKReceiver(gr.top_block):
             self.disconnect((self.multiply, 0), (self.moving_average, 0))
             self.disconnect((self.moving_average, 0), (self.pwr_squelch, 0))
             self.disconnect((self.osmosdr_source, 0), (self.multiply, 0))
+            if self.capture_sink is not None:
+                self.disconnect((self.osmosdr_source, 0), (self.capture_sink, 0))
         except Exception as e:
             print(f"Error during disconnect: {e}")
         self.stop()
         try:
             self.wait()  # Ensure the flowgraph completes any remaining processing
+            if self.capture_sink is not None:
+                self.capture_sink.close()
+            # Dropping the source block closes the device
+            self.osmosdr_source = None
+            if self.device is not None:
+                self.device.release('rx')
             print("Receiver Flowgraph stopped and resources released.")
         except Exception as e:
             print(f"Error while waiting for flowgraph stop: {e}")
 
 
-async def consume_ax25(ax25_q, received_message_queue):
-    print("allo")
+async def consume_ax25(ax25_q, received_message_queue, on_frame=None):
+    """
+    Fan out decoded frames. With on_frame set, each AX25 frame is handed to
+    the callback as soon as it is decoded; otherwise its text is put on
+    received_message_queue.
+    """
     try:
         while True:
             
@@ -207,20 +396,27 @@ async def consume_ax25(ax25_q, received_message_queue):
             ax25_q.task_done()
             if ax25_msg is None:
                 break
-            print("AX.25 message received:", ax25_msg)  # Debugging message
-            received_message_queue.put(str(ax25_msg))
+            if on_frame is not None:
+                on_frame(ax25_msg)
+            else:
+                print("AX.25 message received:", ax25_msg)  # Debugging message
+                try:
+                    received_message_queue.put(str(ax25_msg), block=False)
+                except queue.Full:
+                    pass  # Counted as a drop by a bounded queue
             await asyncio.sleep(0)
     except asyncio.CancelledError:
         pass
     except Exception as err:
         print(f"Error in consume_ax25: {err}")
 
-async def demod_core(samples_q, bits_q, ax25_q):
+async def demod_core(samples_q, bits_q, ax25_q, options=None):
     if AFSKDemodulator is None or AX25FromAFSK is None:
         print("Demodulator not available.")
         return
     try:
-        async with AFSKDemodulator(sampling_rate=48000, samples_in_q=samples_q, bits_out_q=bits_q, verbose=False) as afsk_demod:
+        async with AFSKDemodulator(sampling_rate=48000, samples_in_q=samples_q, bits_out_q=bits_q, verbose=False,
+                                   options=options or {}) as afsk_demod:
             async with AX25FromAFSK(bits_in_q=bits_q, ax25_q=ax25_q, verbose=False) as bits2ax25:
                 while True:
                     await asyncio.sleep(1)
@@ -229,43 +425,155 @@ async def demod_core(samples_q, bits_q, ax25_q):
     except Exception as err:
         print(f"Error in demod_core: {err}")
 
-def start_receiver(stop_event, received_message_queue, device_index=0, frequency=50.01e6):
+async def bank_core(samples_q, ax25_q, profiles):
+    """
+    Decode with a diversity bank of demodulator profiles, duplicates merged.
+    """
+    if DemodBank is None:
+        print("Demodulator bank not available.")
+        return
+    try:
+        async with DemodBank(samples_in_q=samples_q, ax25_out_q=ax25_q, sampling_rate=48000,
+                             profiles=profiles):
+            print(f"Demodulator bank running {len(profiles)} profiles.")
+            while True:
+                await asyncio.sleep(1)
+    except asyncio.CancelledError:
+        pass
+    except Exception as err:
+        print(f"Error in bank_core: {err}")
+
+async def replay_done(tb, stop_event, samples_q, bits_q, ax25_q):
+    """
+    End a replay once the source ran dry and the decoder caught up.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, tb.wait)
+        await samples_q.join()
+        await bits_q.join()
+        await ax25_q.join()
+        print("Replay finished.")
+        stop_event.set()
+    except asyncio.CancelledError:
+        pass
+
+async def drain_ax25(ax25_q, timeout=5.0):
+    """
+    Wait until the frames already handed to the loop are consumed.
+    """
+    await asyncio.sleep(0)  # let pending call_soon_threadsafe puts run
+    try:
+        await asyncio.wait_for(ax25_q.join(), timeout)
+    except asyncio.TimeoutError:
+        print("Timed out draining decoded frames.")
+
+def start_receiver(stop_event, received_message_queue, device_index=0, frequency=50.01e6,
+                   decoder='stream', decode_workers=None, profile='monitor', on_ready=None,
+                   gain=0, if_gain=32, on_frame=None, queue_config=None,
+                   capture_dir=None, capture_chunk_s=10.0, capture_format='cf32',
+                   replay_dir=None, replay_rate=None, device=None, demod_profiles=PROFILES_FILE,
+                   demod_bank=None):
+    """
+    Start the receive chain in its own thread.
+
+    decoder='stream' runs the demodulator on the gated sample stream in the
+    receiver event loop. decoder='burst' segments the audio into bursts and
+    decodes them in parallel on a process pool of decode_workers processes.
+
+    profile='headless' builds the chain without the monitor audio.sink.
+    on_ready, if given, is called with the running AFSKReceiver so the caller
+    can retune or attach a monitor tap without restarting the flowgraph.
+    on_frame, if given, receives every decoded AX25 frame in place of
+    received_message_queue.
+
+    The stage queues are bounded; queue_config overrides the size and full
+    policy per queue name (see core.bounded_queue.QUEUE_DEFAULTS).
+
+    capture_dir records the raw source IQ there while receiving (see
+    lib.iq_store). replay_dir plays such a capture through the same chain in
+    place of the HackRF, as fast as it decodes (or at replay_rate times real
+    time), and sets stop_event once the capture is decoded.
+
+    device is the core.sdr.SDRDevice to receive from, a HackRF at
+    device_index by default.
+
+    The demodulator options come from the 48 kHz profile in demod_profiles
+    (written by aprs_tune.py), the built-in defaults if there is none.
+    demod_bank, a list of option overrides, runs one demodulator per entry
+    on the stream (see afsk.bank) and merges their frames; each entry is
+    applied on top of that profile.
+    """
+    if replay_dir and 'samples_q' not in (queue_config or {}):
+        # Playback outruns the demod, wait for it instead of dropping audio
+        queue_config = dict(queue_config or {}, samples_q={'policy': BLOCK})
+
+    demod_options = load_profile(RECEIVER_RATE, demod_profiles) if demod_profiles else {}
+    if demod_options:
+        print(f"Using tuned demodulator profile from {demod_profiles}: {demod_options}")
+
     def run_receiver():
         # Create a new event loop for the receiver thread
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
 
         # Create async queues for samples, bits, and AX.25 frames
-        samples_q = asyncio.Queue()
-        bits_q = asyncio.Queue()
-        ax25_q = asyncio.Queue()
-
-        # Start the AFSK Receiver
-        tb = AFSKReceiver(samples_q, device_index=device_index, frequency=frequency)
-        tb.start()
+        samples_q = make_async_queue('samples_q', queue_config)
+        bits_q = make_async_queue('bits_q', queue_config)
+        ax25_q = make_async_queue('ax25_q', queue_config)
 
         # Create tasks for demodulation pipelines
         tasks = [
-            loop.create_task(consume_ax25(ax25_q, received_message_queue)),
-            loop.create_task(demod_core(samples_q, bits_q, ax25_q))
+            loop.create_task(consume_ax25(ax25_q, received_message_queue, on_frame)),
         ]
+        burst_sink = None
+        if decoder == 'burst' and BurstDecoder is not None:
+            burst_sink = BurstSink(ax25_q, loop, workers=decode_workers, options=demod_options)
+        elif demod_bank:
+            profiles = [dict(demod_options, **p) for p in demod_bank]
+            tasks.append(loop.create_task(bank_core(samples_q, ax25_q, profiles)))
+        else:
+            tasks.append(loop.create_task(demod_core(samples_q, bits_q, ax25_q, demod_options)))
+
+        capture = None
+        if capture_dir:
+            capture = IQCaptureWriter(capture_dir, samp_rate=AFSKReceiver.SAMP_RATE,
+                                      chunk_s=capture_chunk_s, fmt=capture_format)
+        replay = IQReplaySource(replay_dir, rate=replay_rate) if replay_dir else None
+
+        # Start the AFSK Receiver
+        tb = AFSKReceiver(samples_q, device_index=device_index, frequency=frequency,
+                          demod_sink=burst_sink, profile=profile, gain=gain, if_gain=if_gain,
+                          capture=capture, replay=replay, device=device)
+        tb.start()
+        if on_ready is not None:
+            on_ready(tb)
+        if replay is not None:
+            tasks.append(loop.create_task(replay_done(tb, stop_event, samples_q, bits_q, ax25_q)))
 
         try:
             print("Running the event loop...")
-            while not stop_event.is_set():
-                loop.run_until_complete(asyncio.sleep(0.1))
+            # Run the pipeline until stop_event is set, without polling
+            loop.run_until_complete(loop.run_in_executor(None, stop_event.wait))
         except asyncio.CancelledError:
             print("Event loop cancelled.")
         finally:
-            # Signal tasks to stop
-            for t in tasks:
+            # Stop the producers, the frame consumer keeps running until the
+            # last frames are out
+            consumer = tasks[0]
+            for t in tasks[1:]:
                 t.cancel()
 
             # Stop the flowgraph gracefully
             tb.stop_and_wait()
+            if burst_sink is not None:
+                burst_sink.close()
+            loop.run_until_complete(drain_ax25(ax25_q))
+            consumer.cancel()
 
             # Clean up the event loop
             loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_default_executor())
             loop.stop()
             loop.close()
             print("Receiver thread stopped.")
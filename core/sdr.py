@@ -0,0 +1,229 @@
+import threading
+import time
+
+import numpy as np
+from gnuradio import gr
+
+from core.hackrf_utils import device_lifecycle
+from core.sim_channel import SimulatedChannel
+
+
+class SDRDevice:
+    """
+    What the flowgraphs need from a radio: a configured GNU Radio source or
+    sink block ready to connect, and a way to hand it back. AFSKReceiver,
+    ResampleAndSend and SampleTransmitter only talk to the radio through
+    this interface.
+    """
+    kind = None
+
+    def __init__(self, device_index=0):
+        self.device_index = device_index
+
+    def open_source(self, samp_rate, center_freq, gain=0, if_gain=32, bb_gain=32):
+        """Return a complex source block streaming at samp_rate around center_freq."""
+        raise NotImplementedError
+
+    def open_sink(self, samp_rate, center_freq, gain=0, if_gain=32, bb_gain=20):
+        """Return a complex sink block transmitting at samp_rate around center_freq."""
+        raise NotImplementedError
+
+    def release(self, owner):
+        """Give back the block opened for owner ('rx' or 'tx')."""
+
+    def stats(self):
+        return {'kind': self.kind, 'device_index': self.device_index}
+
+
+class HackRFDevice(SDRDevice):
+    """
+    HackRF through gr-osmosdr, opened and released through the shared
+    lifecycle manager.
+    """
+    kind = 'hackrf'
+
+    def open_source(self, samp_rate, center_freq, gain=0, if_gain=32, bb_gain=32):
+        import osmosdr
+        index = self.device_index
+        source = device_lifecycle.open(
+            index,
+            lambda: osmosdr.source(args=f"numchan={1} hackrf={index}"),
+            owner='rx'
+        )
+        source.set_time_unknown_pps(osmosdr.time_spec_t())
+        source.set_sample_rate(samp_rate)
+        source.set_center_freq(center_freq, 0)
+        source.set_freq_corr(0, 0)
+        source.set_dc_offset_mode(0, 0)
+        source.set_iq_balance_mode(0, 0)
+        source.set_gain_mode(False, 0)
+        source.set_gain(gain, 0)
+        source.set_if_gain(if_gain, 0)
+        source.set_bb_gain(bb_gain, 0)
+        source.set_antenna('', 0)
+        source.set_bandwidth(0, 0)
+        return source
+
+    def open_sink(self, samp_rate, center_freq, gain=0, if_gain=32, bb_gain=20):
+        import osmosdr
+        index = self.device_index
+        sink = device_lifecycle.open(
+            index,
+            lambda: osmosdr.sink(args=f"hackrf={index}"),
+            owner='tx'
+        )
+        sink.set_sample_rate(samp_rate)
+        sink.set_center_freq(center_freq, 0)
+        sink.set_gain(gain, 0)
+        sink.set_if_gain(if_gain, 0)
+        sink.set_bb_gain(bb_gain, 0)
+        sink.set_antenna("TX/RX", 0)
+        return sink
+
+    def release(self, owner):
+        device_lifecycle.release(self.device_index, owner)
+
+    def stats(self):
+        stats = super().stats()
+        stats['holders'] = sorted(device_lifecycle.holders(self.device_index))
+        return stats
+
+
+class SimulatedDevice(SimulatedChannel, SDRDevice):
+    """
+    In-process radio. What the sink transmits is looped back into the source
+    through a core.sim_channel.SimulatedChannel: additive noise, a delay, a
+    frequency offset and an amplitude. mode='iq' loops the transmitted IQ
+    back as is, mode='audio' treats the real part of the transmitted IQ as
+    audio and NBFM modulates it, which is what a radio keyed by the
+    transmitter audio would put on the air. inject_iq()/inject_audio() feed
+    the receiver directly.
+
+    While nothing is queued the source streams noise, paced to real time
+    with realtime=True; realtime=False runs the receiver as fast as it can,
+    which is the receive throughput benchmark.
+    """
+    kind = 'simulated'
+
+    def __init__(self, device_index=0, **channel):
+        SDRDevice.__init__(self, device_index)
+        SimulatedChannel.__init__(self, **channel)
+
+    # GNU Radio blocks
+    def open_source(self, samp_rate, center_freq, gain=0, if_gain=32, bb_gain=32):
+        self.tune_receiver(samp_rate, center_freq)
+        return SimulatedSource(self)
+
+    def open_sink(self, samp_rate, center_freq, gain=0, if_gain=32, bb_gain=20):
+        return SimulatedSink(self, samp_rate, center_freq)
+
+    def stats(self):
+        stats = SDRDevice.stats(self)
+        stats.update(SimulatedChannel.stats(self))
+        return stats
+
+
+class SimulatedSource(gr.sync_block):
+    """Receive side of a SimulatedDevice, stands in for osmosdr.source."""
+    def __init__(self, device, block_size=1 << 16):
+        gr.sync_block.__init__(
+            self,
+            name='SimulatedSource',
+            in_sig=None,
+            out_sig=[np.complex64]
+        )
+        self.device = device
+        self.block_size = block_size
+        self.sent = 0
+        self.t0 = None
+
+    def work(self, input_items, output_items):
+        out = output_items[0]
+        if self.t0 is None:
+            self.t0 = time.monotonic()
+        n = min(len(out), self.block_size)
+        samples, _ = self.device.read(n)
+        out[:n] = samples
+        self.sent += n
+        if self.device.realtime:
+            ahead = self.sent / self.device.rx_rate - (time.monotonic() - self.t0)
+            if ahead > 0:
+                time.sleep(ahead)
+            elif ahead < -0.5:
+                # paused for a transmission, pick the pace up from now
+                self.t0 = time.monotonic()
+                self.sent = 0
+        return n
+
+    # osmosdr_source interface used by AFSKReceiver
+    def set_center_freq(self, freq, chan=0):
+        self.device.retune(freq)
+        return freq
+
+    def set_gain(self, gain, chan=0):
+        return gain
+
+    def set_if_gain(self, gain, chan=0):
+        return gain
+
+    def set_bb_gain(self, gain, chan=0):
+        return gain
+
+
+class SimulatedSink(gr.sync_block):
+    """Transmit side of a SimulatedDevice, stands in for osmosdr.sink."""
+    def __init__(self, device, samp_rate, center_freq):
+        gr.sync_block.__init__(
+            self,
+            name='SimulatedSink',
+            in_sig=[np.complex64],
+            out_sig=None
+        )
+        self.device = device
+        self.samp_rate = samp_rate
+        self.center_freq = center_freq
+
+    def work(self, input_items, output_items):
+        in0 = input_items[0]
+        self.device.inject_iq(in0, self.samp_rate, self.center_freq, stream=id(self))
+        return len(in0)
+
+    def stop(self):
+        # The transmitters stop the flowgraph after each transmission
+        self.device.end_stream(id(self))
+        return True
+
+    # osmosdr_sink interface used by the transmitters
+    def set_center_freq(self, freq, chan=0):
+        self.center_freq = freq
+        return freq
+
+    def set_gain(self, gain, chan=0):
+        return gain
+
+    def set_if_gain(self, gain, chan=0):
+        return gain
+
+
+DEVICE_KINDS = {
+    HackRFDevice.kind: HackRFDevice,
+    SimulatedDevice.kind: SimulatedDevice,
+}
+
+_devices = {}
+_devices_lock = threading.Lock()
+
+def get_device(kind='hackrf', device_index=0, **options):
+    """
+    Shared SDRDevice for (kind, device_index), so the receiver and the
+    transmitters of one process talk to the same simulated radio. options
+    only apply when the device is first created.
+    """
+    if kind not in DEVICE_KINDS:
+        raise ValueError(f"Unknown SDR device kind {kind!r}.")
+    with _devices_lock:
+        device = _devices.get((kind, device_index))
+        if device is None:
+            device = DEVICE_KINDS[kind](device_index, **options)
+            _devices[(kind, device_index)] = device
+        return device
@@ -0,0 +1,160 @@
+# core/sim_channel.py
+
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class SimulatedChannel:
+    """
+    The radio channel of a SimulatedDevice, plain NumPy so it runs without
+    GNU Radio. Transmitted IQ (or audio, NBFM modulated) is resampled to the
+    receiver rate, shifted by the tuning difference plus freq_offset, scaled
+    by amplitude and queued; read() hands the queue to the receiver with
+    additive noise, or noise alone while nothing is queued.
+
+    A transmission is a stream: its resampler and oscillator state carries
+    over between inject_iq calls, and delay_s of silence goes ahead of it
+    once, when it starts. end_stream() ends it. stream=None is a one-off
+    transmission ending with the call.
+    """
+    def __init__(self, noise=0.01, delay_s=0.0, freq_offset=0.0, amplitude=0.5,
+                 mode='audio', deviation=3e3, tx_full_scale=0.05, realtime=True, seed=None):
+        self.noise = noise
+        self.delay_s = delay_s
+        self.freq_offset = freq_offset
+        self.amplitude = amplitude
+        self.mode = mode
+        self.deviation = deviation          # Hz at tx_full_scale in audio mode
+        self.tx_full_scale = tx_full_scale  # transmitters scale audio to 0.05
+        self.realtime = realtime
+        self.rng = np.random.default_rng(seed)
+
+        self.lock = threading.Lock()
+        self.pending = deque()  # (inject time, complex64 block at the rx rate, is signal)
+        self.rx_rate = None
+        self.rx_center = None
+        self.tx_streams = {}  # stream -> carried resampler/modulator state
+        self.counters = {
+            'injected_samples': 0,
+            'delivered_samples': 0,
+            'noise_samples': 0,
+            'last_latency_s': None,  # inject -> first sample handed to the receiver
+            'max_latency_s': None,
+        }
+
+    def tune_receiver(self, samp_rate, center_freq):
+        """Rate and center frequency of the receiver reading the channel."""
+        with self.lock:
+            self.rx_rate = samp_rate
+            self.rx_center = center_freq
+
+    def retune(self, center_freq):
+        with self.lock:
+            self.rx_center = center_freq
+
+    def inject_iq(self, iq, samp_rate, center_freq, stream=None, fm=None):
+        """
+        Queue IQ transmitted at samp_rate around center_freq for the
+        receiver, as part of transmission stream. fm overrides the device
+        mode for this call.
+        """
+        fm = self.mode == 'audio' if fm is None else fm
+        with self.lock:
+            if self.rx_rate is None:
+                return  # no receiver to hear it
+            state = self.tx_streams.get(stream)
+            if state is None:
+                state = {'pos': 0.0, 'last': 0.0, 'phase': 0.0, 'fm': 0.0, 'delayed': False}
+                if stream is not None:
+                    self.tx_streams[stream] = state
+            iq = np.asarray(iq, dtype=np.complex64)
+            if fm:
+                audio = self._resample(iq.real.astype(np.float64), samp_rate, state)
+                dev = self.deviation / self.tx_full_scale
+                phase = state['fm'] + np.cumsum(2 * math.pi * dev * audio / self.rx_rate)
+                if len(phase):
+                    state['fm'] = phase[-1] % (2 * math.pi)
+                iq = np.exp(1j * phase)
+            else:
+                iq = self._resample(iq, samp_rate, state)
+            shift = center_freq - self.rx_center + self.freq_offset
+            self._queue(self._shift(iq, shift, state) * self.amplitude, state)
+
+    def inject_audio(self, audio, audio_rate, freq):
+        """Queue int16 audio as an NBFM transmission on freq, independent of any sink."""
+        a = np.asarray(audio, dtype=np.float64) / 32768.0 * self.tx_full_scale
+        self.inject_iq(a.astype(np.complex64), audio_rate, freq, fm=True)
+
+    def end_stream(self, stream):
+        """The transmission is over, the next inject on stream starts a new one."""
+        with self.lock:
+            self.tx_streams.pop(stream, None)
+
+    def _resample(self, x, rate, state):
+        # linear interpolation to the rx rate, the position carries over
+        if rate == self.rx_rate:
+            return x
+        step = rate / self.rx_rate
+        buf = np.concatenate(([state['last']], x))
+        pos = np.arange(state['pos'], len(buf) - 1, step)
+        state['last'] = buf[-1]
+        state['pos'] = (pos[-1] + step - (len(buf) - 1)) if len(pos) else state['pos'] - len(x)
+        if np.iscomplexobj(buf):
+            return np.interp(pos, np.arange(len(buf)), buf.real) + 1j * np.interp(pos, np.arange(len(buf)), buf.imag)
+        return np.interp(pos, np.arange(len(buf)), buf)
+
+    def _shift(self, x, freq, state):
+        if not freq or not len(x):
+            return x.astype(np.complex64)
+        ph = state['phase'] + 2 * math.pi * freq / self.rx_rate * np.arange(len(x))
+        state['phase'] = (ph[-1] + 2 * math.pi * freq / self.rx_rate) % (2 * math.pi)
+        return (x * np.exp(1j * ph)).astype(np.complex64)
+
+    def _queue(self, iq, state):
+        if not len(iq):
+            return
+        if not state['delayed']:
+            state['delayed'] = True
+            if self.delay_s:
+                # the delay shows up as silence ahead of the transmission
+                self.pending.append((None, np.zeros(int(self.delay_s * self.rx_rate), dtype=np.complex64), False))
+        self.pending.append((time.monotonic(), iq, True))
+        self.counters['injected_samples'] += len(iq)
+
+    def read(self, n):
+        """Next n receiver samples: queued signal plus noise, or noise alone."""
+        out = np.zeros(n, dtype=np.complex64)
+        filled = 0
+        with self.lock:
+            while self.pending and filled < n:
+                t, block, signal = self.pending[0]
+                k = min(n - filled, len(block))
+                out[filled:filled + k] = block[:k]
+                if signal:
+                    self.counters['delivered_samples'] += k
+                if t is not None:
+                    # latency of the first sample of each injected block
+                    latency = time.monotonic() - t
+                    self.counters['last_latency_s'] = latency
+                    self.counters['max_latency_s'] = max(latency, self.counters['max_latency_s'] or 0.0)
+                if k == len(block):
+                    self.pending.popleft()
+                else:
+                    self.pending[0] = (None, block[k:], signal)
+                filled += k
+            if filled < n:
+                self.counters['noise_samples'] += n - filled
+        if self.noise:
+            out += (self.rng.standard_normal(n) + 1j * self.rng.standard_normal(n)).astype(np.complex64) \
+                * np.float32(self.noise / math.sqrt(2))
+        return out, filled
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['pending_samples'] = sum(len(b) for _, b, _ in self.pending)
+        return stats
@@ -1,13 +1,17 @@
+import numpy as np
 from gnuradio import gr, blocks, filter, analog
 from gnuradio.filter import firdes
-import osmosdr
+
+from core.sdr import HackRFDevice
 
 class ResampleAndSend(gr.top_block):
-    def __init__(self, input_file, output_rate, device_index=0, carrier_only=False, carrier_freq=50.01e6):
+    def __init__(self, input_file, output_rate, device_index=0, carrier_only=False, carrier_freq=50.01e6,
+                 device=None):
         gr.top_block.__init__(self, "Resample and Send")
 
         self.output_rate = output_rate
         self.device_index = device_index
+        self.device = device if device is not None else HackRFDevice(device_index)
         self.carrier_only = carrier_only
         self.carrier_freq = carrier_freq
         self.sink = None
@@ -41,14 +45,9 @@ class ResampleAndSend(gr.top_block):
 
     def initialize_hackrf(self, gain, if_gain):
         try:
-            print(f"Initializing HackRF device {self.device_index}...")
-            self.sink = osmosdr.sink(args=f"hackrf={self.device_index}")
-            self.sink.set_sample_rate(self.output_rate)
-            self.sink.set_center_freq(50.01e6, 0)  # Adjust frequency as needed
-            self.sink.set_gain(gain, 0)
-            self.sink.set_if_gain(if_gain, 0)
-            self.sink.set_bb_gain(20, 0)
-            self.sink.set_antenna("TX/RX", 0)
+            print(f"Initializing {self.device.kind} device {self.device_index}...")
+            # Adjust frequency as needed
+            self.sink = self.device.open_sink(self.output_rate, 50.01e6, gain=gain, if_gain=if_gain, bb_gain=20)
             print("HackRF initialized successfully.")
 
             # Connect the flowgraph to HackRF sink
@@ -70,6 +69,7 @@ class ResampleAndSend(gr.top_block):
                 print("Disconnecting HackRF sink...")
                 self.disconnect(self.float_to_complex, self.sink)
                 self.sink = None
+                self.device.release('tx')
 
             print("Stopping the flowgraph...")
             self.stop()
@@ -77,4 +77,78 @@ class ResampleAndSend(gr.top_block):
             self.wait()
             print("Flowgraph stopped and resources released.")
         except Exception as e:
-            print(f"Error during stop and wait: {e}")
\ No newline at end of file
+            print(f"Error during stop and wait: {e}")
+
+class SampleTransmitter(gr.top_block):
+    """
+    Transmit flowgraph that is built once and reused for every packet.
+    Samples are loaded into a vector source instead of a WAV file, so a
+    transmission only rewinds the source and runs the graph to completion.
+    """
+    def __init__(self, output_rate, device_index=0, input_rate=22050, device=None):
+        gr.top_block.__init__(self, "Sample Transmitter")
+
+        self.output_rate = output_rate
+        self.device_index = device_index
+        self.device = device if device is not None else HackRFDevice(device_index)
+        self.input_rate = input_rate
+        self.sink = None
+
+        self.vector_source = blocks.vector_source_f([0.0], False)
+        # Resample from 22050 Hz to output_rate (e.g., 2.205 MHz)
+        self.resampler = filter.rational_resampler_fff(
+            interpolation=int(output_rate),
+            decimation=input_rate
+        )
+        # Scale amplitude down to avoid overdriving the transmitter
+        self.amplitude_scaling = blocks.multiply_const_ff(0.05)
+        # Convert float samples to complex for HackRF sink
+        self.float_to_complex = blocks.float_to_complex()
+
+        self.connect(self.vector_source, self.resampler)
+        self.connect(self.resampler, self.amplitude_scaling)
+        self.connect(self.amplitude_scaling, self.float_to_complex)
+
+    def initialize_hackrf(self, gain, if_gain):
+        try:
+            print(f"Initializing {self.device.kind} device {self.device_index}...")
+            self.sink = self.device.open_sink(self.output_rate, 50.01e6, gain=gain, if_gain=if_gain, bb_gain=20)
+            print("HackRF initialized successfully.")
+
+            self.connect(self.float_to_complex, self.sink)
+            return True
+        except RuntimeError as e:
+            print(f"Error initializing HackRF: {e}")
+            return False
+
+    def set_center_freq(self, freq_hz):
+        if self.sink:
+            self.sink.set_center_freq(freq_hz, 0)
+
+    def set_gain(self, gain, if_gain):
+        if self.sink:
+            self.sink.set_gain(gain, 0)
+            self.sink.set_if_gain(if_gain, 0)
+
+    def transmit(self, samples):
+        """
+        Send int16 samples at input_rate and block until the burst is out.
+        Scaled to [-1, 1] to match what wavfile_source produced.
+        """
+        self.vector_source.set_data((np.asarray(samples, dtype=np.float32) / 32768.0).tolist())
+        self.vector_source.rewind()
+        self.start()
+        self.wait()
+        self.stop()
+
+    def stop_and_wait(self):
+        try:
+            if self.sink:
+                self.disconnect(self.float_to_complex, self.sink)
+                self.sink = None
+                self.device.release('tx')
+            self.stop()
+            self.wait()
+            print("Sample transmitter stopped and resources released.")
+        except Exception as e:
+            print(f"Error during stop and wait: {e}")
@@ -1,6 +1,39 @@
 # core/udp_listener.py
 
+import asyncio
 import socket
+import time
+
+MAX_DATAGRAM = 65535   # Largest UDP payload accepted
+MAX_LINE = 256         # AX.25 information field limit
+RECV_BATCH = 64        # Datagrams drained per wakeup
+
+def parse_aprs_lines(payloads):
+    """
+    Validate a batch of raw payloads (bytes) and split them into APRS lines.
+
+    A payload may carry several newline separated lines. Lines that are not
+    ASCII printable text or are longer than MAX_LINE are rejected.
+
+    Returns:
+        (list of str, int): The accepted lines and the number rejected.
+    """
+    lines = []
+    failures = 0
+    for payload in payloads:
+        for raw in payload.splitlines():
+            raw = raw.strip()
+            if not raw:
+                continue
+            if len(raw) > MAX_LINE or not raw.isascii():
+                failures += 1
+                continue
+            line = raw.decode('ascii')
+            if not line.isprintable():
+                failures += 1
+                continue
+            lines.append(line)
+    return lines, failures
 
 def udp_listener(host, port, message_queue, stop_event):
     """
@@ -11,11 +44,160 @@ def udp_listener(host, port, message_queue, stop_event):
         sock.settimeout(0.5)
         while not stop_event.is_set():
             try:
-                data, addr = sock.recvfrom(1024)
-                aprs_message = data.decode().strip()
-                print(f"Received UDP message from {addr}: {aprs_message}")
-                message_queue.put(aprs_message)
+                data, addr = sock.recvfrom(MAX_DATAGRAM)
+                lines, failures = parse_aprs_lines((data,))
+                if failures:
+                    print(f"Rejected {failures} invalid line(s) from {addr}")
+                for aprs_message in lines:
+                    message_queue.put(aprs_message)
             except socket.timeout:
                 continue
             except Exception as e:
                 print(f"Error in UDP listener: {e}")
+
+class _IngressProtocol(asyncio.DatagramProtocol):
+    """Datagram endpoint of an IngressServer."""
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        self.server._datagram(data)
+
+    def error_received(self, exc):
+        self.server.counters['errors'] += 1
+        print(f"Error in UDP listener: {exc}")
+
+class IngressServer:
+    """
+    Event loop ingress for APRS lines, replacing the blocking udp_listener.
+
+    UDP datagrams arrive through a DatagramProtocol endpoint. The transport
+    reads one datagram per loop pass, so they are collected and handed on as
+    a batch: once batch_size are pending, or when a loop pass brings no new
+    datagram. The whole batch is validated at once and handed to
+    on_messages(list of str). An optional TCP listener accepts newline
+    terminated lines from any number of clients.
+    """
+    def __init__(self, on_messages, max_datagram=MAX_DATAGRAM, batch_size=RECV_BATCH, rcvbuf=None):
+        self.on_messages = on_messages
+        self.max_datagram = max_datagram
+        self.batch_size = batch_size
+        self.rcvbuf = rcvbuf
+        self.loop = None
+        self.transport = None
+        self.tcp_server = None
+        self.counters = {
+            'datagrams': 0,
+            'bytes': 0,
+            'messages': 0,
+            'parse_failures': 0,
+            'batches': 0,
+            'max_batch': 0,
+            'tcp_connections': 0,
+            'tcp_lines': 0,
+            'errors': 0,
+        }
+        self._pending = []
+        self._flush_handle = None
+        self._fresh = False
+        self._rate_t = time.monotonic()
+        self._rate_n = 0
+
+    async def start(self, host, port, tcp_port=None):
+        """Bind UDP (and TCP if tcp_port is set) on host."""
+        self.loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            if self.rcvbuf:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+            sock.bind((host, port))
+            sock.setblocking(False)
+            self.transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: _IngressProtocol(self), sock=sock)
+        except OSError:
+            sock.close()
+            raise
+        if tcp_port:
+            self.tcp_server = await asyncio.start_server(self._handle_tcp, host, tcp_port)
+
+    def _datagram(self, data):
+        if len(data) > self.max_datagram:
+            self.counters['parse_failures'] += 1
+            return
+        self._pending.append(data)
+        self._fresh = True
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self.loop.call_soon(self._flush_idle)
+
+    def _flush_idle(self):
+        # Runs at the start of a loop pass, ahead of that pass's datagram:
+        # wait one more pass while datagrams keep coming
+        self._flush_handle = None
+        if self._fresh:
+            self._fresh = False
+            self._flush_handle = self.loop.call_soon(self._flush_idle)
+            return
+        self._flush()
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        payloads, self._pending = self._pending, []
+        if not payloads:
+            return
+        c = self.counters
+        c['datagrams'] += len(payloads)
+        c['bytes'] += sum(len(p) for p in payloads)
+        c['batches'] += 1
+        c['max_batch'] = max(c['max_batch'], len(payloads))
+        self._deliver(payloads)
+
+    def _deliver(self, payloads):
+        lines, failures = parse_aprs_lines(payloads)
+        self.counters['parse_failures'] += failures
+        if lines:
+            self.counters['messages'] += len(lines)
+            self.on_messages(lines)
+
+    async def _handle_tcp(self, reader, writer):
+        self.counters['tcp_connections'] += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Line longer than the stream limit, already discarded
+                    self.counters['parse_failures'] += 1
+                    continue
+                if not line:
+                    break
+                self.counters['tcp_lines'] += 1
+                self._deliver((line,))
+        except ConnectionError:
+            self.counters['errors'] += 1
+        finally:
+            writer.close()
+
+    def stats(self):
+        """
+        Counters plus the message rate since the previous call.
+        """
+        now = time.monotonic()
+        stats = dict(self.counters)
+        elapsed = now - self._rate_t
+        stats['messages_per_s'] = (stats['messages'] - self._rate_n) / elapsed if elapsed > 0 else 0.0
+        self._rate_t = now
+        self._rate_n = stats['messages']
+        return stats
+
+    def close(self):
+        if self.transport is not None:
+            self._flush()
+            self.transport.close()
+            self.transport = None
+        if self.tcp_server is not None:
+            self.tcp_server.close()
+            self.tcp_server = None
@@ -1,6 +1,9 @@
 # core/udp_transmitter.py
 
 import socket
+import threading
+
+from core.bounded_queue import BoundedQueue, DROP_OLDEST
 
 def parse_udp_message(raw_message):
     """
@@ -28,3 +31,106 @@ def udp_transmitter(host, port, message):
             print(f"Sent UDP message to {host}:{port}: {message}")
     except Exception as e:
         print(f"Error in UDP transmitter: {e}")
+
+def parse_destination(destination):
+    """
+    Accept "host:port", (host, port) or [host, port] and return (host, port).
+    """
+    if isinstance(destination, str):
+        host, port = destination.rsplit(":", 1)
+        return host, int(port)
+    host, port = destination
+    return host, int(port)
+
+class UDPEgress:
+    """
+    Long lived UDP sender for decoded packets.
+
+    Keeps one connected socket per destination and forwards every message
+    to all of them from a dedicated sender thread, so the caller (the frame
+    fan-out) never blocks on the network. Messages are queued in a bounded
+    drop-oldest queue and the payload is formatted as udp_transmitter does.
+    """
+    def __init__(self, destinations=(), sndbuf=0, maxsize=1024):
+        self.sndbuf = sndbuf
+        self.queue = BoundedQueue(maxsize, DROP_OLDEST, name='udp_egress')
+        self.lock = threading.Lock()
+        self.sockets = {}   # (host, port) -> connected socket, None until opened
+        self.counters = {}  # (host, port) -> per destination counters
+        self.set_destinations(destinations)
+        self.thread = threading.Thread(target=self._sender, daemon=True)
+        self.thread.start()
+
+    def set_destinations(self, destinations):
+        """Replace the destination list, keeping sockets that are still used."""
+        wanted = [parse_destination(d) for d in destinations]
+        with self.lock:
+            for dest in list(self.sockets):
+                if dest not in wanted:
+                    sock = self.sockets.pop(dest)
+                    self.counters.pop(dest, None)
+                    if sock is not None:
+                        sock.close()
+            for dest in wanted:
+                if dest not in self.sockets:
+                    self.sockets[dest] = None
+                    self.counters[dest] = {'sent': 0, 'bytes': 0, 'failed': 0, 'last_error': None}
+
+    def add_destination(self, destination):
+        with self.lock:
+            current = list(self.sockets)
+        self.set_destinations(current + [parse_destination(destination)])
+
+    def remove_destination(self, destination):
+        dest = parse_destination(destination)
+        with self.lock:
+            current = [d for d in self.sockets if d != dest]
+        self.set_destinations(current)
+
+    def send(self, message):
+        """Queue a message for every destination. Never blocks."""
+        if self.sockets:
+            self.queue.put(parse_udp_message(message).encode('utf-8'))
+
+    def _open(self, dest):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.sndbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf)
+        sock.connect(dest)
+        return sock
+
+    def _sender(self):
+        while True:
+            payload = self.queue.get()
+            if payload is None:
+                break
+            with self.lock:
+                for dest, sock in self.sockets.items():
+                    counters = self.counters[dest]
+                    try:
+                        if sock is None:
+                            sock = self.sockets[dest] = self._open(dest)
+                        sock.send(payload)
+                        counters['sent'] += 1
+                        counters['bytes'] += len(payload)
+                    except OSError as e:
+                        counters['failed'] += 1
+                        counters['last_error'] = str(e)
+                        if sock is not None:
+                            # Reopen on the next packet
+                            sock.close()
+                            self.sockets[dest] = None
+
+    def stats(self):
+        with self.lock:
+            destinations = {f"{host}:{port}": dict(c) for (host, port), c in self.counters.items()}
+        return {'queue': self.queue.stats(), 'destinations': destinations}
+
+    def close(self):
+        self.queue.force_put(None)
+        self.thread.join(timeout=1.0)
+        with self.lock:
+            for sock in self.sockets.values():
+                if sock is not None:
+                    sock.close()
+            self.sockets.clear()
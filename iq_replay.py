@@ -0,0 +1,43 @@
+# iq_replay.py
+
+import argparse
+import queue
+import threading
+import time
+
+from core import start_receiver
+from lib.iq_store import IQCaptureReader
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a raw IQ capture through the receive chain")
+    parser.add_argument("capture_dir", help="directory written by the receiver's iq_capture_dir")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="playback speed, 1.0 is real time (default: as fast as it decodes)")
+    parser.add_argument("--decoder", default="stream", choices=("stream", "burst"))
+    args = parser.parse_args()
+
+    reader = IQCaptureReader(args.capture_dir)
+    print(reader)
+
+    stop_event = threading.Event()
+    frames = []
+
+    def on_frame(ax25):
+        frames.append(ax25)
+        print(ax25.to_aprs().decode(errors="replace"), flush=True)
+
+    t0 = time.monotonic()
+    rx_thread = start_receiver(stop_event, queue.Queue(), decoder=args.decoder, profile="headless",
+                               on_frame=on_frame, replay_dir=args.capture_dir, replay_rate=args.rate)
+    try:
+        rx_thread.join()
+    except KeyboardInterrupt:
+        stop_event.set()
+        rx_thread.join()
+    dt = time.monotonic() - t0
+    seconds = len(reader) / reader.metadata.get("samp_rate", 4.8e6) if len(reader) else 0.0
+    print(f"{len(frames)} frames from {seconds:.1f} s of IQ in {dt:.1f} s "
+          f"({seconds / dt if dt else 0.0:.1f}x real time)")
+
+if __name__ == "__main__":
+    main()
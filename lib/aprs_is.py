@@ -0,0 +1,252 @@
+
+import asyncio
+import random
+import time
+from collections import deque
+
+from ax25.dedup import FrameDeduplicator
+from lib.gps import aprs_gps_format
+
+# APRS-IS uplink for an RX iGate (http://www.aprs-is.net/IGating.aspx).
+# One persistent TCP connection is kept to the server. Gated packets are
+# queued, written in batches, rate limited with a token bucket and
+# de-duplicated over 30 s; a dropped connection is retried with exponential
+# backoff and the unsent batch is written again after the login.
+
+APRS_IS_HOST = 'rotate.aprs2.net'
+APRS_IS_PORT = 14580
+
+SOFTWARE = 'hackrf-aprs'
+VERSION  = '0.1'
+
+# paths that must not be gated to the internet
+NOGATE_PATH = (b'TCPIP', b'TCPXX', b'NOGATE', b'RFONLY')
+
+class APRSISClient():
+    def __init__(self, call,
+                       passcode,
+                       host          = APRS_IS_HOST,
+                       port          = APRS_IS_PORT,
+                       filter        = None,  # server side filter, rx-only igates need none
+                       batch_size    = 20,    # lines per write
+                       batch_delay   = 0.2,   # seconds to wait for more lines
+                       rate          = 10.,   # lines per second
+                       burst         = 20,    # token bucket depth
+                       maxlen        = 1000,  # queued lines, oldest dropped first
+                       dedup_window  = 30.,
+                       backoff_min   = 1.,
+                       backoff_max   = 300.,
+                       beacon        = None,  # line sent after login and every beacon_period
+                       beacon_period = 1800.,
+                       ):
+        self.call          = call
+        self.passcode      = passcode
+        self.host          = host
+        self.port          = port
+        self.filter        = filter
+        self.batch_size    = batch_size
+        self.batch_delay   = batch_delay
+        self.rate          = rate
+        self.burst         = burst
+        self.dedup         = FrameDeduplicator(window = dedup_window)
+        self.backoff_min   = backoff_min
+        self.backoff_max   = backoff_max
+        self.beacon        = beacon
+        self.beacon_period = beacon_period
+
+        self.pending  = deque(maxlen = maxlen)
+        self.wakeup   = None
+        self.task     = None
+        self.loop     = None
+        self.writer   = None
+        self.tokens   = burst
+        self.tokens_t = time.monotonic()
+        self.stats    = {
+            'gated'      : 0,
+            'sent'       : 0,
+            'batches'    : 0,
+            'duplicates' : 0,
+            'rejected'   : 0,
+            'dropped'    : 0,
+            'connects'   : 0,
+            'disconnects': 0,
+            'connected'  : False,
+        }
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    async def start(self):
+        self.loop   = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        if self.pending:
+            self.wakeup.set()
+        self.task   = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions = True)
+            self.task = None
+        self._close()
+
+    def login_line(self):
+        line = 'user {} pass {} vers {} {}'.format(self.call, self.passcode, SOFTWARE, VERSION)
+        if self.filter:
+            line += ' filter {}'.format(self.filter)
+        return line
+
+    def qualify(self, ax25):
+        # TNC2 line with the q construct for a verified rx igate:
+        # SRC>DST,PATH,qAR,IGATECALL:info
+        # returns None if the packet must not be gated
+        path = [digi.to_aprs() for digi in ax25.digis]
+        for digi in path:
+            if digi.rstrip(b'*') in NOGATE_PATH:
+                return None
+        info = ax25.info
+        if isinstance(info, str):
+            info = info.encode()
+        info = bytes(info).strip()
+        # generic queries and third party traffic are not gated
+        if not info or info.startswith(b'?') or info.startswith(b'}'):
+            return None
+        header = b','.join([ax25.dst.to_aprs()] + path + [b'qAR', self.call.encode()])
+        return ax25.src.to_aprs() + b'>' + header + b':' + info
+
+    def gate(self, ax25):
+        # queue a decoded frame, must run on the client loop
+        if self.dedup.is_duplicate_frame(ax25):
+            return False
+        line = self.qualify(ax25)
+        if line is None:
+            self.stats['rejected'] += 1
+            return False
+        self.stats['gated'] += 1
+        self.send(line)
+        return True
+
+    def gate_threadsafe(self, ax25):
+        if self.loop and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.gate, ax25)
+
+    def send(self, line):
+        # queue a raw TNC2 line, must run on the client loop
+        if isinstance(line, str):
+            line = line.encode()
+        if len(self.pending) == self.pending.maxlen:
+            self.stats['dropped'] += 1
+        self.pending.append(line.rstrip(b'\r\n'))
+        if self.wakeup:
+            self.wakeup.set()
+
+    async def _run(self):
+        backoff = self.backoff_min
+        while True:
+            connects = self.stats['connects']
+            try:
+                await self._session()
+            except asyncio.CancelledError:
+                raise
+            except (OSError, asyncio.IncompleteReadError, ConnectionError) as err:
+                print('APRS-IS {}:{} {}'.format(self.host, self.port, err))
+            self._close()
+            self.stats['disconnects'] += 1
+            # a successful login resets the backoff
+            if self.stats['connects'] > connects:
+                backoff = self.backoff_min
+            delay = backoff * (1 + random.random()*0.25)
+            backoff = min(backoff*2, self.backoff_max)
+            await asyncio.sleep(delay)
+
+    async def _session(self):
+        reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        # server banner, then log in
+        await reader.readline()
+        self.writer.write(self.login_line().encode() + b'\r\n')
+        await self.writer.drain()
+        self.stats['connects'] += 1
+        self.stats['connected'] = True
+        # the server only sends comments (logresp, keepalives) to an rx igate,
+        # read them so the socket does not back up and to notice a close
+        read_task = asyncio.create_task(self._read(reader))
+        write_task = asyncio.create_task(self._write())
+        try:
+            done, _ = await asyncio.wait((read_task, write_task), return_when = asyncio.FIRST_COMPLETED)
+            for t in done:
+                t.result()
+        finally:
+            read_task.cancel()
+            write_task.cancel()
+            await asyncio.gather(read_task, write_task, return_exceptions = True)
+
+    async def _read(self, reader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError('closed by server')
+
+    async def _write(self):
+        next_beacon = time.monotonic()
+        while True:
+            if self.beacon and time.monotonic() >= next_beacon:
+                # the beacon goes first, on a full queue the oldest line makes room
+                if len(self.pending) == self.pending.maxlen:
+                    self.pending.popleft()
+                    self.stats['dropped'] += 1
+                self.pending.appendleft(self.beacon.encode())
+                next_beacon = time.monotonic() + self.beacon_period
+            if not self.pending:
+                self.wakeup.clear()
+                timeout = None
+                if self.beacon:
+                    timeout = max(0., next_beacon - time.monotonic())
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    continue
+                # give the batch a chance to fill
+                if len(self.pending) < self.batch_size:
+                    await asyncio.sleep(self.batch_delay)
+            n = min(len(self.pending), self.batch_size, await self._take_tokens())
+            batch = [self.pending[i] for i in range(n)]
+            self.writer.write(b''.join(line + b'\r\n' for line in batch))
+            await self.writer.drain()
+            # only forget the lines once they are written
+            for i in range(n):
+                self.pending.popleft()
+            self.stats['sent'] += n
+            self.stats['batches'] += 1
+
+    async def _take_tokens(self):
+        # token bucket, wait until at least one line may be sent
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.tokens_t)*self.rate)
+            self.tokens_t = now
+            if self.tokens >= 1:
+                n = int(self.tokens)
+                self.tokens -= min(n, len(self.pending), self.batch_size)
+                return n
+            await asyncio.sleep((1 - self.tokens)/self.rate)
+
+    def _close(self):
+        self.stats['connected'] = False
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['queued']     = len(self.pending)
+        stats['duplicates'] = self.dedup.duplicates
+        return stats
+
+def beacon_line(call, lat, lon, msg = None):
+    # position report for the igate itself, I& = igate symbol
+    msg = msg or 'hackrf-aprs rx only APRS iGate'
+    return '{}>APRS,TCPIP*:!{}{}'.format(call, aprs_gps_format(lat, lon, symbol1 = 'I', symbol2 = '&'), msg)
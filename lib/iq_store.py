@@ -0,0 +1,196 @@
+
+import os
+import json
+import time
+
+import numpy as np
+
+# On-disk IQ captures. A capture is a directory of fixed size chunk files,
+# each one memory mapped while it is written so the receive thread only
+# copies into the page cache, and an index.jsonl with one line per chunk:
+#   {"file": "iq_000003.cf32", "start": 14400000, "samples": 4800000,
+#    "time": 1700000000.123, "samp_rate": 4800000.0, "center_freq": ...,
+#    "freq": ..., "gain": 0, "if_gain": 32, "bb_gain": 32}
+# start is the stream index of the first sample, time the wall clock of it.
+# A metadata change (retune, gain) closes the chunk so every chunk has one
+# set of radio settings. Chunks are plain cf32/cs8 files, aprs_decode.py
+# reads them directly.
+
+INDEX_FILE = 'index.jsonl'
+
+FORMATS = {
+    # format : (numpy dtype of one component, scale to +-1)
+    'cf32' : ('<f4', 1.),      # gr_complex, what osmosdr_source produces
+    'cs8'  : ('i1',  1/128.),  # hackrf native, a quarter of the disk rate
+}
+
+class IQCaptureWriter():
+    def __init__(self, directory,
+                       samp_rate,
+                       chunk_s  = 10.,     # seconds per chunk file
+                       fmt      = 'cf32',
+                       metadata = {},      # center_freq, freq, gain, ... copied to the index
+                       clock    = time.time,
+                       ):
+        if fmt not in FORMATS:
+            raise ValueError('unknown iq format {}'.format(fmt))
+        os.makedirs(directory, exist_ok = True)
+        self.directory = directory
+        self.samp_rate = samp_rate
+        self.chunk_samples = max(1, int(chunk_s*samp_rate))
+        self.fmt      = fmt
+        self.dtype, self.scale = FORMATS[fmt]
+        self.metadata = dict(metadata)
+        self.clock    = clock
+
+        self.nchunk = self._next_chunk_number()
+        self.total  = self._indexed_samples() # samples written to the capture
+        self.index  = open(os.path.join(directory, INDEX_FILE), 'a')
+        self.mm     = None  # memmap of the open chunk
+        self.entry  = None  # its index entry
+        self.fill   = 0     # samples written to it
+        self.stats  = {
+            'samples' : 0,
+            'chunks'  : 0,
+            'bytes'   : 0,
+        }
+
+    def _next_chunk_number(self):
+        # appending to an existing capture continues the numbering
+        n = 0
+        for name in os.listdir(self.directory):
+            if name.startswith('iq_'):
+                try:
+                    n = max(n, int(name[3:].split('.')[0]) + 1)
+                except ValueError:
+                    pass
+        return n
+
+    def _indexed_samples(self):
+        # appending to an existing capture continues the stream index after
+        # its last chunk, so the reader replays the sessions in order
+        total = 0
+        path = os.path.join(self.directory, INDEX_FILE)
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        c = json.loads(line)
+                        total = max(total, c['start'] + c['samples'])
+        return total
+
+    def set_metadata(self, **kwargs):
+        # radio settings changed, the samples that follow go to a new chunk
+        if all(self.metadata.get(k) == v for k,v in kwargs.items()):
+            return
+        self.metadata.update(kwargs)
+        self._close_chunk()
+
+    def write(self, iq, timestamp = None):
+        # iq: complex64 block, timestamp: wall clock of iq[0]
+        if timestamp is None:
+            timestamp = self.clock()
+        iq = np.asarray(iq, dtype = np.complex64)
+        idx = 0
+        while idx < len(iq):
+            if self.mm is None:
+                self._open_chunk(timestamp + idx/self.samp_rate, self.total + idx)
+            n = min(len(iq) - idx, self.chunk_samples - self.fill)
+            block = iq[idx:idx+n].view(np.float32)
+            if self.fmt == 'cs8':
+                block = np.clip(np.rint(block/self.scale), -128, 127)
+            self.mm[2*self.fill:2*(self.fill+n)] = block
+            self.fill += n
+            idx += n
+            if self.fill == self.chunk_samples:
+                self._close_chunk()
+        self.total += len(iq)
+        self.stats['samples'] += len(iq)
+
+    def _open_chunk(self, timestamp, start):
+        name = 'iq_{:06d}.{}'.format(self.nchunk, self.fmt)
+        self.nchunk += 1
+        # the file is created at full size and filled through the map
+        self.mm = np.memmap(os.path.join(self.directory, name), dtype = self.dtype,
+                            mode = 'w+', shape = (2*self.chunk_samples,))
+        self.fill  = 0
+        self.entry = dict(self.metadata,
+                          file      = name,
+                          start     = start,
+                          time      = timestamp,
+                          samp_rate = self.samp_rate,
+                          format    = self.fmt)
+
+    def _close_chunk(self):
+        if self.mm is None:
+            return
+        path = self.mm.filename
+        self.mm.flush()
+        self.mm = None
+        nbytes = 2*self.fill*np.dtype(self.dtype).itemsize
+        if self.fill < self.chunk_samples:
+            os.truncate(path, nbytes)
+        if self.fill:
+            self.entry['samples'] = self.fill
+            self.index.write(json.dumps(self.entry) + '\n')
+            self.index.flush()
+            self.stats['chunks'] += 1
+            self.stats['bytes']  += nbytes
+        else:
+            os.remove(path)
+        self.entry = None
+        self.fill  = 0
+
+    def close(self):
+        self._close_chunk()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class IQCaptureReader():
+    def __init__(self, directory):
+        self.directory = directory
+        self.chunks = []
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    self.chunks.append(json.loads(line))
+        self.chunks.sort(key = lambda c: c['start'])
+        self.nsamples = sum(c['samples'] for c in self.chunks)
+
+    @property
+    def metadata(self):
+        # settings of the first chunk, what a replay starts with
+        return self.chunks[0] if self.chunks else {}
+
+    def chunk_map(self, chunk):
+        # interleaved i/q components of one chunk, mapped, not read
+        dtype, _ = FORMATS[chunk.get('format', 'cf32')]
+        return np.memmap(os.path.join(self.directory, chunk['file']), dtype = dtype, mode = 'r',
+                         shape = (2*chunk['samples'],))
+
+    def blocks(self, block_size = 1 << 18):
+        # yields (chunk entry, stream index, complex64 block) in capture order,
+        # cf32 blocks are views of the map, cs8 blocks are converted one at a time
+        for chunk in self.chunks:
+            mm = self.chunk_map(chunk)
+            _, scale = FORMATS[chunk.get('format', 'cf32')]
+            for idx in range(0, chunk['samples'], block_size):
+                comp = mm[2*idx:2*(idx+block_size)]
+                if comp.dtype == np.float32:
+                    iq = comp.view(np.complex64)
+                else:
+                    iq = (comp.astype(np.float32)*scale).view(np.complex64)
+                yield chunk, chunk['start'] + idx, iq
+
+    def __len__(self):
+        return self.nsamples
+
+    def __repr__(self):
+        return 'IQCaptureReader({}, {} chunks, {} samples)'.format(self.directory, len(self.chunks), self.nsamples)
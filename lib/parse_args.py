@@ -154,6 +154,284 @@ outfile       '-' (default stdout)
         pass
     return r
 
+def decode_parse_args(args):
+    r = {
+        'args' : {
+            'verbose'   : False,
+            'quiet'     : False,
+            'rate'      : None,
+            'workers'   : None,
+            'segment'   : 30.,
+            'overlap'   : 3.,
+            'options'   : {},
+        },
+        'in' : {
+            'file'  : None,
+        },
+        'out' : {
+            'file'  : '-', #to stdout
+        },
+    }
+
+    if '-h' in args or '--help' in args or len(args)==1:
+        print('''APRS DECODE
+Offline parallel decode of long recordings
+
+Usage:
+aprs_decode.py [options] (-t outfile) (-t infile)
+aprs_decode.py [options] (-t infile)
+
+OPTIONS:
+-r, --rate       sampling rate of raw input, 22050 (default) for audio, 4800000 (default) for IQ,
+                 wav files carry their own
+-w, --workers    decoder processes, default one per cpu
+-s, --segment    30 (default), seconds of audio per segment
+--overlap        3 (default), seconds shared by consecutive segments
+-o, --options    demod options as json
+-q, --quiet      no summary on stderr
+
+-t INPUT TYPE OPTIONS:
+infile       'filename.wav' 16 bit pcm wav | 'filename.raw' raw 16 bit signed samples
+             'filename.cs8' 8 bit IQ (hackrf_transfer) | 'filename.cf32', 'filename.cfile' float IQ
+             IQ is expected as AFSKReceiver captures it, 500 kHz above the signal
+
+-t OUTPUT TYPE OPTIONS:
+outtype       'aprs' strings, prefixed with the time offset in seconds
+outfile       '-' (default stdout)
+''')
+        return
+
+    spl = [x.split() for x in ' '.join(args).split(' -t ')]
+    try:
+        #general args
+        args = spl.pop(0)
+        if '--rate' in args:
+            r['args']['rate'] = get_arg_val(args, '--rate', lambda v: int(float(v)))
+        if '-r' in args:
+            r['args']['rate'] = get_arg_val(args, '-r', lambda v: int(float(v)))
+        if '--workers' in args:
+            r['args']['workers'] = get_arg_val(args, '--workers', int)
+        if '-w' in args:
+            r['args']['workers'] = get_arg_val(args, '-w', int)
+        if '--segment' in args:
+            r['args']['segment'] = get_arg_val(args, '--segment', float)
+        if '-s' in args:
+            r['args']['segment'] = get_arg_val(args, '-s', float)
+        if '--overlap' in args:
+            r['args']['overlap'] = get_arg_val(args, '--overlap', float)
+        if '-v' in args or '--verbose' in args:
+            r['args']['verbose'] = True
+        if '-q' in args or '--quiet' in args:
+            r['args']['quiet'] = True
+        if '-o' in args:
+            r['args']['options'] = loads(get_arg_val(args, '-o'))
+        if '--options' in args:
+            r['args']['options'] = loads(get_arg_val(args, '--options'))
+    except IndexError:
+        pass
+    if len(spl) == 2:
+        try:
+            r['out']['file'] = spl.pop(0)[-1]
+        except IndexError:
+            pass
+    try:
+        r['in']['file'] = spl.pop(0)[-1]
+    except IndexError:
+        pass
+    return r
+
+def bench_parse_args(args):
+    r = {
+        'args' : {
+            'verbose'    : False,
+            'quiet'      : False,
+            'rate'       : 22050,
+            'packets'    : 100,
+            'seed'       : 0,
+            'conditions' : None,
+            'options'    : {},
+            'bank'       : None,
+        },
+        'out' : {
+            'file'  : '-', #to stdout
+        },
+    }
+
+    if '-h' in args or '--help' in args:
+        print('''APRS BENCH
+Packet error rate of the demod over simulated channel conditions
+
+Usage:
+aprs_bench.py [options] (-t outfile)
+aprs_bench.py [options]
+
+OPTIONS:
+-r, --rate        22050 (default), sampling rate of the corpus
+-n, --packets     100 (default), packets in the corpus
+--seed            0 (default), corpus and noise seed
+-c, --conditions  comma separated condition names (default all), or json
+                  {"name": {"snr_db": 6, "freq_offset": 50, "twist_db": -3, "preemph_tau": 75e-6}}
+-o, --options     demod options as json
+-e, --engine      demod engine, corr (default) or goertzel, same as -o '{"engine": ...}'
+-b, --bank        decode with a demod bank, 'default' or a json list of option overrides
+-q, --quiet       no progress on stderr
+
+-t OUTPUT TYPE OPTIONS:
+outtype       json report
+outfile       '-' (default stdout)
+''')
+        return
+
+    spl = split_args(args)
+    try:
+        #general args
+        args = spl.pop(0)
+        if '--rate' in args:
+            r['args']['rate'] = get_arg_val(args, '--rate', int)
+        if '-r' in args:
+            r['args']['rate'] = get_arg_val(args, '-r', int)
+        if '--packets' in args:
+            r['args']['packets'] = get_arg_val(args, '--packets', int)
+        if '-n' in args:
+            r['args']['packets'] = get_arg_val(args, '-n', int)
+        if '--seed' in args:
+            r['args']['seed'] = get_arg_val(args, '--seed', int)
+        if '-c' in args:
+            r['args']['conditions'] = get_arg_val(args, '-c')
+        if '--conditions' in args:
+            r['args']['conditions'] = get_arg_val(args, '--conditions')
+        if '-b' in args:
+            r['args']['bank'] = get_arg_val(args, '-b')
+        if '--bank' in args:
+            r['args']['bank'] = get_arg_val(args, '--bank')
+        if '-v' in args or '--verbose' in args:
+            r['args']['verbose'] = True
+        if '-q' in args or '--quiet' in args:
+            r['args']['quiet'] = True
+        if '-o' in args:
+            r['args']['options'] = loads(get_arg_val(args, '-o'))
+        if '--options' in args:
+            r['args']['options'] = loads(get_arg_val(args, '--options'))
+        if '-e' in args:
+            r['args']['options']['engine'] = get_arg_val(args, '-e')
+        if '--engine' in args:
+            r['args']['options']['engine'] = get_arg_val(args, '--engine')
+    except IndexError:
+        pass
+    try:
+        r['out']['file'] = spl.pop(0)[-1]
+    except IndexError:
+        pass
+    return r
+
+def tune_parse_args(args):
+    r = {
+        'args' : {
+            'verbose'    : False,
+            'quiet'      : False,
+            'rate'       : None,
+            'packets'    : 30,
+            'seed'       : 0,
+            'workers'    : None,
+            'conditions' : None,
+            'grid'       : None,
+            'max'        : None,
+            'tolerance'  : None,
+            'profiles'   : None,
+            'save'       : True,
+            'input'      : None, #simulated corpus
+        },
+        'out' : {
+            'file'  : '-', #to stdout
+        },
+    }
+
+    if '-h' in args or '--help' in args:
+        print('''APRS TUNE
+Parallel sweep of the demod options, the best combination is saved as the
+profile of the sampling rate and loaded by the receiver
+
+Usage:
+aprs_tune.py [options] (-t outfile)
+aprs_tune.py [options]
+
+OPTIONS:
+-i, --input       recording to tune against, as aprs_decode.py reads them,
+                  default a simulated corpus
+-r, --rate        48000 (default) rate of the simulated corpus, the receiver loads
+                  the 48000 profile only; or the rate of a raw input
+-n, --packets     30 (default), packets in the simulated corpus
+--seed            0 (default), corpus, noise and combination sampling seed
+-w, --workers     decoder processes, default one per cpu
+-c, --conditions  comma separated condition names of aprs_bench.py, or json
+-g, --grid        options to sweep as json {"lpf_f": [900, 1000], ...}
+-m, --max         try at most this many combinations, picked at random
+--tolerance       0.02 (default), fraction of the best decode count a faster
+                  combination may miss and still rank first
+-p, --profiles    demod_profiles.json (default)
+--no-save         rank only, leave the profiles alone
+-q, --quiet       no progress on stderr
+
+-t OUTPUT TYPE OPTIONS:
+outtype       json report, combinations ranked
+outfile       '-' (default stdout)
+''')
+        return
+
+    spl = split_args(args)
+    try:
+        #general args
+        args = spl.pop(0)
+        if '--rate' in args:
+            r['args']['rate'] = get_arg_val(args, '--rate', lambda v: int(float(v)))
+        if '-r' in args:
+            r['args']['rate'] = get_arg_val(args, '-r', lambda v: int(float(v)))
+        if '--packets' in args:
+            r['args']['packets'] = get_arg_val(args, '--packets', int)
+        if '-n' in args:
+            r['args']['packets'] = get_arg_val(args, '-n', int)
+        if '--seed' in args:
+            r['args']['seed'] = get_arg_val(args, '--seed', int)
+        if '--workers' in args:
+            r['args']['workers'] = get_arg_val(args, '--workers', int)
+        if '-w' in args:
+            r['args']['workers'] = get_arg_val(args, '-w', int)
+        if '-c' in args:
+            r['args']['conditions'] = get_arg_val(args, '-c')
+        if '--conditions' in args:
+            r['args']['conditions'] = get_arg_val(args, '--conditions')
+        if '-g' in args:
+            r['args']['grid'] = loads(get_arg_val(args, '-g'))
+        if '--grid' in args:
+            r['args']['grid'] = loads(get_arg_val(args, '--grid'))
+        if '-m' in args:
+            r['args']['max'] = get_arg_val(args, '-m', int)
+        if '--max' in args:
+            r['args']['max'] = get_arg_val(args, '--max', int)
+        if '--tolerance' in args:
+            r['args']['tolerance'] = get_arg_val(args, '--tolerance', float)
+        if '-p' in args:
+            r['args']['profiles'] = get_arg_val(args, '-p')
+        if '--profiles' in args:
+            r['args']['profiles'] = get_arg_val(args, '--profiles')
+        if '-i' in args:
+            r['args']['input'] = get_arg_val(args, '-i')
+        if '--input' in args:
+            r['args']['input'] = get_arg_val(args, '--input')
+        if '--no-save' in args:
+            r['args']['save'] = False
+        if '-v' in args or '--verbose' in args:
+            r['args']['verbose'] = True
+        if '-q' in args or '--quiet' in args:
+            r['args']['quiet'] = True
+    except IndexError:
+        pass
+    try:
+        r['out']['file'] = spl.pop(0)[-1]
+    except IndexError:
+        pass
+    return r
+
 def is_parse_args(args):
     r = {
         'args' : {
@@ -201,6 +479,17 @@ OPTIONS:
         pass
     return r
 
+def split_args(args):
+    # argv cut at the '-t' elements. The elements are kept whole, a json
+    # value with spaces in it stays one argument
+    spl = [[]]
+    for a in args:
+        if a == '-t':
+            spl.append([])
+        else:
+            spl[-1].append(a)
+    return spl
+
 def get_arg_val(args, arg, fn=None):
     try:
         if not fn:
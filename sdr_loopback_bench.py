@@ -0,0 +1,105 @@
+# sdr_loopback_bench.py
+
+import argparse
+import asyncio
+import json
+import queue
+import threading
+import time
+
+from core import SampleTransmitter, SimulatedDevice, generate_aprs_samples, start_receiver
+
+def main():
+    parser = argparse.ArgumentParser(description="Transmit and receive APRS frames through the simulated SDR")
+    parser.add_argument("-n", "--packets", type=int, default=20)
+    parser.add_argument("--frequency", type=float, default=50.01e6)
+    parser.add_argument("--noise", type=float, default=0.01, help="complex noise rms, the signal amplitude is 0.5")
+    parser.add_argument("--delay", type=float, default=0.0, help="channel delay in seconds")
+    parser.add_argument("--freq-offset", type=float, default=0.0, help="channel frequency offset in Hz")
+    parser.add_argument("--mode", default="audio", choices=("audio", "iq"))
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds to wait for each decode")
+    parser.add_argument("--throughput-s", type=float, default=5.0,
+                        help="seconds of unpaced receiving for the throughput figure, 0 to skip")
+    parser.add_argument("--decoder", default="stream", choices=("stream", "burst"))
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    device = SimulatedDevice(noise=args.noise, delay_s=args.delay, freq_offset=args.freq_offset,
+                             mode=args.mode, realtime=True)
+    stop_event = threading.Event()
+    ready = threading.Event()
+    decoded = queue.Queue()
+
+    def on_frame(ax25):
+        decoded.put((time.monotonic(), ax25.to_aprs().decode(errors="replace")))
+
+    rx_thread = start_receiver(stop_event, queue.Queue(), frequency=args.frequency, decoder=args.decoder,
+                               profile="headless", on_ready=lambda tb: ready.set(), on_frame=on_frame,
+                               device=device)
+    if not ready.wait(30):
+        stop_event.set()
+        raise SystemExit("receiver did not start")
+
+    tx = SampleTransmitter(2205000, device=device)
+    if not tx.initialize_hackrf(0, 0):
+        stop_event.set()
+        raise SystemExit("transmitter did not start")
+    tx.set_center_freq(args.frequency)
+
+    latencies = []
+    missed = 0
+    for i in range(args.packets):
+        message = f"N0CALL>APRS:>loopback {i:04d}"
+        samples = asyncio.run(generate_aprs_samples(message))
+        t0 = time.monotonic()
+        tx.transmit(samples)
+        deadline = t0 + len(samples) / 22050 + args.timeout
+        while True:
+            try:
+                t, aprs = decoded.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                missed += 1
+                break
+            if aprs.endswith(f"loopback {i:04d}"):
+                latencies.append(t - t0)
+                break
+    tx.stop_and_wait()
+
+    # Unpaced receiving of noise, how far ahead of real time the chain runs
+    throughput = None
+    if args.throughput_s:
+        before = device.stats()
+        device.realtime = False
+        t0 = time.monotonic()
+        time.sleep(args.throughput_s)
+        dt = time.monotonic() - t0
+        device.realtime = True
+        after = device.stats()
+        samples = (after["noise_samples"] + after["delivered_samples"]
+                   - before["noise_samples"] - before["delivered_samples"])
+        throughput = samples / dt / device.rx_rate
+
+    stop_event.set()
+    rx_thread.join()
+
+    report = {
+        "packets": args.packets,
+        "decoded": len(latencies),
+        "missed": missed,
+        "latency_avg_s": sum(latencies) / len(latencies) if latencies else None,
+        "latency_max_s": max(latencies) if latencies else None,
+        "rx_realtime_factor": throughput,
+        "device": device.stats(),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['decoded']}/{report['packets']} decoded")
+        if latencies:
+            print(f"latency avg {report['latency_avg_s']:.3f} s, max {report['latency_max_s']:.3f} s "
+                  "(start of transmission -> frame)")
+        if throughput is not None:
+            print(f"receive chain at {throughput:.2f}x real time")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import os
+import sys
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+def load_core_module(name, deps=()):
+    # core/__init__ imports gnuradio, the socket and pty services do not
+    # need it: load core/<name>.py on its own. The core modules in deps are
+    # loaded first and registered as core.<dep> for its imports
+    for dep in deps:
+        sys.modules.setdefault('core.' + dep, load_core_module(dep))
+    spec = importlib.util.spec_from_file_location('core_' + name, os.path.join(ROOT, 'core', name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
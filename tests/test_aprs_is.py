@@ -0,0 +1,79 @@
+import asyncio
+
+from ax25.ax25 import AX25
+from lib.aprs_is import APRSISClient
+
+class StandInServer():
+    # local stand in for an APRS-IS server, records the lines it receives
+    def __init__(self):
+        self.lines = []
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+        writer.write(b'# stand-in aprs-is\r\n')
+        await writer.drain()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            self.lines.append(line.rstrip(b'\r\n'))
+        writer.close()
+
+    async def wait_lines(self, n, timeout = 2.):
+        for i in range(int(timeout/0.01)):
+            if len(self.lines) >= n:
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError('stand-in server got {}'.format(self.lines))
+
+    def close(self):
+        self.server.close()
+
+def rf_decoded(aprs):
+    # a frame as the demod delivers it, decoded from the ax25 bytes
+    return AX25(frame = AX25(aprs = aprs).to_frame())
+
+def test_gate_rf_decoded_ssid():
+    async def run():
+        server = StandInServer()
+        await server.start()
+        client = APRSISClient('IGCALL-10', 12345, host = '127.0.0.1', port = server.port, batch_delay = 0.01)
+        await client.start()
+        try:
+            assert client.gate(rf_decoded(b'N0CALL-7>APRS-2,WIDE1-1:>hello'))
+            # the same packet heard again through a digipeater is a duplicate
+            assert not client.gate(rf_decoded(b'N0CALL-7>APRS-2,DIGI-12,WIDE1-1:>hello'))
+            await server.wait_lines(2)
+            assert server.lines[0].startswith(b'user IGCALL-10 pass 12345 ')
+            assert server.lines[1:] == [b'N0CALL-7>APRS-2,WIDE1-1,qAR,IGCALL-10:>hello']
+            stats = client.get_stats()
+            assert stats['gated'] == 1
+            assert stats['duplicates'] == 1
+        finally:
+            await client.stop()
+            server.close()
+    asyncio.run(run())
+
+def test_beacon_on_full_queue_drops_oldest():
+    async def run():
+        server = StandInServer()
+        await server.start()
+        client = APRSISClient('IGCALL-10', 12345, host = '127.0.0.1', port = server.port, batch_delay = 0.01,
+                              maxlen = 3, beacon = 'IGCALL-10>APRS,TCPIP*:>beacon')
+        # queued while offline, the queue is full when the beacon is due
+        for i in range(3):
+            client.send('N0CALL>APRS:>%d' % i)
+        await client.start()
+        try:
+            await server.wait_lines(4)
+            assert server.lines[1:] == [b'IGCALL-10>APRS,TCPIP*:>beacon', b'N0CALL>APRS:>1', b'N0CALL>APRS:>2']
+            assert client.get_stats()['dropped'] == 1
+        finally:
+            await client.stop()
+            server.close()
+    asyncio.run(run())
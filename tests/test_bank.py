@@ -0,0 +1,48 @@
+import numpy as np
+
+from afsk.bank import BANK_PROFILES, decode_samples_bank
+from afsk.bench import Corpus
+from afsk.channel import apply_channel
+
+FS = 22050
+
+def noisy(corpus, snr_db):
+    return apply_channel(corpus.samples, FS, snr_db = snr_db,
+                         signal_power = corpus.signal_power, rng = np.random.default_rng(1))
+
+def decode(x, profiles, stats = None):
+    return [bytes(f.to_aprs()) for _, f in
+            decode_samples_bank(x, sampling_rate = FS, profiles = profiles, stats = stats)]
+
+def src_dst(frame):
+    # the bank matches source and destination, the path may be the corrupt part
+    return frame.split(b':', 1)[0].split(b',', 1)[0]
+
+def test_bank_is_union_of_profiles():
+    x = noisy(Corpus(12, FS, seed = 0), 8)
+    union = set()
+    for p in BANK_PROFILES:
+        union |= set(decode(x, [p]))
+    stats = {}
+    frames = decode(x, BANK_PROFILES, stats)
+    # every packet once, however many profiles decoded it
+    assert len(frames) == len(set(frames))
+    assert set(frames) == union
+    assert stats['duplicates'] > 0
+    assert stats['frames'] == len(frames)
+
+def test_bank_skips_fixes_of_decoded_packets():
+    # at 6dB a profile alone fixes a few corrupt frames into wrong ones, the
+    # bank does not try when another profile decoded the packet
+    x = noisy(Corpus(12, FS, seed = 0), 6)
+    union = set()
+    for p in BANK_PROFILES:
+        union |= set(decode(x, [p]))
+    stats = {}
+    frames = decode(x, BANK_PROFILES, stats)
+    assert len(frames) == len(set(frames))
+    assert set(frames) <= union
+    addrs = {src_dst(f) for f in frames}
+    for f in union - set(frames):
+        assert src_dst(f) in addrs
+    assert stats['fix_skipped'] > 0
@@ -0,0 +1,88 @@
+import asyncio
+import queue
+import time
+
+import pytest
+
+from conftest import load_core_module
+
+bq = load_core_module('bounded_queue')
+
+def drain(q):
+    items = []
+    while not q.empty():
+        items.append(q.get_nowait())
+    return items
+
+def test_block_timeout_counts_drop():
+    q = bq.BoundedQueue(2, bq.BLOCK)
+    q.put(1)
+    q.put(2)
+    t0 = time.monotonic()
+    with pytest.raises(queue.Full):
+        q.put(3, timeout=0.05)
+    assert time.monotonic() - t0 >= 0.05
+    with pytest.raises(queue.Full):
+        q.put(4, block=False)
+    assert drain(q) == [1, 2]
+    assert q.stats()['dropped'] == 2
+    assert q.stats()['enqueued'] == 2
+
+def test_drop_oldest():
+    q = bq.BoundedQueue(3, bq.DROP_OLDEST)
+    for i in range(5):
+        q.put(i, block=False)
+    assert q.stats()['dropped'] == 2
+    assert q.stats()['high_water'] == 3
+    assert drain(q) == [2, 3, 4]
+    # the dropped items do not count as unfinished tasks
+    for i in range(3):
+        q.task_done()
+    q.join()
+
+def test_drop_newest():
+    q = bq.BoundedQueue(3, bq.DROP_NEWEST)
+    for i in range(5):
+        q.put(i)
+    s = q.stats()
+    assert (s['enqueued'], s['dropped'], s['size']) == (3, 2, 3)
+    assert drain(q) == [0, 1, 2]
+
+def test_force_put_ignores_maxsize():
+    for policy in bq.POLICIES:
+        q = bq.BoundedQueue(1, policy)
+        q.put('item')
+        q.force_put(None)
+        assert q.stats()['dropped'] == 0
+        assert q.stats()['high_water'] == 2
+        assert drain(q) == ['item', None]
+
+def test_async_policies():
+    async def run():
+        block = bq.BoundedAsyncQueue(1, bq.BLOCK)
+        block.put_nowait(1)
+        with pytest.raises(asyncio.QueueFull):
+            block.put_nowait(2)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(block.put(3), 0.05)
+        assert block.dropped == 1
+
+        oldest = bq.BoundedAsyncQueue(2, bq.DROP_OLDEST)
+        newest = bq.BoundedAsyncQueue(2, bq.DROP_NEWEST)
+        for i in range(4):
+            await oldest.put(i)
+            await newest.put(i)
+        assert drain(oldest) == [2, 3] and oldest.dropped == 2
+        assert drain(newest) == [0, 1] and newest.dropped == 2
+        # task_done was called for the dropped items, join only waits for the two left
+        oldest.task_done()
+        oldest.task_done()
+        await asyncio.wait_for(oldest.join(), 1.)
+    asyncio.run(run())
+
+def test_settings_and_registry():
+    q = bq.make_queue('ax25_q', {'ax25_q': {'maxsize': 5}})
+    assert (q.maxsize, q.policy) == (5, bq.DROP_OLDEST)
+    assert bq.queue_stats()['ax25_q']['maxsize'] == 5
+    with pytest.raises(ValueError):
+        bq.make_queue('ax25_q', {'ax25_q': {'policy': 'spill'}})
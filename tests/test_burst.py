@@ -0,0 +1,99 @@
+import threading
+
+import numpy as np
+
+from afsk.bench import Corpus
+from afsk.burst import BurstDecoder, BurstSegmenter
+
+BS = 480
+
+def tone(nblocks, level = 2000):
+    return np.full(nblocks*BS, level, dtype = np.int16)
+
+def quiet(nblocks):
+    return np.zeros(nblocks*BS, dtype = np.int16)
+
+def segmenter(**kw):
+    # 0.1s pre/post roll at 48 kHz is 10 blocks
+    return BurstSegmenter(sampling_rate = 48000, threshold = 500, block_size = BS, **kw)
+
+def feed_chunks(seg, x, sizes):
+    bursts, idx, i = [], 0, 0
+    while idx < len(x):
+        n = sizes[i % len(sizes)]
+        bursts += seg.feed(x[idx:idx+n], timestamp = 0.)
+        idx += n
+        i += 1
+    return bursts
+
+def test_burst_edges_with_pre_and_post_roll():
+    x = np.concatenate((quiet(30), tone(5), quiet(30)))
+    bursts = segmenter().feed(x, timestamp = 0.)
+    assert len(bursts) == 1
+    b = bursts[0]
+    # 10 blocks pre-roll, the tone, then 10 quiet blocks close the gate
+    assert b.start == 20*BS
+    assert len(b) == 25*BS
+    assert np.array_equal(b.samples, x[20*BS:45*BS])
+
+def test_edges_do_not_depend_on_chunking():
+    x = np.concatenate((quiet(3), tone(4), quiet(12), tone(2), quiet(40)))
+    ref = segmenter().feed(x, timestamp = 0.)
+    got = feed_chunks(segmenter(), x, [1, 479, 1000, 7, 4096])
+    assert [(b.start, len(b)) for b in got] == [(b.start, len(b)) for b in ref]
+    for a, b in zip(got, ref):
+        assert np.array_equal(a.samples, b.samples)
+
+def test_hangover_bridges_short_gaps():
+    # a gap shorter than the post roll stays in the burst, a longer one splits it
+    short = np.concatenate((quiet(20), tone(3), quiet(9), tone(3), quiet(20)))
+    assert len(segmenter().feed(short, timestamp = 0.)) == 1
+    split = np.concatenate((quiet(20), tone(3), quiet(10), tone(3), quiet(20)))
+    bursts = segmenter().feed(split, timestamp = 0.)
+    assert len(bursts) == 2
+    # the gap went to the first burst, none is left for a pre roll
+    assert bursts[1].start == bursts[0].start + len(bursts[0])
+
+def test_max_length_cut():
+    bursts = segmenter(max_length = 0.2).feed(tone(45), timestamp = 0.)
+    assert [len(b) for b in bursts] == [20*BS, 20*BS]
+
+def test_flush():
+    seg = segmenter()
+    assert seg.flush() == []
+    assert seg.feed(np.concatenate((quiet(2), tone(3), tone(1)[:100])), timestamp = 0.) == []
+    # the partial block goes with the burst
+    bursts = seg.flush()
+    assert len(bursts) == 1 and bursts[0].start == 0 and len(bursts[0]) == 5*BS + 100
+    assert seg.flush() == []
+
+def test_input_buffer_reuse():
+    # gnuradio reuses its input buffers, bursts must not alias them
+    seg = segmenter()
+    buf = tone(3)
+    seg.feed(buf, timestamp = 0.)
+    buf[:] = 0
+    b = seg.flush()[0]
+    assert np.all(b.samples == 2000)
+
+def test_burst_decoder():
+    fs = 22050
+    corpus = Corpus(3, fs, seed = 1)
+    # the corpus leaves 0.1s between packets
+    seg = BurstSegmenter(sampling_rate = fs, threshold = 500, block_size = 441,
+                         pre_roll = 0.04, post_roll = 0.04)
+    results = []
+    lock = threading.Lock()
+    def on_decoded(burst, frames):
+        with lock:
+            results.append((burst.start, [bytes(f.to_aprs()) for f in frames]))
+    decoder = BurstDecoder(on_decoded, sampling_rate = fs, workers = 2)
+    # the last packet is still open when the stream ends, flush decodes it
+    bursts = seg.feed(corpus.samples[:-int(0.1*fs)], timestamp = 0.) + seg.flush()
+    assert len(bursts) == 3
+    for b in bursts:
+        decoder.submit(b)
+    decoder.shutdown(wait = True)
+    assert decoder.decoded == 3 and decoder.failed == 0 and decoder.pending == 0
+    frames = [f for _, fs_ in sorted(results) for f in fs_]
+    assert frames == corpus.packets
@@ -0,0 +1,54 @@
+import numpy as np
+
+from afsk.bench import Corpus
+from afsk.channel import apply_channel
+from afsk.decode import decode_samples
+from afsk.demod import DEFAULT_OPTIONS
+from afsk.goertzel import GoertzelDemod, SlidingSum
+
+def split(n, seed):
+    # random block sizes covering n, empty blocks included
+    rnd = np.random.default_rng(seed)
+    idx = 0
+    while idx < n:
+        k = int(rnd.integers(0, 300))
+        yield idx, idx + k
+        idx += k
+
+def test_sliding_sum_matches_window_sum():
+    rnd = np.random.default_rng(0)
+    x = rnd.standard_normal((2, 2000))
+    for n in (1, 7, 40):
+        s = SlidingSum(2, n)
+        got = np.concatenate([s.process(x[:,a:b]) for a, b in split(x.shape[1], n)], axis = 1)
+        padded = np.concatenate((np.zeros((2, n - 1)), x), axis = 1)
+        ref = np.stack([padded[:,i:i+n].sum(axis = 1) for i in range(x.shape[1])], axis = 1)
+        assert np.allclose(got, ref)
+
+def test_decimate_block_size_invariance():
+    rnd = np.random.default_rng(1)
+    x = rnd.integers(-20000, 20000, 20000).astype(np.float64)
+    for fs in (48000, 22050):
+        ref = GoertzelDemod(fs, DEFAULT_OPTIONS)
+        whole = ref.decimate(x)
+        d = GoertzelDemod(fs, DEFAULT_OPTIONS)
+        blocks = np.concatenate([d.decimate(x[a:b]) for a, b in split(len(x), fs)])
+        assert d.decim == (3 if fs == 48000 else 1)
+        assert len(whole) == -(-len(x)//d.decim)
+        assert np.allclose(blocks, whole)
+
+def test_process_block_size_invariance():
+    fs = 48000
+    corpus = Corpus(2, fs, seed = 4)
+    ref = GoertzelDemod(fs, DEFAULT_OPTIONS).process(corpus.samples)
+    d = GoertzelDemod(fs, DEFAULT_OPTIONS)
+    bits = np.concatenate([d.process(corpus.samples[a:b]) for a, b in split(len(corpus.samples), 2)])
+    assert np.array_equal(bits, ref)
+
+def test_goertzel_decode():
+    fs = 22050
+    corpus = Corpus(6, fs, seed = 7)
+    x = apply_channel(corpus.samples, fs, snr_db = 10, signal_power = corpus.signal_power,
+                      rng = np.random.default_rng(3))
+    frames = decode_samples(x, sampling_rate = fs, options = {'engine' : 'goertzel'})
+    assert sorted(bytes(f.to_aprs()) for _, f in frames) == sorted(corpus.packets)
@@ -0,0 +1,25 @@
+from conftest import load_core_module
+
+hackrf_utils = load_core_module('hackrf_utils')
+
+def test_refcount_per_owner():
+    lc = hackrf_utils.HackRFLifecycle()
+    lc.open(0, object, 'rx')
+    lc.open(0, object, 'rx')
+    lc.open(0, object, 'tx')
+    assert lc.holders(0) == {'rx', 'tx'}
+    assert lc.stats()['open_devices'] == {0: {'rx': 2, 'tx': 1}}
+
+    # rx still holds one block after the first release
+    lc.release(0, 'rx')
+    lc.release(0, 'tx')
+    assert lc.is_open(0)
+    assert lc.holders(0) == {'rx'}
+    lc.release(0, 'rx')
+    assert not lc.is_open(0)
+
+    # a release without an open is not counted
+    lc.release(0, 'rx')
+    lc.release(1, 'tx')
+    assert lc.stats()['releases'] == 3
+    assert lc.stats()['open_devices'] == {}
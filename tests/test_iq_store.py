@@ -0,0 +1,40 @@
+import numpy as np
+
+from lib.iq_store import IQCaptureWriter, IQCaptureReader
+
+def session(directory, value, clock):
+    # 2.5 chunks of samples all equal to value
+    with IQCaptureWriter(directory, samp_rate = 100, chunk_s = 1., clock = clock) as w:
+        w.write(np.full(250, value, dtype = np.complex64))
+
+def test_reopened_capture_replays_in_order(tmp_path):
+    session(str(tmp_path), 1, lambda: 1000.)
+    session(str(tmp_path), 2, lambda: 2000.)
+
+    reader = IQCaptureReader(str(tmp_path))
+    assert len(reader.chunks) == 6
+    assert [c['start'] for c in reader.chunks] == [0, 100, 200, 250, 350, 450]
+    assert len(reader) == 500
+
+    values, idx = [], 0
+    for chunk, start, iq in reader.blocks(block_size = 64):
+        assert start == idx
+        idx += len(iq)
+        values.append(iq.real)
+    values = np.concatenate(values)
+    assert np.array_equal(values, np.repeat([1., 2.], 250))
+
+def test_cs8_round_trip(tmp_path):
+    iq = (0.5*np.exp(1j*np.linspace(0, 20, 300))).astype(np.complex64)
+    with IQCaptureWriter(str(tmp_path), samp_rate = 100, chunk_s = 1., fmt = 'cs8') as w:
+        w.set_metadata(freq = 144.39e6)
+        w.write(iq[:120])
+        # a retune closes the chunk early
+        w.set_metadata(freq = 144.80e6)
+        w.write(iq[120:])
+
+    reader = IQCaptureReader(str(tmp_path))
+    assert [(c['start'], c['samples'], c['freq']) for c in reader.chunks] == \
+           [(0, 100, 144.39e6), (100, 20, 144.39e6), (120, 100, 144.80e6), (220, 80, 144.80e6)]
+    out = np.concatenate([x for _, _, x in reader.blocks()])
+    assert np.max(np.abs(out - iq)) <= 1/128.
@@ -0,0 +1,95 @@
+import os
+import select
+import asyncio
+
+from ax25.ax25 import AX25
+from ax25.kiss import KISSDecoder, encode_ax25, decode_data_frames
+
+from conftest import load_core_module
+
+kiss_pty = load_core_module('kiss_pty')
+
+APRS = b'N0CALL-7>APRS,WIDE1-1:>kiss test \xc0\xdb'
+
+def read_all(fd, timeout = 1.):
+    # what the pty slave side has, waiting up to timeout for the first byte
+    data = b''
+    while select.select([fd], [], [], timeout)[0]:
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            break
+        data += chunk
+        timeout = 0.05
+    return data
+
+def test_ax25_round_trip():
+    frames, bad = decode_data_frames(KISSDecoder(), encode_ax25(AX25(aprs = APRS)))
+    assert bad == 0
+    assert [bytes(f.to_aprs()) for f in frames] == [APRS]
+
+def test_pty_out_and_in():
+    async def run():
+        received = []
+        pty = kiss_pty.KISSPty(on_frame = received.append)
+        await pty.start()
+        try:
+            # decoded frame out to the serial client
+            pty.broadcast(AX25(aprs = APRS))
+            await asyncio.sleep(0.05)
+            frames, bad = decode_data_frames(KISSDecoder(), read_all(pty.slave_fd))
+            assert bad == 0
+            assert [bytes(f.to_aprs()) for f in frames] == [APRS]
+
+            # frame to transmit in from the serial client
+            os.write(pty.slave_fd, encode_ax25(AX25(aprs = APRS)))
+            for i in range(50):
+                if received:
+                    break
+                await asyncio.sleep(0.01)
+            assert [bytes(f.to_aprs()) for f in received] == [APRS]
+            assert pty.stats()['frames_in'] == 1
+        finally:
+            pty.close()
+    asyncio.run(run())
+
+def test_pty_slow_client_drops_whole_frames():
+    async def run():
+        pty = kiss_pty.KISSPty(max_buffer = 4096)
+        await pty.start()
+        try:
+            # nobody reads the slave side: the tty buffer, then ours, fill up
+            for i in range(2000):
+                pty.broadcast(AX25(aprs = APRS))
+            stats = pty.stats()
+            assert stats['dropped'] > 0
+            assert stats['buffered'] <= 4096
+            # what reached the tty followed by what is buffered is a stream
+            # of complete frames, dropped frames leave no partial bytes
+            stream = read_all(pty.slave_fd) + bytes(pty.out)
+            frames, bad = decode_data_frames(KISSDecoder(), stream)
+            assert bad == 0
+            assert len(frames) == stats['frames_out']
+            assert len(stream) == stats['frames_out']*len(encode_ax25(AX25(aprs = APRS)))
+        finally:
+            pty.close()
+    asyncio.run(run())
+
+def test_pty_write_error_drops_buffer():
+    async def run():
+        # writing to the read end of a pipe fails with EBADF every time
+        r, w = os.pipe()
+        pty = kiss_pty.KISSPty(master_fd = r)
+        await pty.start()
+        try:
+            for i in range(3):
+                pty.broadcast(AX25(aprs = APRS))
+            await asyncio.sleep(0.02)
+            stats = pty.stats()
+            assert stats['write_errors'] == 3
+            assert stats['dropped'] == 3
+            assert stats['buffered'] == 0
+            assert not pty.writing
+        finally:
+            pty.close()
+            os.close(w)
+    asyncio.run(run())
@@ -0,0 +1,59 @@
+import asyncio
+
+from ax25.ax25 import AX25
+from ax25.kiss import CMD_DATA, FEND, FESC, KISSDecoder, kiss_encode, encode_ax25, kiss_payload_to_ax25
+
+from conftest import load_core_module
+
+kiss_server = load_core_module('kiss_server')
+
+APRS = b'N0CALL>APRS,WIDE1-1:>kiss server test \xc0\xdb'
+
+def aprs_frames(data):
+    return [bytes(kiss_payload_to_ax25(p).to_aprs()) for _, cmd, p in KISSDecoder().feed(data) if cmd == CMD_DATA]
+
+def test_escape_round_trip_split_chunks():
+    payload = bytes([0x01, FEND, 0x02, FESC, 0x03])
+    data = kiss_encode(payload) + kiss_encode(b'\x10\x20', port = 3)
+    decoder = KISSDecoder()
+    frames = []
+    for i in range(len(data)):
+        frames += decoder.feed(data[i:i+1])
+    assert frames == [(0, 0, payload), (3, 0, b'\x10\x20')]
+    assert decoder.errors == 0
+
+def test_server_round_trip_and_eviction():
+    async def run():
+        received = []
+        server = kiss_server.KISSServer(on_frame = received.append, client_queue = 4)
+        await server.start('127.0.0.1', 0)
+        port = server.server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            for i in range(50):
+                if server.clients:
+                    break
+                await asyncio.sleep(0.01)
+
+            # both directions, a non data command from the client is ignored
+            writer.write(kiss_encode(b'\x20', cmd = 0x01) + encode_ax25(AX25(aprs = APRS)))
+            await writer.drain()
+            server.broadcast(AX25(aprs = APRS))
+            data = await asyncio.wait_for(reader.read(4096), 1.)
+            assert aprs_frames(data) == [APRS]
+            for i in range(50):
+                if received:
+                    break
+                await asyncio.sleep(0.01)
+            assert [bytes(f.to_aprs()) for f in received] == [APRS]
+            assert server.stats()['frames_in'] == 1
+
+            # a client that does not keep up is disconnected
+            for i in range(10):
+                server.broadcast(AX25(aprs = APRS))
+            assert server.stats()['evicted'] == 1
+            assert server.stats()['clients'] == 0
+            writer.close()
+        finally:
+            server.close()
+    asyncio.run(run())
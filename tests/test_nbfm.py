@@ -0,0 +1,112 @@
+import asyncio
+import math
+
+import numpy as np
+from scipy import signal
+
+from afsk.decode import decode_samples
+from afsk.mod import AFSKModulator
+from afsk.nbfm import NBFMReceiver, iir1, deemph_taps
+from ax25.ax25 import AX25
+
+# the AFSKReceiver rates, the moving average in front of the decimating
+# fir is 1000 samples long and only flat enough at this rate
+IQ_RATE    = 48e3*100
+LO_OFFSET  = 500e3
+AUDIO_RATE = 48000
+
+APRS = b'N0CALL-7>APRS,WIDE1-1:>nbfm test'
+
+def fm_iq(audio, audio_rate, dev):
+    # audio in +-1 -> fm iq at IQ_RATE, the station LO_OFFSET below the
+    # tuned frequency as the receiver nco expects
+    up = int(IQ_RATE//audio_rate)
+    m = np.repeat(np.asarray(audio, dtype = np.float64), up)
+    n = np.arange(len(m))
+    phase = 2*math.pi*(np.cumsum(dev*m) - LO_OFFSET*n)/IQ_RATE
+    return (0.5*np.exp(1j*phase)).astype(np.complex64)
+
+def tone_iq(freq, seconds, dev = 2.5e3):
+    t = np.arange(int(seconds*AUDIO_RATE))/AUDIO_RATE
+    return fm_iq(np.sin(2*math.pi*freq*t), AUDIO_RATE, dev)
+
+def receiver(**kwargs):
+    return NBFMReceiver(samp_rate = IQ_RATE, lo_offset = LO_OFFSET, audio_rate = AUDIO_RATE, **kwargs)
+
+def test_iir1_matches_lfilter():
+    rnd = np.random.default_rng(0)
+    x = rnd.standard_normal(5000)
+    b0, b1, p = deemph_taps(AUDIO_RATE, 75e-6)
+    ref = signal.lfilter([b0, b1], [1., -p], x)
+
+    # split at odd sizes, across and inside the internal blocks
+    y, state, idx = [], (0., 0.), 0
+    for n in (1, 63, 64, 65, 200, 7, 4600):
+        out, state = iir1(x[idx:idx+n], b0, b1, p, state)
+        y.append(out)
+        idx += n
+    assert idx == len(x)
+    assert np.allclose(np.concatenate(y), ref, rtol = 1e-9, atol = 1e-9)
+
+    # the squelch power average, b1 = 0
+    a = 0.05
+    y, state = iir1(x, a, 0., 1 - a, (0., 0.))
+    assert np.allclose(y, signal.lfilter([a], [1., -(1 - a)], x), rtol = 1e-9, atol = 1e-9)
+
+def test_block_size_invariance():
+    iq = tone_iq(1000, 0.2)
+    ref = receiver()
+    whole = ref.process(iq)
+
+    rx = receiver()
+    rnd = np.random.default_rng(1)
+    out, idx = [], 0
+    while idx < len(iq):
+        # down to blocks shorter than one decimation step
+        n = int(rnd.integers(1, 9000))
+        out.append(rx.process(iq[idx:idx+n]))
+        idx += n
+    blocks = np.concatenate(out)
+    # the squelch opens on the same sample, 4 audio samples per quad sample
+    assert rx.stats == ref.stats
+    assert len(blocks) == len(whole) == len(iq)//int(IQ_RATE//AUDIO_RATE) - 4*ref.stats['squelched']
+    # float32 products summed in another order, at most an lsb apart
+    assert np.max(np.abs(blocks.astype(np.int32) - whole)) <= 1
+
+def test_fm_tone_demod():
+    rx = receiver()
+    audio = rx.process(tone_iq(1000, 0.5)).astype(np.float64)
+    audio = audio[len(audio)//4:] # past the filter and deemphasis settling
+    spectrum = np.abs(np.fft.rfft(audio*np.hanning(len(audio))))
+    freqs = np.fft.rfftfreq(len(audio), 1/AUDIO_RATE)
+    assert abs(freqs[np.argmax(spectrum)] - 1000) < 10
+    # the squelch only holds back the start, while its average rises
+    assert 0 < rx.stats['squelched'] < 100
+    # 2.5k of 5k deviation at 0.05*vol full scale, less the deemphasis at 1k
+    amplitude = math.sqrt(2)*np.std(audio)
+    assert 0.4*0.5*32767*0.7 < amplitude < 0.4*0.5*32767
+
+def test_squelch_gates_noise():
+    rnd = np.random.default_rng(2)
+    noise = (1e-4*(rnd.standard_normal(48000) + 1j*rnd.standard_normal(48000))).astype(np.complex64)
+    rx = receiver()
+    assert len(rx.process(noise)) == 0
+    assert rx.stats['squelched'] > 0
+
+def test_fm_afsk_decode():
+    async def modulate():
+        async with AFSKModulator(sampling_rate = AUDIO_RATE) as afsk_mod:
+            afsk, stop_bit = AX25(aprs = APRS).to_afsk()
+            await afsk_mod.send_flags(20)
+            await afsk_mod.to_samples(afsk = afsk, stop_bit = stop_bit)
+            await afsk_mod.send_flags(10)
+            arr, s = await afsk_mod.flush()
+            return np.array(arr[:s], dtype = np.float64)
+    afsk = asyncio.run(modulate())
+    iq = fm_iq(afsk/np.max(np.abs(afsk)), AUDIO_RATE, 3e3)
+
+    # in odd sized blocks, like a live source
+    rx = receiver()
+    audio = np.concatenate([rx.process(iq[i:i+12345]) for i in range(0, len(iq), 12345)])
+    frames = decode_samples(audio, sampling_rate = AUDIO_RATE)
+    assert [bytes(f.to_aprs()) for _, f in frames] == [APRS]
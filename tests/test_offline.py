@@ -0,0 +1,44 @@
+import pytest
+
+from afsk.bench import Corpus
+from afsk.offline import OfflineDecoder, open_recording, segment_bounds
+
+def test_segment_bounds_exact_multiple():
+    # the last segment ends on the last sample, no empty tail segment
+    assert segment_bounds(25, 10, 5) == [(0, 10), (5, 15), (10, 20), (15, 25)]
+
+def test_segment_bounds_short_and_empty():
+    assert segment_bounds(7, 10, 3) == [(0, 7)]
+    assert segment_bounds(0, 10, 3) == []
+
+def test_segment_bounds_cover_every_sample():
+    for n in (11, 99, 100, 101):
+        bounds = segment_bounds(n, 10, 4)
+        assert bounds[0][0] == 0 and bounds[-1][1] == n
+        for (a, b), (c, d) in zip(bounds, bounds[1:]):
+            assert b - c == 4
+
+def test_segment_not_longer_than_overlap():
+    with pytest.raises(ValueError):
+        segment_bounds(100, 5, 5)
+    with pytest.raises(ValueError):
+        segment_bounds(100, 4, 5)
+
+def test_frames_straddling_segments_once(tmp_path):
+    fs = 22050
+    corpus = Corpus(6, fs, seed = 1)
+    path = tmp_path / 'corpus.raw'
+    corpus.samples.astype('<i2').tofile(path)
+    rec = open_recording(str(path), sampling_rate = fs)
+
+    # 1.7s segments overlapping by 1s: the segment ends at 1.7, 2.4, 3.1
+    # and 3.8s cut through packets, which are whole in the next segment;
+    # packets whole in two segments are decoded twice and yielded once
+    decoder = OfflineDecoder(workers = 2, segment_s = 1.7, overlap_s = 1.0)
+    frames = list(decoder.frames(rec))
+    assert [bytes(f.to_aprs()) for _, f in frames] == corpus.packets
+    offsets = [off for off, _ in frames]
+    assert offsets == sorted(offsets)
+    assert decoder.stats['frames'] == 6
+    assert decoder.stats['duplicates'] >= 1
+    assert decoder.stats['samples'] == len(corpus.samples)
@@ -0,0 +1,25 @@
+from lib.parse_args import bench_parse_args, tune_parse_args
+
+def test_bench_json_values_with_spaces():
+    # argv as the shell hands it over for the aprs_bench.py examples
+    r = bench_parse_args(['aprs_bench.py', '-c', '{"mine": {"snr_db": 6, "twist_db": -3}}',
+                          '-o', '{"lpf_f": 1100}', '-b', '[{"lpf_f": 900}, {}]', '-t', 'report.json'])
+    assert r['args']['conditions'] == '{"mine": {"snr_db": 6, "twist_db": -3}}'
+    assert r['args']['options'] == {'lpf_f': 1100}
+    assert r['args']['bank'] == '[{"lpf_f": 900}, {}]'
+    assert r['out']['file'] == 'report.json'
+
+def test_bench_plain_args():
+    r = bench_parse_args(['aprs_bench.py', '-n', '200', '-c', 'snr6,twist-6', '-e', 'goertzel'])
+    assert r['args']['packets'] == 200
+    assert r['args']['conditions'] == 'snr6,twist-6'
+    assert r['args']['options'] == {'engine': 'goertzel'}
+    assert r['out']['file'] == '-'
+
+def test_tune_grid_with_spaces():
+    r = tune_parse_args(['aprs_tune.py', '-i', 'capture.wav', '-g', '{"lpf_f": [900, 1000, 1100]}',
+                         '-c', '{"mine": {"snr_db": 6}}', '-t', 'tune.json'])
+    assert r['args']['grid'] == {'lpf_f': [900, 1000, 1100]}
+    assert r['args']['conditions'] == '{"mine": {"snr_db": 6}}'
+    assert r['args']['input'] == 'capture.wav'
+    assert r['out']['file'] == 'tune.json'
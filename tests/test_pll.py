@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from afsk.bank import PLLSampler
+from afsk.bench import Corpus
+from afsk.channel import apply_channel
+from afsk.decode import decode_samples
+from afsk.demod import AFSKDemodulator
+from afsk.func import create_pll_sampler, create_unnrzi
+
+def lpf_output(samples, fs):
+    # slicer input of the correlator chain, a sample at a time
+    d = AFSKDemodulator(None, None, sampling_rate = fs)
+    return np.array([d.lpf(d.corr(d.bpf(v))) for v in samples.tolist()], dtype = np.int64)
+
+@pytest.mark.parametrize('fs', [9600, 13200, 22050])
+def test_pll_sampler_matches_closure(fs):
+    corpus = Corpus(2, fs, seed = 3)
+    x = apply_channel(corpus.samples, fs, snr_db = 10, signal_power = corpus.signal_power,
+                      rng = np.random.default_rng(1))
+    y = lpf_output(x, fs)
+
+    sampler = create_pll_sampler(1200, fs)
+    unnrzi = create_unnrzi()
+    ref = [unnrzi(b) for b in (sampler(v) for v in y.tolist()) if b != 2]
+
+    # blocks of odd sizes, the phase and the last sample carry over
+    pll = PLLSampler(1200, fs)
+    got, idx, n = [], 0, 1
+    while idx < len(y):
+        got.append(pll.process(y[idx:idx+n]))
+        idx += n
+        n = n*3 % 1000 + 1
+    got = np.concatenate(got).tolist()
+    assert len(ref) > 1000
+    assert got == ref
+
+def test_pll_decode_9600():
+    fs = 9600
+    corpus = Corpus(4, fs, seed = 5)
+    frames = decode_samples(corpus.samples, sampling_rate = fs, options = {'clock' : 'pll'})
+    assert sorted(bytes(f.to_aprs()) for _, f in frames) == sorted(corpus.packets)
+
+def test_pll_decode_9600_goertzel_noise():
+    fs = 9600
+    corpus = Corpus(4, fs, seed = 5)
+    x = apply_channel(corpus.samples, fs, snr_db = 10, signal_power = corpus.signal_power,
+                      rng = np.random.default_rng(2))
+    frames = decode_samples(x, sampling_rate = fs, options = {'clock' : 'pll', 'engine' : 'goertzel'})
+    assert sorted(bytes(f.to_aprs()) for _, f in frames) == sorted(corpus.packets)
@@ -0,0 +1,87 @@
+import numpy as np
+
+from conftest import load_core_module
+
+sim_channel = load_core_module('sim_channel')
+
+RATE = 48000.
+
+def channel(**kw):
+    kw = dict({'noise': 0.0, 'amplitude': 1.0, 'mode': 'iq'}, **kw)
+    ch = sim_channel.SimulatedChannel(seed=1, **kw)
+    ch.tune_receiver(RATE, 100e6)
+    return ch
+
+def test_inject_and_read_in_pieces():
+    ch = channel(amplitude=0.5)
+    iq = (np.arange(1000) + 1j).astype(np.complex64)
+    ch.inject_iq(iq, RATE, 100e6)
+    parts = [ch.read(n) for n in (300, 300, 600)]
+    assert [filled for _, filled in parts] == [300, 300, 400]
+    out = np.concatenate([x for x, _ in parts])
+    assert np.allclose(out[:1000], 0.5*iq)
+    assert not out[1000:].any()
+    stats = ch.stats()
+    assert (stats['injected_samples'], stats['delivered_samples'], stats['noise_samples']) == (1000, 1000, 200)
+    assert stats['pending_samples'] == 0
+
+def test_no_receiver_nothing_queued():
+    ch = sim_channel.SimulatedChannel(noise=0.0)
+    ch.inject_iq(np.ones(10, dtype=np.complex64), RATE, 100e6)
+    assert ch.stats()['pending_samples'] == 0
+
+def test_delay_once_per_transmission():
+    ch = channel(delay_s=0.01)
+    delay = int(0.01*RATE)
+    block = np.ones(100, dtype=np.complex64)
+    ch.inject_iq(block, RATE, 100e6, stream='tx')
+    out, _ = ch.read(delay + 100)
+    assert not out[:delay].any() and out[delay:].all()
+    # the receiver drained the queue, the next block of the stream still
+    # follows without a gap
+    ch.inject_iq(block, RATE, 100e6, stream='tx')
+    out, filled = ch.read(100)
+    assert filled == 100 and out.all()
+    # a new transmission gets its delay again
+    ch.end_stream('tx')
+    ch.inject_iq(block, RATE, 100e6, stream='tx')
+    assert ch.stats()['pending_samples'] == delay + 100
+
+def test_frequency_offset_and_tuning():
+    # DC transmitted 1 kHz above the receiver center, plus a 100 Hz offset
+    ch = channel(freq_offset=100.)
+    ch.inject_iq(np.ones(4800, dtype=np.complex64), RATE, 100e6 + 1e3, stream='tx')
+    ch.inject_iq(np.ones(4800, dtype=np.complex64), RATE, 100e6 + 1e3, stream='tx')
+    out, _ = ch.read(9600)
+    # constant phase step of 1100 Hz, continuous across the two calls
+    step = np.angle(out[1:]*np.conj(out[:-1]))
+    assert np.allclose(step, 2*np.pi*1100/RATE, atol=1e-4)
+
+def test_resample_across_calls():
+    # a 12 kHz ramp resampled to 48 kHz in two calls is one continuous ramp
+    ch = channel()
+    ch.inject_iq(np.arange(0, 60, dtype=np.complex64), 12000., 100e6, stream='tx')
+    ch.inject_iq(np.arange(60, 120, dtype=np.complex64), 12000., 100e6, stream='tx')
+    out, filled = ch.read(1000)
+    # interpolated from the zero before the first sample, no step at the join
+    assert filled == 480
+    assert np.allclose(out[:filled].real, np.concatenate((np.zeros(4), np.arange(476)/4)))
+
+def test_noise_power():
+    ch = channel(noise=0.1)
+    out, filled = ch.read(200000)
+    assert filled == 0
+    assert abs(np.mean(np.abs(out)**2) - 0.01) < 0.0005
+    assert ch.stats()['noise_samples'] == 200000
+
+def test_audio_mode_is_constant_envelope():
+    ch = channel(mode='audio')
+    t = np.arange(4800)/RATE
+    audio = (10000*np.sin(2*np.pi*1200*t)).astype(np.int16)
+    ch.inject_audio(audio, RATE, 100e6)
+    out, filled = ch.read(4800)
+    assert filled == 4800
+    assert np.allclose(np.abs(out), 1.0, atol=1e-3)
+    # peak deviation is deviation*level/full scale
+    dev = np.angle(out[1:]*np.conj(out[:-1]))*RATE/(2*np.pi)
+    assert abs(np.max(dev) - 3e3*10000/32768) < 20
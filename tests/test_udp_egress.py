@@ -0,0 +1,85 @@
+import socket
+import time
+
+from conftest import load_core_module
+
+udp_transmitter = load_core_module('udp_transmitter', deps=('bounded_queue',))
+
+def receiver():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.settimeout(1.0)
+    return sock
+
+def wait_sent(egress, n):
+    for i in range(100):
+        dests = egress.stats()['destinations']
+        if all(d['sent'] >= n for d in dests.values()):
+            return
+        time.sleep(0.01)
+
+def test_delivery_to_every_destination():
+    a, b = receiver(), receiver()
+    dests = ['127.0.0.1:%d' % s.getsockname()[1] for s in (a, b)]
+    egress = udp_transmitter.UDPEgress(destinations=dests)
+    try:
+        for i in range(3):
+            egress.send('N0CALL>APRS:>%d' % i)
+        wait_sent(egress, 3)
+        expected = [udp_transmitter.parse_udp_message('N0CALL>APRS:>%d' % i).encode() for i in range(3)]
+        for s in (a, b):
+            assert [s.recv(2048) for i in range(3)] == expected
+        stats = egress.stats()
+        for d in dests:
+            c = stats['destinations'][d]
+            assert (c['sent'], c['bytes'], c['failed']) == (3, sum(len(p) for p in expected), 0)
+        assert stats['queue']['enqueued'] == 3
+
+        # a removed destination gets nothing more
+        egress.remove_destination(dests[1])
+        egress.send('N0CALL>APRS:>only a')
+        wait_sent(egress, 4)
+        assert a.recv(2048).endswith(b'only a')
+        assert list(egress.stats()['destinations']) == [dests[0]]
+    finally:
+        egress.close()
+        a.close()
+        b.close()
+
+def test_full_queue_drops_oldest():
+    sock = receiver()
+    dest = '127.0.0.1:%d' % sock.getsockname()[1]
+    egress = udp_transmitter.UDPEgress(destinations=[dest], maxsize=4)
+    try:
+        # the sender takes the first message and waits for the lock while
+        # the queue overflows
+        with egress.lock:
+            egress.send('N0CALL>APRS:>0')
+            while egress.queue.qsize():
+                time.sleep(0.001)
+            for i in range(1, 10):
+                egress.send('N0CALL>APRS:>%d' % i)
+        wait_sent(egress, 5)
+        got = []
+        sock.settimeout(0.2)
+        try:
+            while True:
+                got.append(sock.recv(2048))
+        except socket.timeout:
+            pass
+        stats = egress.stats()
+        # the queue kept the last 4
+        assert stats['queue']['dropped'] == 5
+        assert stats['destinations'][dest]['sent'] == len(got) == 5
+        assert [p.rsplit(b'>', 1)[1] for p in got[1:]] == [b'6', b'7', b'8', b'9']
+    finally:
+        egress.close()
+        sock.close()
+
+def test_send_without_destinations_is_not_queued():
+    egress = udp_transmitter.UDPEgress()
+    try:
+        egress.send('N0CALL>APRS:>nowhere')
+        assert egress.stats()['queue']['enqueued'] == 0
+    finally:
+        egress.close()
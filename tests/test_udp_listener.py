@@ -0,0 +1,73 @@
+import asyncio
+import socket
+
+from conftest import load_core_module
+
+udp_listener = load_core_module('udp_listener')
+
+def test_parse_crlf_and_partial_lines():
+    payloads = [b'N0CALL>APRS:>one\r\nN0CALL>APRS:>two\r\n', b'\r\n\r\n', b'N0CALL>APRS:>three']
+    lines, failures = udp_listener.parse_aprs_lines(payloads)
+    assert lines == ['N0CALL>APRS:>one', 'N0CALL>APRS:>two', 'N0CALL>APRS:>three']
+    assert failures == 0
+
+def test_parse_rejects_bad_lines():
+    long_line = b'N0CALL>APRS:>' + b'x'*udp_listener.MAX_LINE
+    payloads = [b'N0CALL>APRS:>ok\n\xc3\xa9t\xc3\xa9\n', b'tab\there\n' + long_line, b'N0CALL>APRS:>ok too']
+    lines, failures = udp_listener.parse_aprs_lines(payloads)
+    assert lines == ['N0CALL>APRS:>ok', 'N0CALL>APRS:>ok too']
+    assert failures == 3
+
+async def wait_for_count(received, n):
+    for i in range(100):
+        if len(received) >= n:
+            return
+        await asyncio.sleep(0.01)
+
+def test_udp_and_tcp_ingress():
+    async def run():
+        received = []
+        server = udp_listener.IngressServer(received.extend, batch_size=8)
+        await server.start('127.0.0.1', 0)
+        port = server.transport.get_extra_info('sockname')[1]
+        try:
+            # datagrams queued before the loop runs are delivered in batches
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as out:
+                for i in range(20):
+                    out.sendto(b'N0CALL>APRS:>%d\r\n' % i, ('127.0.0.1', port))
+                out.sendto(b'\xff\xfe', ('127.0.0.1', port))
+            await wait_for_count(received, 20)
+            assert received == ['N0CALL>APRS:>%d' % i for i in range(20)]
+            stats = server.stats()
+            assert stats['datagrams'] == 21 and stats['messages'] == 20
+            assert stats['parse_failures'] == 1
+            assert stats['max_batch'] == 8
+            assert stats['batches'] <= 4
+        finally:
+            server.close()
+    asyncio.run(run())
+
+def test_tcp_ingress_lines_split_across_writes():
+    async def run():
+        received = []
+        server = udp_listener.IngressServer(received.extend)
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            tcp_port = s.getsockname()[1]
+        await server.start('127.0.0.1', 0, tcp_port=tcp_port)
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', tcp_port)
+            writer.write(b'N0CALL>APRS:>fi')
+            await writer.drain()
+            await asyncio.sleep(0.02)
+            assert received == []
+            writer.write(b'rst\r\nN0CALL>APRS:>second\n')
+            await writer.drain()
+            await wait_for_count(received, 2)
+            assert received == ['N0CALL>APRS:>first', 'N0CALL>APRS:>second']
+            stats = server.stats()
+            assert stats['tcp_connections'] == 1 and stats['tcp_lines'] == 2
+            writer.close()
+        finally:
+            server.close()
+    asyncio.run(run())
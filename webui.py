@@ -32,10 +32,9 @@ backend = Backend(config_file='config.json', socketio=socketio)
 def handle_connect():
     print("Client connected")
     logger.info("A client has connected to the server.")
-    # Optionally, emit initial system status or data to the client
-    socketio.emit('system_status', {'status': 'running'})
-    # You can also send other statuses if needed
-    socketio.emit('reception_status', {'status': 'idle'})
+    # Status is only emitted on transitions, so send the current state to new clients
+    for event, status in backend.status_snapshot().items():
+        socketio.emit(event, {'status': status})
 
 @socketio.on('aprs_message')
 def handle_aprs():
@@ -89,6 +88,15 @@ def restart_reception():
         logger.exception("Failed to restart reception: %s", e)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+# API endpoint to get runtime metrics
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    try:
+        return jsonify({'status': 'success', 'metrics': backend.get_metrics()})
+    except Exception as e:
+        logger.exception("Failed to get metrics: %s", e)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 # Function to run the backend in a separate thread
 def run_backend():
     backend.run()